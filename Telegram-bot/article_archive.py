@@ -0,0 +1,232 @@
+import sqlite3
+import logging
+from datetime import datetime
+from config import ARCHIVE_DB_FILE
+from classifier import classify, TAGS_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Формат хранения дат в архиве: строки в таком формате сравниваются в хронологическом порядке
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class ArticleArchive:
+    """
+    Локальный архив статей yarnews.net.
+    Статьи только добавляются (ключ - ссылка на статью), поэтому недельные
+    выборки сводятся к запросу по индексу на дату публикации.
+    Дополнительно архив помнит, за какой период у него нет пропусков.
+    """
+
+    def __init__(self, db_file=ARCHIVE_DB_FILE):
+        """
+        Инициализация архива
+        :param db_file: Путь к файлу базы данных SQLite
+        """
+        self.db_file = db_file
+        self.init_db()
+        self.retag_if_outdated()
+
+    def init_db(self):
+        """
+        Создает таблицы статей и их тегов, индексы по дате публикации и тегу и таблицу служебных отметок
+        """
+        conn = sqlite3.connect(self.db_file)
+        c = conn.cursor()
+
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                link TEXT PRIMARY KEY,                -- Ссылка на статью
+                title TEXT NOT NULL,                  -- Заголовок
+                description TEXT,                     -- Краткое описание
+                image_url TEXT,                       -- Ссылка на изображение
+                published_at TIMESTAMP NOT NULL,      -- Дата и время публикации
+                first_seen_at TIMESTAMP NOT NULL      -- Когда статья впервые попала в архив
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at)')
+
+        # Теги категорий, вычисленные классификатором при первом появлении статьи
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS article_tags (
+                link TEXT NOT NULL,                   -- Ссылка на статью
+                tag TEXT NOT NULL,                    -- Тег вида "таблица:категория"
+                PRIMARY KEY (link, tag)
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_article_tags_tag ON article_tags (tag)')
+
+        # Служебные отметки: covered_since/covered_until - период без пропусков, last_backfill_at - последняя догрузка
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS archive_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def _get_meta(self, c, key):
+        c.execute('SELECT value FROM archive_meta WHERE key = ?', (key,))
+        row = c.fetchone()
+        return datetime.strptime(row[0], DATETIME_FORMAT) if row and row[0] else None
+
+    def _set_meta(self, c, key, value):
+        if isinstance(value, datetime):
+            value = value.strftime(DATETIME_FORMAT)
+        c.execute('INSERT OR REPLACE INTO archive_meta (key, value) VALUES (?, ?)', (key, value))
+
+    def retag_if_outdated(self):
+        """
+        Переразмечает все статьи архива, если словари ключевых слов изменились
+        с момента последней разметки (или архив создан до появления тегов)
+        """
+        conn = sqlite3.connect(self.db_file)
+        try:
+            c = conn.cursor()
+            c.execute("SELECT value FROM archive_meta WHERE key = 'tags_version'")
+            row = c.fetchone()
+            if row and row[0] == TAGS_VERSION:
+                return
+
+            c.execute('SELECT link, title, description FROM articles')
+            rows = c.fetchall()
+            c.execute('DELETE FROM article_tags')
+            c.executemany('INSERT INTO article_tags (link, tag) VALUES (?, ?)', [
+                (link, t) for link, title, description in rows for t in classify(title, description or "")
+            ])
+            self._set_meta(c, 'tags_version', TAGS_VERSION)
+            conn.commit()
+            logger.info(f"[ARCHIVE] Retagged {len(rows)} articles for keyword tables version {TAGS_VERSION[:8]}.")
+        finally:
+            conn.close()
+
+    def ingest(self, articles, fetched_at=None):
+        """
+        Добавляет в архив новые статьи из очередного снимка ленты.
+        Уже известные статьи не перезаписываются. Теги статей (ключ tags)
+        сохраняются вместе с ними.
+        Если самая старая статья снимка новее конца покрытого периода,
+        между снимками мог быть пропуск, и покрытие начинается заново.
+        :param articles: Список нормализованных статей (см. yarnews_feed.parse_feed)
+        :param fetched_at: Время получения снимка
+        :return: Количество новых статей
+        """
+        if not articles:
+            return 0
+
+        fetched_at = fetched_at or datetime.now()
+        now_str = fetched_at.strftime(DATETIME_FORMAT)
+        oldest = min(article['datetime'] for article in articles)
+
+        conn = sqlite3.connect(self.db_file)
+        try:
+            c = conn.cursor()
+            before = conn.total_changes
+            c.executemany('''
+                INSERT OR IGNORE INTO articles (link, title, description, image_url, published_at, first_seen_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (a['link'], a['title'], a['description'], a['image_url'],
+                 a['datetime'].strftime(DATETIME_FORMAT), now_str)
+                for a in articles
+            ])
+            added = conn.total_changes - before
+            c.executemany('INSERT OR IGNORE INTO article_tags (link, tag) VALUES (?, ?)', [
+                (a['link'], t) for a in articles for t in a.get('tags', ())
+            ])
+
+            covered_since = self._get_meta(c, 'covered_since')
+            covered_until = self._get_meta(c, 'covered_until')
+            if covered_since is None or covered_until is None or oldest > covered_until:
+                covered_since = oldest
+            else:
+                covered_since = min(covered_since, oldest)
+            self._set_meta(c, 'covered_since', covered_since)
+            self._set_meta(c, 'covered_until', fetched_at)
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"[ARCHIVE] Ingested {added} new articles, covered since {covered_since.strftime(DATETIME_FORMAT)}.")
+        return added
+
+    def has_gap(self, since):
+        """
+        Проверяет, есть ли в архиве пропуски начиная с момента since
+        :param since: Начало интересующего периода (datetime)
+        :return: True, если архив не покрывает период целиком
+        """
+        conn = sqlite3.connect(self.db_file)
+        try:
+            covered_since = self._get_meta(conn.cursor(), 'covered_since')
+        finally:
+            conn.close()
+        return covered_since is None or covered_since > since
+
+    def get_last_backfill(self):
+        """
+        Время последней догрузки архива через браузер
+        :return: datetime или None
+        """
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return self._get_meta(conn.cursor(), 'last_backfill_at')
+        finally:
+            conn.close()
+
+    def mark_backfill(self, when=None):
+        """
+        Запоминает время догрузки архива через браузер
+        :param when: Время догрузки
+        """
+        conn = sqlite3.connect(self.db_file)
+        try:
+            self._set_meta(conn.cursor(), 'last_backfill_at', when or datetime.now())
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_articles(self, start, end, tag=None):
+        """
+        Получение статей, опубликованных в периоде [start, end)
+        :param start: Начало периода (datetime, включительно)
+        :param end: Конец периода (datetime, не включительно)
+        :param tag: Если указан, только статьи с этим тегом
+        :return: Список нормализованных статей с тегами от новых к старым
+        """
+        query = '''
+            SELECT a.link, a.title, a.description, a.image_url, a.published_at, group_concat(t.tag, '|')
+            FROM articles a
+            LEFT JOIN article_tags t ON t.link = a.link
+            WHERE a.published_at >= ? AND a.published_at < ?
+        '''
+        params = [start.strftime(DATETIME_FORMAT), end.strftime(DATETIME_FORMAT)]
+        if tag:
+            query += ' AND a.link IN (SELECT link FROM article_tags WHERE tag = ?)'
+            params.append(tag)
+        query += ' GROUP BY a.link ORDER BY a.published_at DESC'
+
+        conn = sqlite3.connect(self.db_file)
+        try:
+            c = conn.cursor()
+            c.execute(query, params)
+            rows = c.fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                'link': link,
+                'title': title,
+                'description': description or "",
+                'image_url': image_url or "",
+                'datetime': datetime.strptime(published_at, DATETIME_FORMAT),
+                'tags': frozenset(tags.split('|')) if tags else frozenset()
+            }
+            for link, title, description, image_url, published_at, tags in rows
+        ]
+
+# Общий архив статей для новостей и событий
+article_archive = ArticleArchive()
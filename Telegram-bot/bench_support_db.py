@@ -0,0 +1,174 @@
+"""
+Замер скорости запросов SupportDB на большой базе.
+Создает во временной папке базу поддержки с заданным числом обращений и сообщений
+и сравнивает задержку запросов бота с индексами и без них, а также
+с соединением на каждый запрос (как было раньше) и с постоянным соединением.
+Отдельно замеряется полнотекстовый поиск по редким, средним и частым словам.
+
+Запуск: python bench_support_db.py [--tickets 100000] [--messages 1000000] [--repeat 200]
+"""
+import argparse
+from itertools import accumulate
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from support_db import SupportDB
+
+INDEXES = ['idx_tickets_user_updated', 'idx_tickets_status_updated', 'idx_tickets_status_created', 'idx_messages_ticket_created']
+
+SYLLABLES = ['ка', 'ро', 'ли', 'ну', 'те', 'ма', 'зо', 'вы', 'ше', 'дар', 'бот', 'нов', 'ость', 'ска', 'при', 'мер']
+
+def make_vocabulary(rng, size):
+    """Словарь из случайных слов; частота слова в сообщениях убывает с номером (закон Ципфа)."""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words, key=lambda word: rng.random())
+    weights = [1 / rank for rank in range(1, size + 1)]
+    return words, weights
+
+def populate(db, tickets, messages, users):
+    """Заполняет базу случайными обращениями и сообщениями одной транзакцией."""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    words, weights = make_vocabulary(rng, 20000)
+    cum_weights = list(accumulate(weights))
+    def ticket_rows():
+        for i in range(1, tickets + 1):
+            user_id = rng.randint(1, users)
+            created = start + timedelta(minutes=i)
+            updated = created + timedelta(minutes=rng.randint(0, 10000))
+            status = 'open' if rng.random() < 0.05 else 'closed'
+            subject = ' '.join(rng.choices(words, cum_weights=cum_weights, k=5))
+            yield i, user_id, f'user{user_id}', status, created, updated, 'other', subject
+
+    conn = db.connections.connection()
+    with conn:
+        conn.executemany(
+            'INSERT INTO tickets (id, user_id, username, status, created_at, updated_at, category, subject) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ticket_rows()
+        )
+        conn.executemany(
+            'INSERT INTO messages (ticket_id, user_id, is_admin, message, created_at) VALUES (?, ?, ?, ?, ?)',
+            (
+                (rng.randint(1, tickets), rng.randint(1, users), rng.random() < 0.3,
+                 ' '.join(rng.choices(words, cum_weights=cum_weights, k=10)), start + timedelta(seconds=j * 30))
+                for j in range(messages)
+            )
+        )
+    conn.execute('ANALYZE')
+    return words
+
+def measure(func, args_list):
+    """Выполняет запрос для каждого набора аргументов, возвращает (медиана, p95) в миллисекундах."""
+    timings = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def connect_per_call(db, method):
+    """Обертка, которая открывает и закрывает соединение на каждый вызов, как до постоянных соединений."""
+    def call(*args):
+        conn = sqlite3.connect(db.db_file)
+        try:
+            return method(conn, *args)
+        finally:
+            conn.close()
+    return call
+
+def run_queries(db, args, connection=None):
+    """Замеряет основные запросы бота. connection - функция, возвращающая соединение для запроса."""
+    rng = random.Random(7)
+    ticket_ids = [(rng.randint(1, args.tickets),) for _ in range(args.repeat)]
+    user_ids = [(rng.randint(1, args.users),) for _ in range(args.repeat)]
+    open_repeat = [()] * max(args.repeat // 20, 5)
+    if connection is None:
+        return {
+            'get_ticket': measure(db.get_ticket, ticket_ids),
+            'get_user_tickets': measure(db.get_user_tickets, user_ids),
+            'get_open_tickets': measure(db.get_open_tickets, open_repeat),
+            'add_message': measure(lambda t: db.add_message(t, 1, 'bench'), ticket_ids),
+        }
+
+    def get_ticket(conn, ticket_id):
+        conn.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,)).fetchone()
+        return conn.execute('SELECT * FROM messages WHERE ticket_id = ? ORDER BY created_at', (ticket_id,)).fetchall()
+
+    def get_user_tickets(conn, user_id):
+        return conn.execute('SELECT * FROM tickets WHERE user_id = ? ORDER BY updated_at DESC', (user_id,)).fetchall()
+
+    def get_open_tickets(conn):
+        return conn.execute("SELECT * FROM tickets WHERE status = 'open' ORDER BY created_at").fetchall()
+
+    def add_message(conn, ticket_id):
+        now = datetime.now()
+        conn.execute('INSERT INTO messages (ticket_id, user_id, message, is_admin, created_at) VALUES (?, ?, ?, ?, ?)',
+                     (ticket_id, 1, 'bench', False, now))
+        conn.execute('UPDATE tickets SET updated_at = ? WHERE id = ?', (now, ticket_id))
+        conn.commit()
+
+    return {
+        'get_ticket': measure(connection(db, get_ticket), ticket_ids),
+        'get_user_tickets': measure(connection(db, get_user_tickets), user_ids),
+        'get_open_tickets': measure(connection(db, get_open_tickets), open_repeat),
+        'add_message': measure(connection(db, add_message), ticket_ids),
+    }
+
+def run_search(db, words, args):
+    """Замеряет первую страницу полнотекстового поиска для слов разной частоты."""
+    repeat = max(args.repeat // 10, 5)
+    queries = {
+        'редкое слово': words[15000],
+        'среднее слово': words[500],
+        'частое слово': words[20],
+        'два слова': f'{words[50]} {words[300]}',
+        'начало слова': words[500][:4],
+    }
+    return {
+        f'search: {name}': measure(lambda q: db.search_tickets(q, 5), [(query,)] * repeat)
+        for name, query in queries.items()
+    }
+
+def print_results(title, results):
+    print(f"\n{title}")
+    print(f"{'запрос':<28}{'медиана, мс':>14}{'p95, мс':>12}")
+    for name, (median, p95) in results.items():
+        print(f"{name:<28}{median:>14.3f}{p95:>12.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер скорости запросов SupportDB')
+    parser.add_argument('--tickets', type=int, default=100000, help='Число обращений')
+    parser.add_argument('--messages', type=int, default=1000000, help='Число сообщений')
+    parser.add_argument('--users', type=int, default=20000, help='Число пользователей')
+    parser.add_argument('--repeat', type=int, default=200, help='Сколько раз выполнять каждый запрос')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SupportDB(os.path.join(tmp, 'support_bench.db'))
+        started = time.perf_counter()
+        words = populate(db, args.tickets, args.messages, args.users)
+        print(f"База: {args.tickets} обращений, {args.messages} сообщений "
+              f"(заполнена за {time.perf_counter() - started:.1f} с)")
+
+        print_results('Постоянное соединение, с индексами', run_queries(db, args))
+        print_results('Соединение на каждый запрос, с индексами', run_queries(db, args, connect_per_call))
+        print_results('Полнотекстовый поиск (FTS5), первая страница', run_search(db, words, args))
+
+        conn = db.connections.connection()
+        for index in INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {index}')
+        conn.execute('ANALYZE')
+        conn.commit()
+        print_results('Соединение на каждый запрос, без индексов (как было раньше)', run_queries(db, args, connect_per_call))
+        db.connections.close_all()
+
+if __name__ == '__main__':
+    main()
@@ -35,12 +35,12 @@ from about_city import YAROSLAVL_INFO
 from history_parser import HistoryParser
 from keyboards import create_main_keyboard, create_about_city_keyboard, create_location_keyboard, create_support_keyboard, create_admin_panel_keyboard, create_map_keyboard, create_history_keyboard, create_two_column_keyboard, create_events_keyboard
 
-from telebot.storage import StateMemoryStorage
+from state_store import main_states, TeleBotStateStorage
 
 import handlers
 
-# Инициализация бота с хранилищем состояний
-state_storage = StateMemoryStorage()
+# Инициализация бота с хранилищем состояний (общим для процессов, если STATE_BACKEND = 'redis')
+state_storage = TeleBotStateStorage()
 bot = telebot.TeleBot(BOT_TOKEN, state_storage=state_storage)
 
 # Импортируем обработчики сообщений после инициализации бота
@@ -70,16 +70,13 @@ class BotState(telebot.State):
 # Инициализация парсера истории
 history_parser = HistoryParser()
 
-# Словарь для хранения состояний пользователей
-user_states = {}
-
 def save_user_state(chat_id, state):
-    """Save user state to memory."""
-    user_states[chat_id] = state
+    """Save user state (shared with handlers.py, see state_store.py)."""
+    main_states[chat_id] = state
 
 def get_user_state(chat_id):
-    """Get user state from memory."""
-    return user_states.get(chat_id, {})
+    """Get user state (shared with handlers.py, see state_store.py)."""
+    return main_states.get(chat_id, {})
 
 def is_admin(user_id):
     """Проверяет, является ли пользователь администратором."""
@@ -1,8 +1,14 @@
 import telebot
 from config import BOT_TOKEN, SUPPORT_BOT_TOKEN
+from dispatcher import install_dispatcher
+from state_store import TeleBotStateStorage
 
 # Инициализация основного бота
-bot = telebot.TeleBot(BOT_TOKEN)
+bot = telebot.TeleBot(BOT_TOKEN, state_storage=TeleBotStateStorage('main_telebot'))
 
 # Инициализация бота поддержки
-support_bot = telebot.TeleBot(SUPPORT_BOT_TOKEN) 
\ No newline at end of file
+support_bot = telebot.TeleBot(SUPPORT_BOT_TOKEN, state_storage=TeleBotStateStorage('support_telebot'))
+
+# Обновления обрабатываются пулом потоков с сохранением порядка внутри каждого чата
+install_dispatcher(bot)
+install_dispatcher(support_bot)
@@ -0,0 +1,276 @@
+import json
+import os
+import time
+import logging
+import queue
+import threading
+from datetime import datetime
+from telebot import types
+from telebot.apihelper import ApiTelegramException
+from config import (
+    CACHE_DIR, BROADCAST_GLOBAL_RATE, BROADCAST_PER_CHAT_INTERVAL,
+    BROADCAST_WORKERS, BROADCAST_MAX_RETRIES
+)
+from database import mark_users_blocked, iter_broadcast_audience
+
+logger = logging.getLogger(__name__)
+
+# Каталог с файлами прогресса рассылок, по которым прерванная рассылка продолжается
+BROADCAST_DIR = os.path.join(CACHE_DIR, 'broadcasts')
+
+# Как часто сохранять прогресс рассылки (в секундах)
+PROGRESS_SAVE_INTERVAL = 5
+
+# Описания ошибок 403/400, после которых писать пользователю бессмысленно
+UNREACHABLE_ERRORS = (
+    "bot was blocked by the user",
+    "user is deactivated",
+    "chat not found",
+    "bot can't initiate conversation",
+)
+
+class TokenBucket:
+    """
+    Ограничитель скорости "ведро токенов": не более rate операций в секунду
+    с допустимым всплеском до capacity. После ответа 429 ведро можно
+    приостановить целиком на время retry_after.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: Скорость пополнения (токенов в секунду)
+        :param capacity: Емкость ведра (по умолчанию равна rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока не появится свободный токен."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Приостанавливает выдачу токенов на seconds секунд (ответ 429 от Telegram)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+class PerChatLimiter:
+    """Выдерживает минимальный интервал между сообщениями в один чат."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, chat_id):
+        with self._lock:
+            now = time.monotonic()
+            allowed_at = max(now, self._next_allowed.get(chat_id, 0))
+            self._next_allowed[chat_id] = allowed_at + self.interval
+        if allowed_at > now:
+            time.sleep(allowed_at - now)
+
+class BroadcastProgress:
+    """
+    Прогресс рассылки в JSON-файле: граница выборки получателей, текст и уже
+    обработанные чаты. Если процесс остановился посреди рассылки, она продолжается
+    с места остановки: получатели выбираются тем же запросом, обработанные пропускаются.
+    """
+
+    def __init__(self, broadcast_id):
+        self.broadcast_id = broadcast_id
+        self.path = os.path.join(BROADCAST_DIR, f"{broadcast_id}.json")
+        self.data = {
+            'broadcast_id': broadcast_id,
+            'text': None,
+            'reply_markup': None,
+            'registered_before': None,
+            'sent': [],
+            'failed': [],
+            'blocked': [],
+            'done': False,
+        }
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, broadcast_id):
+        progress = cls(broadcast_id)
+        try:
+            if os.path.exists(progress.path):
+                with open(progress.path, 'r', encoding='utf-8') as f:
+                    progress.data.update(json.load(f))
+        except Exception as e:
+            logger.error(f"[BROADCAST] Failed to load progress {progress.path}: {e}")
+        return progress
+
+    def processed(self):
+        return set(self.data['sent']) | set(self.data['failed']) | set(self.data['blocked'])
+
+    def record(self, chat_id, outcome):
+        """
+        Отмечает результат отправки и сохраняет файл не чаще раза в PROGRESS_SAVE_INTERVAL секунд
+        :param outcome: 'sent', 'failed' или 'blocked'
+        """
+        with self._lock:
+            self.data[outcome].append(chat_id)
+            if time.monotonic() - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        try:
+            os.makedirs(BROADCAST_DIR, exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._saved_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"[BROADCAST] Failed to save progress {self.path}: {e}")
+
+class Broadcaster:
+    """
+    Массовая рассылка одного сообщения с соблюдением лимитов Telegram:
+    общий лимит на бота, интервал между сообщениями в один чат, паузы по
+    retry_after, несколько параллельных отправителей, сохранение прогресса
+    и пометка пользователей, заблокировавших бота.
+    """
+
+    def __init__(self, bot, rate=BROADCAST_GLOBAL_RATE, per_chat_interval=BROADCAST_PER_CHAT_INTERVAL,
+                 workers=BROADCAST_WORKERS, max_retries=BROADCAST_MAX_RETRIES):
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.chat_limiter = PerChatLimiter(per_chat_interval)
+        self.workers = workers
+        self.max_retries = max_retries
+
+    def _send(self, chat_id, text, reply_markup):
+        """
+        Отправляет сообщение в чат с повторами после 429
+        :return: 'sent', 'failed' или 'blocked'
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.chat_limiter.acquire(chat_id)
+            try:
+                self.bot.send_message(chat_id, text, reply_markup=reply_markup)
+                return 'sent'
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+                    logger.warning(f"[BROADCAST] Flood limit hit, pausing for {retry_after} s.")
+                    self.bucket.pause(retry_after)
+                    continue
+                if e.error_code in (400, 403) and any(err in e.description for err in UNREACHABLE_ERRORS):
+                    logger.info(f"[BROADCAST] Chat {chat_id} is unreachable: {e.description}")
+                    return 'blocked'
+                logger.error(f"[BROADCAST] Error sending to {chat_id}: {e}")
+                return 'failed'
+            except Exception as e:
+                logger.error(f"[BROADCAST] Error sending to {chat_id}: {e}")
+                return 'failed'
+        return 'failed'
+
+    def run(self, broadcast_id, text, reply_markup=None, registered_before=None):
+        """
+        Запускает (или продолжает) рассылку всем подходящим пользователям
+        :param broadcast_id: Уникальный идентификатор рассылки, например daily_2024-01-01
+        :param text: Текст сообщения
+        :param reply_markup: Клавиатура сообщения
+        :param registered_before: Рассылать только зарегистрированным раньше этого момента
+            (по умолчанию - момент первого запуска рассылки)
+        :return: Словарь со счетчиками sent/failed/blocked
+        """
+        progress = BroadcastProgress.load(broadcast_id)
+        if progress.data['done']:
+            logger.info(f"[BROADCAST] {broadcast_id} already finished, skipping.")
+            return self._summary(progress)
+
+        if not progress.data['registered_before']:
+            progress.data['registered_before'] = str(registered_before or datetime.now())
+            progress.data['text'] = text
+            progress.data['reply_markup'] = reply_markup.to_json() if reply_markup else None
+            progress.save()
+        registered_before = datetime.fromisoformat(progress.data['registered_before'])
+
+        processed = progress.processed()
+        if processed:
+            logger.info(f"[BROADCAST] {broadcast_id}: resuming, {len(processed)} recipients already processed.")
+            # Повторная пометка безвредна и покрывает прогресс, сохраненный до пометки в базе
+            if progress.data['blocked']:
+                mark_users_blocked(progress.data['blocked'])
+
+        # Ограниченная очередь: получатели читаются из базы по мере отправки, а не списком целиком
+        pending = queue.Queue(maxsize=self.workers * 4)
+
+        def sender():
+            while True:
+                chat_id = pending.get()
+                if chat_id is None:
+                    return
+                outcome = self._send(chat_id, text, reply_markup)
+                if outcome == 'blocked':
+                    # Помечаем сразу, до записи в прогресс: после падения процесса
+                    # обработанный чат пропускается и пометить его будет уже некому
+                    mark_users_blocked([chat_id])
+                progress.record(chat_id, outcome)
+
+        senders = [
+            threading.Thread(target=sender, name=f"Broadcast_{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in senders:
+            thread.start()
+        try:
+            for chat_id in iter_broadcast_audience(registered_before):
+                if chat_id not in processed:
+                    pending.put(chat_id)
+        finally:
+            for _ in senders:
+                pending.put(None)
+            for thread in senders:
+                thread.join()
+
+        progress.data['done'] = True
+        progress.save()
+        summary = self._summary(progress)
+        logger.info(f"[BROADCAST] {broadcast_id} finished: {summary}")
+        return summary
+
+    def _summary(self, progress):
+        return {outcome: len(progress.data[outcome]) for outcome in ('sent', 'failed', 'blocked')}
+
+    def resume_unfinished(self):
+        """Продолжает рассылки, прерванные остановкой бота."""
+        if not os.path.isdir(BROADCAST_DIR):
+            return
+        for filename in sorted(os.listdir(BROADCAST_DIR)):
+            if not filename.endswith('.json'):
+                continue
+            progress = BroadcastProgress.load(filename[:-len('.json')])
+            if progress.data['done'] or not progress.data['registered_before']:
+                continue
+            markup = progress.data['reply_markup']
+            reply_markup = types.InlineKeyboardMarkup.de_json(markup) if markup else None
+            logger.info(f"[BROADCAST] Resuming unfinished broadcast {progress.broadcast_id}.")
+            self.run(progress.broadcast_id, progress.data['text'], reply_markup)
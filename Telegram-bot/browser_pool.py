@@ -0,0 +1,197 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from config import BROWSER_POOL_SIZE, BROWSER_QUEUE_TIMEOUT, BROWSER_MAX_RENDERS_PER_SESSION
+
+logger = logging.getLogger(__name__)
+
+# Селекторы кнопки "больше новостей" на yarnews.net
+LOAD_MORE_SELECTORS = [
+    "//button[contains(@class, 'js-nexter')]",
+    "//button[contains(text(), 'больше новостей')]",
+    "//button[contains(text(), 'еще новости')]",
+    "//a[contains(@class, 'js-nexter')]",
+    "//a[contains(text(), 'больше новостей')]",
+    "//a[contains(text(), 'еще новости')]",
+    "//div[contains(@class, 'js-nexter')]",
+    "//div[contains(text(), 'больше новостей')]",
+    "//div[contains(text(), 'еще новости')]",
+]
+
+FEED_ITEM_SELECTOR = ".news-feed-item"
+
+# Скрипт проверки, что элемент действительно видим на странице
+IS_VISIBLE_SCRIPT = """
+    const rect = arguments[0].getBoundingClientRect();
+    const style = window.getComputedStyle(arguments[0]);
+    return (
+        rect.width > 0 &&
+        rect.height > 0 &&
+        style.display !== 'none' &&
+        style.visibility !== 'hidden' &&
+        style.opacity !== '0'
+    );
+"""
+
+class BrowserPool:
+    """
+    Пул долгоживущих headless-сессий Chrome.
+    Одновременно выполняется не более size отрисовок, остальные запросы
+    ждут своей очереди. Сессии переиспользуются между запросами и
+    пересоздаются после max_renders отрисовок или при ошибке драйвера.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, queue_timeout=BROWSER_QUEUE_TIMEOUT,
+                 max_renders=BROWSER_MAX_RENDERS_PER_SESSION):
+        self.size = size
+        self.queue_timeout = queue_timeout
+        self.max_renders = max_renders
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._render_counts = {}
+        self._closed = False
+
+    def _create_driver(self):
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(45)
+        logger.info("[BROWSER] Started new Chrome session.")
+        return driver
+
+    def _quit(self, driver):
+        with self._lock:
+            self._render_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"[BROWSER] Error while quitting Chrome session: {e}")
+
+    @contextmanager
+    def session(self):
+        """
+        Выдает сессию Chrome из пула на время блока with.
+        Если все сессии заняты, ждет освобождения не дольше queue_timeout секунд.
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise TimeoutException("Timed out waiting for a free browser session")
+
+        driver = None
+        broken = False
+        try:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                driver = self._create_driver()
+            yield driver
+        except WebDriverException as e:
+            # Таймаут ожидания не портит сессию, остальные ошибки драйвера - портят
+            broken = not isinstance(e, TimeoutException)
+            raise
+        finally:
+            if driver is not None:
+                with self._lock:
+                    renders = self._render_counts.get(id(driver), 0) + 1
+                    self._render_counts[id(driver)] = renders
+                    reuse = not (broken or self._closed or renders >= self.max_renders)
+                    if reuse:
+                        self._idle.append(driver)
+                if not reuse:
+                    self._quit(driver)
+            self._slots.release()
+
+    def render_feed(self, url, max_cycles, progress=None, log_prefix="[BROWSER]"):
+        """
+        Загружает ленту и нажимает "больше новостей", пока появляются новые статьи.
+        Вместо фиксированных пауз ждет роста числа элементов ленты.
+        :param url: Адрес страницы с лентой
+        :param max_cycles: Максимальное число подгрузок
+        :param progress: Необязательная функция progress(stage, **info) для отчета о ходе загрузки
+        :return: HTML страницы или None при ошибке
+        """
+        def report(stage, **info):
+            if progress:
+                try:
+                    progress(stage, **info)
+                except Exception as e:
+                    logger.debug(f"{log_prefix} Progress callback failed: {e}")
+
+        try:
+            with self.session() as driver:
+                driver.get(url)
+                WebDriverWait(driver, 15).until(
+                    EC.presence_of_element_located((By.CLASS_NAME, "news-feed"))
+                )
+                items_count = len(driver.find_elements(By.CSS_SELECTOR, FEED_ITEM_SELECTOR))
+                logger.info(f"{log_prefix} Page loaded with Selenium, {items_count} items.")
+                report("page_loaded", items=items_count)
+
+                for cycle in range(max_cycles):
+                    button = self._find_load_more_button(driver)
+                    if button is None:
+                        logger.info(f"{log_prefix} No more 'больше новостей' buttons found. Ending cycles.")
+                        break
+
+                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
+                    driver.execute_script("arguments[0].click();", button)
+
+                    try:
+                        WebDriverWait(driver, 10).until(
+                            lambda d: len(d.find_elements(By.CSS_SELECTOR, FEED_ITEM_SELECTOR)) > items_count
+                        )
+                    except TimeoutException:
+                        logger.info(f"{log_prefix} Feed did not grow after cycle {cycle + 1}. Ending cycles.")
+                        break
+
+                    items_count = len(driver.find_elements(By.CSS_SELECTOR, FEED_ITEM_SELECTOR))
+                    logger.info(f"{log_prefix} Load-more cycle {cycle + 1} of {max_cycles}: {items_count} items.")
+                    report("load_more", cycle=cycle + 1, cycles=max_cycles, items=items_count)
+
+                page_source = driver.page_source
+                report("parsing", items=items_count)
+                return page_source
+
+        except TimeoutException as e:
+            logger.error(f"{log_prefix} Timeout while loading page with Selenium: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"{log_prefix} Error during page processing with Selenium: {e}")
+            return None
+
+    def _find_load_more_button(self, driver):
+        for selector in LOAD_MORE_SELECTORS:
+            try:
+                for element in driver.find_elements(By.XPATH, selector):
+                    if driver.execute_script(IS_VISIBLE_SCRIPT, element):
+                        return element
+            except Exception as e:
+                logger.debug(f"[BROWSER] Error finding elements with selector {selector}: {str(e)}")
+        return None
+
+    def close(self):
+        """Закрывает все простаивающие сессии и запрещает выдачу новых."""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+# Общий пул браузеров для недельных новостей и событий
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
@@ -0,0 +1,298 @@
+import base64
+import logging
+import threading
+from datetime import datetime
+from io import BytesIO
+from config import CHART_RENDERER
+
+logger = logging.getLogger(__name__)
+
+def _today_points(hourly_data):
+    """Почасовые точки прогноза за сегодня: (список datetime, список температур)."""
+    times = [datetime.fromisoformat(ts) for ts in hourly_data['time']]
+    temperatures = hourly_data['temperature_2m']
+    today_date = datetime.now().date()
+    filtered_times = []
+    filtered_temps = []
+    for i, t in enumerate(times):
+        if t.date() == today_date:
+            filtered_times.append(t)
+            filtered_temps.append(temperatures[i])
+    return filtered_times, filtered_temps
+
+class ChartRenderer:
+    """
+    Интерфейс отрисовки графиков погоды.
+    Тяжелые библиотеки импортируются только при первой отрисовке, а не при запуске бота.
+    """
+
+    def hourly_chart(self, hourly_data):
+        """
+        Рисует график температуры на сегодня по почасовому прогнозу
+        :return: Байты PNG или None
+        """
+        raise NotImplementedError
+
+class MatplotlibRenderer(ChartRenderer):
+    """Графики на matplotlib (и сглаженный график на scipy)."""
+
+    def hourly_chart(self, hourly_data):
+        """Generate a matplotlib graph image of hourly temperatures for today."""
+        try:
+            if not hourly_data or 'time' not in hourly_data or 'temperature_2m' not in hourly_data:
+                logging.warning("Missing hourly data for graph generation.")
+                return None
+
+            filtered_times, filtered_temps = _today_points(hourly_data)
+            if not filtered_times:
+                logging.warning("No hourly data available for today for graph generation.")
+                return None
+
+            plt, HourLocator, DateFormatter = self._pyplot()
+
+            plt.style.use('ggplot') # Use a clean ggplot style
+            fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
+
+            ax.plot(filtered_times, filtered_temps, marker='o', linestyle='-', color='#FF6347', linewidth=2)
+            ax.fill_between(filtered_times, min(filtered_temps) - 2, filtered_temps, color='#FF6347', alpha=0.1) # Shaded area
+
+            # Add temperature labels on top of each point
+            for i, temp in enumerate(filtered_temps):
+                ax.text(filtered_times[i], temp + 0.5, f'{int(temp)}°', ha='center', va='bottom', fontsize=9, color='#333')
+
+            # Customize the plot
+            ax.set_title('График температуры на сегодня:', fontsize=16, pad=20)
+            ax.set_xlabel('Время', fontsize=12)
+            ax.set_ylabel('Температура (°C)', fontsize=12)
+            ax.grid(True, linestyle='--', alpha=0.6)
+            ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
+            ax.xaxis.set_major_locator(HourLocator(interval=3)) # Show ticks every 3 hours
+            fig.autofmt_xdate() # Rotate x-axis labels for better readability
+
+            # Adjust y-axis limits to provide some padding
+            min_temp = min(filtered_temps)
+            max_temp = max(filtered_temps)
+            ax.set_ylim(min_temp - 2, max_temp + 3) # Add padding
+
+            buf = BytesIO()
+            plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
+            buf.seek(0)
+            plt.close(fig) # Close the figure to free up memory
+
+            return buf.getvalue()
+
+        except Exception as e:
+            logging.error(f"Error generating hourly temperature graph image: {e}", exc_info=True)
+            return None
+
+    def smooth_chart(self, weather_data):
+        """Generate a beautiful and clear temperature graph for today's hourly forecast (base64 PNG)."""
+        try:
+            if not weather_data or 'hourly' not in weather_data:
+                return None
+            hourly = weather_data['hourly']
+            times = hourly['time']
+            temps = hourly['temperature_2m']
+            today_str = datetime.now().strftime('%Y-%m-%d')
+            today_hours = [(t, temp) for t, temp in zip(times, temps) if t.startswith(today_str)]
+
+            # Для графика нужно хотя бы 2 точки
+            if len(today_hours) < 2:
+                return None
+
+            plt, HourLocator, DateFormatter = self._pyplot()
+
+            x = [datetime.strptime(t, '%Y-%m-%dT%H:%M') for t, _ in today_hours]
+            y = [temp for _, temp in today_hours]
+
+            plt.figure(figsize=(10, 4))
+
+            # Интерполяция для плавной линии (делаем только если точек >= 4)
+            if len(x) >= 4:
+                try:
+                    import numpy as np
+                    from scipy.interpolate import make_interp_spline
+                    x_num = np.array([dt.timestamp() for dt in x])
+                    y_num = np.array(y)
+                    spl = make_interp_spline(x_num, y_num, k=3)
+                    xnew = np.linspace(x_num.min(), x_num.max(), 200)
+                    y_smooth = spl(xnew)
+                    x_smooth = [datetime.fromtimestamp(ts) for ts in xnew]
+                    plt.plot(x_smooth, y_smooth, color='#FF3B3B', linewidth=2.5, zorder=1)
+                    plt.fill_between(x_smooth, y_smooth, alpha=0.15, color='#FF3B3B')
+                except ValueError as e:
+                     logging.warning(f"Could not perform spline interpolation, falling back to linear: {e}")
+                     # При ошибке интерполяции используем исходные точки
+                     plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
+                     plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
+                except Exception as e:
+                     logging.error(f"Unexpected error during spline interpolation: {e}")
+                     # При любой другой ошибке интерполяции используем исходные точки
+                     plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
+                     plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
+            else:
+                # Если точек < 4, строим график без интерполяции
+                plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
+                plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
+
+            # Рисуем точки только если их не очень много
+            if len(x) <= 24:
+                plt.scatter(x, y, color='#FF3B3B', s=50, zorder=2, edgecolors='white', linewidths=1.5)
+
+            # Подписи температуры над точками (только если точек не очень много)
+            if len(x) <= 24:
+                for xi, yi in zip(x, y):
+                    try:
+                        # Увеличим отступ подписи от точки
+                        plt.text(xi, float(yi) + (max(y)*0.02 + 0.5), f'{round(yi)}°', ha='center', va='bottom', fontsize=9, color='#333', fontweight='bold')
+                    except TypeError as e:
+                        logging.error(f"Error placing text label at {xi}: {e}, value: {yi}")
+                        continue
+                    except Exception as e:
+                         logging.error(f"Unexpected error placing text label at {xi}: {e}")
+                         continue
+
+            # Оформление осей и заголовка
+            plt.title('График температуры на сегодня:', pad=20, fontsize=14, fontweight='bold')
+            plt.xlabel('Время', fontsize=11)
+            plt.ylabel('Температура (°C)', fontsize=11)
+
+            # Установка лимитов оси Y с отступом
+            y_min_val = min(y) if y else 0
+            y_max_val = max(y) if y else 25 # Default max if no data
+            # Добавим отступ сверху, учитывая максимальное значение для подписей
+            padding_top = (y_max_val - y_min_val) * 0.15 + 3 # Отступ 15% от диапазона + константа
+            plt.ylim(y_min_val - 2, y_max_val + padding_top)
+
+            # Оформление оси X: подписи каждые 3 часа
+            plt.gca().xaxis.set_major_locator(HourLocator(interval=3))
+            plt.gca().xaxis.set_major_formatter(DateFormatter('%H:%M'))
+
+            plt.grid(True, linestyle='--', alpha=0.3, linewidth=1)
+            plt.tight_layout()
+            plt.gcf().autofmt_xdate()
+
+            buf = BytesIO()
+            plt.savefig(buf, format='png', dpi=120, bbox_inches='tight')
+            buf.seek(0)
+            plt.close()
+
+            img_str = base64.b64encode(buf.getvalue()).decode()
+            return img_str
+        except Exception as e:
+            logging.error(f"Error generating temperature graph: {e}")
+            return None
+
+    @staticmethod
+    def _pyplot():
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from matplotlib.dates import HourLocator, DateFormatter
+        return plt, HourLocator, DateFormatter
+
+class PillowRenderer(ChartRenderer):
+    """
+    Простой линейный график на Pillow: без matplotlib, numpy и scipy,
+    поэтому почти не занимает памяти и рисуется за миллисекунды.
+    """
+
+    WIDTH, HEIGHT = 1000, 500
+    MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 70, 30, 40, 60
+    LINE_COLOR = (255, 99, 71)
+    FILL_COLOR = (255, 224, 218)
+    GRID_COLOR = (220, 220, 220)
+    TEXT_COLOR = (51, 51, 51)
+
+    def __init__(self):
+        self._font = None
+
+    def _get_font(self, ImageFont):
+        if self._font is None:
+            for name in ('DejaVuSans.ttf', 'arial.ttf'):
+                try:
+                    self._font = ImageFont.truetype(name, 14)
+                    break
+                except OSError:
+                    continue
+            else:
+                self._font = ImageFont.load_default(size=14)
+        return self._font
+
+    def hourly_chart(self, hourly_data):
+        try:
+            if not hourly_data or 'time' not in hourly_data or 'temperature_2m' not in hourly_data:
+                logger.warning("[CHARTS] Missing hourly data for graph generation.")
+                return None
+            times, temps = _today_points(hourly_data)
+            if not times:
+                logger.warning("[CHARTS] No hourly data available for today for graph generation.")
+                return None
+
+            from PIL import Image, ImageDraw, ImageFont
+            font = self._get_font(ImageFont)
+            image = Image.new('RGB', (self.WIDTH, self.HEIGHT), 'white')
+            draw = ImageDraw.Draw(image)
+
+            left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+            right, bottom = self.WIDTH - self.MARGIN_RIGHT, self.HEIGHT - self.MARGIN_BOTTOM
+            # Те же отступы по оси Y, что и у графика matplotlib
+            y_min, y_max = min(temps) - 2, max(temps) + 3
+            x_min = times[0].timestamp()
+            x_span = max(times[-1].timestamp() - x_min, 1)
+
+            def to_xy(moment, temp):
+                x = left + (moment.timestamp() - x_min) / x_span * (right - left)
+                y = bottom - (temp - y_min) / (y_max - y_min) * (bottom - top)
+                return x, y
+
+            # Сетка и подписи оси Y
+            for value in range(int(y_min), int(y_max) + 1):
+                if (int(y_max) - int(y_min)) > 10 and value % 2:
+                    continue
+                _, y = to_xy(times[0], value)
+                draw.line([(left, y), (right, y)], fill=self.GRID_COLOR)
+                draw.text((left - 8, y), f"{value}°", fill=self.TEXT_COLOR, font=font, anchor='rm')
+
+            # Подписи оси X каждые 3 часа
+            for moment in times:
+                if moment.hour % 3 == 0:
+                    x, _ = to_xy(moment, y_min)
+                    draw.line([(x, top), (x, bottom)], fill=self.GRID_COLOR)
+                    draw.text((x, bottom + 10), moment.strftime('%H:%M'), fill=self.TEXT_COLOR, font=font, anchor='mt')
+
+            points = [to_xy(moment, temp) for moment, temp in zip(times, temps)]
+            if len(points) > 1:
+                draw.polygon([(points[0][0], bottom)] + points + [(points[-1][0], bottom)], fill=self.FILL_COLOR)
+                draw.line(points, fill=self.LINE_COLOR, width=3)
+            for (x, y), temp in zip(points, temps):
+                draw.ellipse([x - 4, y - 4, x + 4, y + 4], fill=self.LINE_COLOR, outline='white')
+                draw.text((x, y - 8), f"{int(temp)}°", fill=self.TEXT_COLOR, font=font, anchor='mb')
+            draw.rectangle([left, top, right, bottom], outline=self.GRID_COLOR)
+
+            buf = BytesIO()
+            image.save(buf, format='PNG', optimize=True)
+            return buf.getvalue()
+        except Exception as e:
+            logger.error(f"[CHARTS] Error generating hourly temperature graph image: {e}", exc_info=True)
+            return None
+
+RENDERERS = {
+    'matplotlib': MatplotlibRenderer,
+    'pillow': PillowRenderer,
+}
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+def get_renderer(name=CHART_RENDERER):
+    """
+    Возвращает отрисовщик графиков, создавая его при первом обращении
+    :param name: 'pillow' или 'matplotlib' (по умолчанию - config.CHART_RENDERER)
+    """
+    with _renderers_lock:
+        if name not in _renderers:
+            if name not in RENDERERS:
+                raise ValueError(f"Unknown chart renderer: {name}")
+            _renderers[name] = RENDERERS[name]()
+        return _renderers[name]
@@ -1,5 +1,6 @@
 import sqlite3
 import logging
+from config import USERS_DB_FILE
 
 # Настройка логгера
 logging.basicConfig(level=logging.INFO)
@@ -8,7 +9,7 @@ logger = logging.getLogger(__name__)
 def check_database():
     conn = None
     try:
-        conn = sqlite3.connect('bot.db')
+        conn = sqlite3.connect(USERS_DB_FILE)
         cursor = conn.cursor()
         
         # Проверяем структуру таблицы
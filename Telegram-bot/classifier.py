@@ -0,0 +1,140 @@
+import hashlib
+import logging
+from collections import deque
+from config import CATEGORY_KEYWORDS as CONFIG_CATEGORY_KEYWORDS
+from keywords import (
+    NEWS_CATEGORY_KEYWORDS, EVENT_KEYWORDS,
+    ADMINISTRATIVE_KEYWORDS, GENERAL_NEGATIVE_KEYWORDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, по которым классификатор расставляет теги вида "таблица:категория"
+NEWS = "news"                      # Ключевые слова категории новостей
+NEWS_EXCLUDE = "news_exclude"      # Исключающие слова категории новостей
+EVENT = "event"                    # Ключевые слова категории событий
+EVENT_NEGATIVE = "event_negative"  # Негативные слова категории событий (категория None - общие)
+EVENT_ADMIN = "event_admin"        # Слова административных новостей
+CONFIG = "config"                  # Ключевые слова категорий из config.CATEGORY_KEYWORDS
+CONFIG_NEGATIVE = "config_negative"
+
+def tag(table, category=None):
+    """
+    Строковый тег категории, в таком виде теги хранятся в архиве статей
+    :param table: Таблица ключевых слов (NEWS, EVENT и т.д.)
+    :param category: Категория или None для общих списков
+    """
+    return f"{table}:{category}" if category else table
+
+def has_table_tag(tags, table):
+    """Проверяет, есть ли среди тегов хотя бы одна категория таблицы table"""
+    prefix = f"{table}:"
+    return any(t.startswith(prefix) for t in tags)
+
+class KeywordClassifier:
+    """
+    Многошаблонный поиск ключевых слов (автомат Ахо-Корасик).
+    Автомат строится один раз по всем словарям, после чего все совпадения
+    во всех категориях находятся за один проход по тексту.
+    """
+
+    def __init__(self, labeled_keywords):
+        """
+        Построение автомата
+        :param labeled_keywords: Итерируемый набор пар (тег, список ключевых слов)
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        patterns = 0
+        for label, keywords in labeled_keywords:
+            for keyword in keywords:
+                self._add(keyword.lower(), label)
+                patterns += 1
+        self._build_failure_links()
+        logger.info(f"[CLASSIFIER] Compiled {patterns} keywords into {len(self._goto)} states.")
+
+    def _add(self, keyword, label):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(label)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Теги более коротких суффиксов наследуются, чтобы не ходить по ссылкам при поиске
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def match(self, text):
+        """
+        Находит все теги, ключевые слова которых встречаются в тексте
+        :param text: Текст для поиска (без учета регистра)
+        :return: Множество тегов
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        labels = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                labels |= output[state]
+        return labels
+
+def _labeled_keywords():
+    for category, data in NEWS_CATEGORY_KEYWORDS.items():
+        yield tag(NEWS, category), data.get("keywords", [])
+        yield tag(NEWS_EXCLUDE, category), data.get("exclude_keywords", [])
+    for category, data in EVENT_KEYWORDS.items():
+        yield tag(EVENT, category), data.get("keywords", [])
+        yield tag(EVENT_NEGATIVE, category), data.get("negative_keywords", [])
+    yield tag(EVENT_NEGATIVE), GENERAL_NEGATIVE_KEYWORDS
+    yield tag(EVENT_ADMIN), ADMINISTRATIVE_KEYWORDS
+    for category, data in CONFIG_CATEGORY_KEYWORDS.items():
+        yield tag(CONFIG, category), data.get("keywords", [])
+        yield tag(CONFIG_NEGATIVE, category), data.get("negative_keywords", [])
+
+# Общий классификатор по всем словарям, строится при импорте
+classifier = KeywordClassifier(_labeled_keywords())
+
+# Версия словарей: меняется при любой правке ключевых слов, чтобы архив переразметил статьи
+TAGS_VERSION = hashlib.sha1(
+    repr(sorted((label, sorted(keywords)) for label, keywords in _labeled_keywords())).encode('utf-8')
+).hexdigest()
+
+def classify(title, description=""):
+    """
+    Классифицирует статью по всем категориям новостей и событий за один проход
+    :param title: Заголовок статьи
+    :param description: Описание статьи
+    :return: Множество тегов вида "таблица:категория"
+    """
+    # Перевод строки не входит ни в одно ключевое слово, поэтому совпадение не склеит заголовок с описанием
+    return classifier.match(f"{title}\n{description}")
+
+def tag_article(article):
+    """
+    Дополняет статью тегами категорий, если их еще нет
+    :param article: Нормализованная статья (см. yarnews_feed.parse_feed)
+    :return: Та же статья с ключом tags
+    """
+    if "tags" not in article:
+        article["tags"] = frozenset(classify(article["title"], article["description"]))
+    return article
@@ -13,6 +13,62 @@ STABLE_DIFFUSION_API_KEY = 'YOUR_STABLE_DIFFUSION_API_KEY'  # Replace with your
 
 # Настройки API погоды
 WEATHER_API_URL = 'https://api.open-meteo.com/v1/forecast'
+WEATHER_LATITUDE = 57.6261  # Координаты Ярославля для прогноза
+WEATHER_LONGITUDE = 39.8845
+WEATHER_CACHE_TTL = 900  # Сколько секунд прогноз считается свежим
+WEATHER_STALE_MAX_AGE = 21600  # Сколько секунд можно отдавать устаревший прогноз, пока он обновляется
+WEATHER_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'meteo.json')  # Прогноз на диске между перезапусками
+# Чем рисовать график температуры: 'pillow' - легкий, без matplotlib; 'matplotlib' - прежний вид графика
+CHART_RENDERER = 'pillow'
+
+# Режим запуска ботов: 'asyncio' - общий цикл событий для опроса, 'threads' - поток на каждого бота
+BOT_RUNTIME = 'asyncio'
+RUNTIME_POLL_TIMEOUT = 20  # Таймаут длинного опроса Telegram (в секундах)
+
+# Способ получения обновлений: 'polling' - длинный опрос (см. BOT_RUNTIME), 'webhook' - HTTP-сервер (webhook.py)
+BOT_MODE = 'polling'
+WEBHOOK_HOST = '0.0.0.0'  # Адрес, на котором слушает сервер вебхуков
+WEBHOOK_PORT = 8080
+WEBHOOK_BASE_URL = ''  # Внешний адрес сервера (https://...); если пусто, вебхуки не регистрируются при запуске
+WEBHOOK_PATH = '/webhook'  # Боты получают пути /webhook/main и /webhook/support
+WEBHOOK_SECRET = ''  # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_QUEUE_SIZE = 1000  # Емкость очереди принятых обновлений; при переполнении сервер отвечает 503
+WEBHOOK_WORKERS = 4  # Задач, передающих обновления диспетчеру
+WEBHOOK_SHUTDOWN_TIMEOUT = 30  # Сколько секунд при остановке ждать обработки принятых обновлений
+
+# Диспетчер обработчиков: порядок внутри чата сохраняется, разные чаты обрабатываются параллельно
+DISPATCH_WORKERS = 16  # Потоков для быстрых обработчиков (меню, навигация)
+DISPATCH_HEAVY_WORKERS = 4  # Потоков для тяжелых обработчиков (@heavy: Selenium, графики)
+DISPATCH_MAX_PENDING = 200  # Сколько обновлений может одновременно ждать и выполняться; сверх этого прием приостанавливается
+DISPATCH_CLOSE_TIMEOUT = 30  # Сколько секунд ждать обработки принятых обновлений при остановке
+
+# Интервал фонового обновления ленты yarnews.net (в секундах)
+FEED_REFRESH_INTERVAL = 300
+
+# Пул headless-браузеров для недельных новостей и событий
+BROWSER_POOL_SIZE = 2  # Максимум одновременных сессий Chrome
+BROWSER_QUEUE_TIMEOUT = 120  # Сколько секунд запрос ждет свободную сессию
+BROWSER_MAX_RENDERS_PER_SESSION = 50  # После стольких загрузок сессия пересоздается
+
+# Минимальный интервал между правками сообщения о ходе загрузки (в секундах)
+PROGRESS_EDIT_INTERVAL = 1.5
+
+# Массовые рассылки (ежедневное уведомление)
+BROADCAST_GLOBAL_RATE = 25  # Сообщений в секунду на бота (лимит Telegram - около 30)
+BROADCAST_PER_CHAT_INTERVAL = 1.0  # Минимальный интервал между сообщениями в один чат (в секундах)
+BROADCAST_WORKERS = 8  # Параллельных отправителей
+BROADCAST_MAX_RETRIES = 3  # Повторов отправки после ответа 429
+
+# Фоновые уведомления бота поддержки (новые обращения и ответы)
+NOTIFY_WORKERS = 2  # Потоков отправки уведомлений
+NOTIFY_QUEUE_SIZE = 1000  # Емкость очереди уведомлений
+NOTIFY_RATE = 20  # Уведомлений в секунду на бота
+NOTIFY_MAX_RETRIES = 3  # Повторов отправки после ответа 429
+NOTIFY_CLOSE_TIMEOUT = 10  # Сколько секунд при остановке ждать отправки оставшихся уведомлений
+
+# Локальный архив статей yarnews.net для недельных выборок
+ARCHIVE_DB_FILE = 'articles.db'
+ARCHIVE_BACKFILL_COOLDOWN = 3600  # Не чаще раза в час догружаем архив через браузер
 
 # News categories
 NEWS_CATEGORIES = {
@@ -108,6 +164,26 @@ DATABASE = {
     'database': 'yaroslavl_bot'
 }
 
+# Единая база пользователей (database.py)
+USERS_DB_FILE = 'bot.db'
+LEGACY_USERS_DB_FILE = 'users.db'  # Старая база, данные из которой переносятся миграцией
+
+# Настройки соединений SQLite (database.py)
+DB_CACHE_SIZE_KB = 8192  # Размер кэша страниц на соединение (в КБ)
+DB_CACHED_STATEMENTS = 256  # Сколько подготовленных выражений хранит каждое соединение
+LAST_ACTIVE_FLUSH_INTERVAL = 5  # Как часто записывать время активности пользователей (в секундах)
+LAST_ACTIVE_FLUSH_SIZE = 500  # Досрочная запись при стольких ожидающих пользователях
+
+# Хранилище состояний диалогов (state_store.py, state_backends.py)
+# Где хранить состояния: 'memory' - в памяти процесса, 'sqlite' - в базе пользователей,
+# 'redis' - на сервере Redis (общий для нескольких рабочих процессов)
+STATE_BACKEND = 'sqlite'
+STATE_CACHE_SIZE = 10000  # Сколько пользователей держать в памяти на одно пространство состояний
+STATE_IDLE_TTL = 86400  # Через сколько секунд без изменений состояние диалога сбрасывается
+STATE_PURGE_INTERVAL = 3600  # Как часто удалять истекшие состояния из базы (в секундах)
+REDIS_URL = 'redis://localhost:6379/0'  # Адрес сервера Redis для STATE_BACKEND = 'redis'
+REDIS_KEY_PREFIX = 'novostyar'  # Префикс ключей бота в Redis
+
 # Настройки логирования
 LOGGING = {
     'version': 1,
@@ -144,6 +220,7 @@ YANDEX_API_KEY = 'c1ce85d9-9a90-4564-a5f1-a216250a180f'
 
 CACHE_DIR = os.path.join(os.path.dirname(__file__), 'Materials', 'cache')
 STATION_CACHE_FILE = os.path.join(CACHE_DIR, 'station_cache.json')
+MEDIA_CACHE_FILE = os.path.join(CACHE_DIR, 'media_file_ids.json')  # file_id загруженных в Telegram картинок и GIF
 CACHE_DURATION = 86400
 
 REQUEST_INTERVAL = 5
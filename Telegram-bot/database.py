@@ -2,8 +2,13 @@ import json
 import os
 import logging
 import sqlite3
-from config import CACHE_DIR, STATION_CACHE_FILE
-import datetime
+import atexit
+import threading
+from config import (
+    CACHE_DIR, STATION_CACHE_FILE, USERS_DB_FILE, LEGACY_USERS_DB_FILE, DB_CACHE_SIZE_KB, DB_CACHED_STATEMENTS,
+    LAST_ACTIVE_FLUSH_INTERVAL, LAST_ACTIVE_FLUSH_SIZE
+)
+from datetime import datetime, date
 
 # Настройка логгера
 logger = logging.getLogger('database')
@@ -20,40 +25,252 @@ console_handler.setFormatter(formatter)
 # Добавляем обработчик к логгеру
 logger.addHandler(console_handler)
 
-# Initialize user states dictionary
-user_states = {}
+class ConnectionManager:
+    """
+    Долгоживущие соединения с базой SQLite: по одному на поток.
+    Вместо открытия и закрытия файла на каждый запрос поток переиспользует
+    свое соединение, а SQLite - уже подготовленные выражения (cached_statements).
+    База переводится в режим WAL: чтение не блокирует запись, а
+    synchronous=NORMAL убирает fsync на каждый коммит.
+    Состояние транзакции соединения менеджер не трогает: начатую запись
+    фиксирует или откатывает тот, кто ее начал (удобнее всего блоком with conn:).
+    Соединением пользуется только создавший его поток; закрыть его можно из любого,
+    поэтому соединения завершившихся потоков закрываются при создании новых,
+    а остальные - в close_all при остановке бота.
+    """
+
+    def __init__(self, db_file):
+        """
+        :param db_file: Путь к файлу базы данных SQLite
+        """
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """
+        Возвращает соединение текущего потока, создавая его при первом обращении.
+        Соединение не нужно закрывать после запроса.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10, cached_statements=DB_CACHED_STATEMENTS,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._local.conn = conn
+            with self._lock:
+                finished = [thread for thread in self._connections if not thread.is_alive()]
+                stale = [self._connections.pop(thread) for thread in finished]
+                self._connections[threading.current_thread()] = conn
+            self._close(stale)
+        return conn
+
+    def _close(self, connections):
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии соединения с {self.db_file}: {e}")
+
+    def close_all(self):
+        """Закрывает соединения всех потоков (при остановке бота)."""
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+        self._close(connections)
+        # Соединение текущего потока закрыто - при следующем обращении будет создано новое
+        self._local.conn = None
+
+# Соединения с единой базой пользователей
+db = ConnectionManager(USERS_DB_FILE)
+atexit.register(db.close_all)
+
+def _add_missing_columns(cursor, columns):
+    """
+    Добавляет в таблицу users недостающие колонки. Вызывается только из миграций.
+    
+    Args:
+        cursor: Курсор открытой транзакции
+        columns (dict): Определения колонок {имя: тип и значение по умолчанию}
+    """
+    cursor.execute("PRAGMA table_info(users)")
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    for column_name, column_definition in columns.items():
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {column_name} {column_definition}")
+            logger.info(f"Добавлена колонка users.{column_name}")
+
+def _migration_create_users(cursor):
+    """Таблица пользователей в том виде, в котором ее создавал бот в bot.db."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            state TEXT,
+            first_start_time TIMESTAMP
+        )
+    ''')
+    # В старых базах bot.db колонок состояния и первого запуска могло не быть
+    _add_missing_columns(cursor, {'state': 'TEXT', 'first_start_time': 'TIMESTAMP'})
+
+def _migration_merge_users_columns(cursor):
+    """
+    Колонки, которые раньше были только в users.db:
+    registration_date - дата и время первой регистрации
+    last_active - дата и время последней активности
+    blocked - пользователь заблокировал бота, рассылки ему не отправляются
+    notifications_enabled - пользователь согласен получать ежедневные уведомления
+    """
+    _add_missing_columns(cursor, {
+        'registration_date': 'TIMESTAMP',
+        'last_active': 'TIMESTAMP',
+        'blocked': 'INTEGER DEFAULT 0',
+        'notifications_enabled': 'INTEGER DEFAULT 1',
+    })
+    # Пользователям, известным только по bot.db, датой регистрации считаем created_at.
+    # created_at хранится в UTC, а registration_date - в формате str(datetime) по местному времени
+    cursor.execute('''
+        UPDATE users
+        SET registration_date = strftime('%Y-%m-%d %H:%M:%f', created_at, 'localtime')
+        WHERE registration_date IS NULL AND created_at IS NOT NULL
+    ''')
+    cursor.execute('UPDATE users SET last_active = registration_date WHERE last_active IS NULL')
+
+def _migration_import_legacy_users(cursor):
+    """Переносит пользователей из старой базы users.db, если она есть."""
+    if not os.path.exists(LEGACY_USERS_DB_FILE):
+        return
+    if os.path.abspath(LEGACY_USERS_DB_FILE) == os.path.abspath(USERS_DB_FILE):
+        return
+
+    legacy_conn = sqlite3.connect(LEGACY_USERS_DB_FILE)
+    try:
+        legacy_columns = {row[1] for row in legacy_conn.execute("PRAGMA table_info(users)")}
+        if not legacy_columns:
+            return
+        # В старых версиях users.db колонок blocked и notifications_enabled еще не было
+        columns = {
+            'user_id': None,
+            'username': None,
+            'first_name': None,
+            'last_name': None,
+            'registration_date': None,
+            'last_active': None,
+            'blocked': '0',
+            'notifications_enabled': '1',
+        }
+        select_list = ', '.join(
+            name if name in legacy_columns else f"{default or 'NULL'} AS {name}"
+            for name, default in columns.items()
+        )
+        rows = legacy_conn.execute(f'SELECT {select_list} FROM users').fetchall()
+    finally:
+        legacy_conn.close()
+
+    # Данные users.db о регистрации, активности и блокировке точнее, чем created_at из bot.db
+    cursor.executemany('''
+        INSERT INTO users
+        (user_id, username, first_name, last_name, registration_date, last_active, blocked, notifications_enabled)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            username = COALESCE(users.username, excluded.username),
+            first_name = COALESCE(users.first_name, excluded.first_name),
+            last_name = COALESCE(users.last_name, excluded.last_name),
+            registration_date = COALESCE(excluded.registration_date, users.registration_date),
+            last_active = COALESCE(excluded.last_active, users.last_active),
+            blocked = excluded.blocked,
+            notifications_enabled = excluded.notifications_enabled
+    ''', rows)
+    logger.info(f"Перенесено пользователей из {LEGACY_USERS_DB_FILE}: {len(rows)}")
+
+def _migration_users_indexes(cursor):
+    """Индексы для выборки получателей рассылок и отчетов по активности."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_registration_date ON users (registration_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_last_active ON users (last_active)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)')
+
+def _migration_user_states(cursor):
+    """
+    Таблица состояний диалогов обоих ботов (см. state_store.py и state_backends.py).
+    Состояния, сохраненные раньше в колонке users.state, переносятся в пространство 'main'.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_states (
+            namespace TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (namespace, user_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_states_updated_at ON user_states (namespace, updated_at)')
+    cursor.execute('''
+        INSERT OR IGNORE INTO user_states (namespace, user_id, state, updated_at)
+        SELECT 'main', user_id, state, CAST(strftime('%s', 'now') AS REAL)
+        FROM users
+        WHERE state IS NOT NULL
+    ''')
+
+def _migration_state_sets(cursor):
+    """Множества для отсева повторов, например уже обработанных обновлений (см. state_backends.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS state_sets (
+            namespace TEXT NOT NULL,
+            member TEXT NOT NULL,
+            added_at REAL NOT NULL,
+            PRIMARY KEY (namespace, member)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_state_sets_added_at ON state_sets (namespace, added_at)')
+
+# Миграции схемы по порядку. Номер примененной миграции хранится в PRAGMA user_version,
+# поэтому новые миграции добавляются только в конец списка
+MIGRATIONS = [
+    _migration_create_users,
+    _migration_merge_users_columns,
+    _migration_import_legacy_users,
+    _migration_users_indexes,
+    _migration_user_states,
+    _migration_state_sets,
+]
+
+def migrate():
+    """
+    Применяет к базе еще не примененные миграции, каждую в отдельной транзакции.
+    
+    Returns:
+        int: Версия схемы после миграции
+    """
+    conn = db.connection()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            conn.execute('BEGIN')
+            migration(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Применена миграция {number}: {migration.__name__}")
+        version = number
+    return version
 
 def init_db():
     """
-    Создает базу данных и необходимые таблицы при первом запуске бота.
-    Если база данных уже существует, просто подключается к ней.
+    Создает базу данных и приводит ее схему к актуальной версии при запуске бота.
+    Если база данных уже актуальна, просто подключается к ней.
     """
     try:
-        # Подключаемся к базе данных (создаст файл users.db, если его нет)
-        conn = sqlite3.connect('users.db')
-        cursor = conn.cursor()
-        
-        # Создаем таблицу пользователей со следующими полями:
-        # user_id - уникальный идентификатор пользователя в Telegram
-        # username - имя пользователя в Telegram (опционально)
-        # first_name - имя пользователя
-        # last_name - фамилия пользователя (опционально)
-        # registration_date - дата и время первой регистрации
-        # last_active - дата и время последней активности
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                registration_date TIMESTAMP,
-                last_active TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        logger.info("База данных успешно инициализирована")
+        version = migrate()
+        logger.info(f"База данных успешно инициализирована (версия схемы {version})")
     except Exception as e:
         logger.error(f"Ошибка при инициализации базы данных: {e}")
 
@@ -69,70 +286,181 @@ def add_user(user_id, username=None, first_name=None, last_name=None):
         last_name (str, optional): Фамилия пользователя
     """
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.connection()
         cursor = conn.cursor()
         
         # Получаем текущее время для записи даты регистрации и последней активности
         current_time = datetime.now()
         
         # Используем INSERT OR IGNORE, чтобы не перезаписывать существующих пользователей
-        cursor.execute('''
-            INSERT OR IGNORE INTO users 
-            (user_id, username, first_name, last_name, registration_date, last_active)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, username, first_name, last_name, current_time, current_time))
+        with conn:
+            cursor.execute('''
+                INSERT OR IGNORE INTO users 
+                (user_id, username, first_name, last_name, registration_date, last_active)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, username, first_name, last_name, current_time, current_time))
         
-        conn.commit()
-        conn.close()
         logger.info(f"Пользователь {user_id} добавлен в базу данных")
     except Exception as e:
         logger.error(f"Ошибка при добавлении пользователя в базу данных: {e}")
 
+class LastActiveBuffer:
+    """
+    Отложенная запись времени последней активности.
+    Отметки копятся в памяти (для каждого пользователя - только последняя)
+    и записываются одной транзакцией раз в interval секунд или при
+    накоплении max_pending пользователей, поэтому обработка сообщений
+    никогда не ждет диска.
+    """
+
+    def __init__(self, interval=LAST_ACTIVE_FLUSH_INTERVAL, max_pending=LAST_ACTIVE_FLUSH_SIZE):
+        """
+        :param interval: Период записи на диск (в секундах)
+        :param max_pending: При таком числе ожидающих пользователей запись начинается досрочно
+        """
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def touch(self, user_id):
+        """Запоминает, что пользователь был активен сейчас."""
+        with self._lock:
+            self._pending[user_id] = datetime.now()
+            pending_count = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="LastActiveFlusher", daemon=True)
+                self._thread.start()
+        if pending_count >= self.max_pending:
+            self._wake.set()
+
+    def flush(self):
+        """Записывает накопленные отметки одной транзакцией."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            conn = db.connection()
+            with conn:
+                conn.executemany('''
+                    UPDATE users 
+                    SET last_active = ?, blocked = 0 
+                    WHERE user_id = ?
+                ''', [(active_at, user_id) for user_id, active_at in pending.items()])
+            logger.debug(f"Записано время активности {len(pending)} пользователей")
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении времени активности пользователей: {e}")
+            # Возвращаем отметки в буфер, не затирая более свежие
+            with self._lock:
+                for user_id, active_at in pending.items():
+                    self._pending.setdefault(user_id, active_at)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        """Останавливает фоновую запись и сбрасывает остаток на диск (при остановке бота)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+
+last_active_buffer = LastActiveBuffer()
+# Регистрируется после закрытия соединений, поэтому при выходе выполняется раньше него
+atexit.register(last_active_buffer.stop)
+
 def update_last_active(user_id):
     """
     Обновляет время последней активности пользователя.
     Вызывается при каждом взаимодействии пользователя с ботом.
+    Запись на диск выполняется в фоне пачками (см. LastActiveBuffer).
     
     Args:
         user_id (int): ID пользователя в Telegram
     """
-    try:
-        conn = sqlite3.connect('users.db')
-        cursor = conn.cursor()
-        
-        current_time = datetime.now()
-        cursor.execute('''
-            UPDATE users 
-            SET last_active = ? 
-            WHERE user_id = ?
-        ''', (current_time, user_id))
-        
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error(f"Ошибка при обновлении времени активности пользователя: {e}")
+    last_active_buffer.touch(user_id)
 
 def get_all_users():
     """
-    Получает список ID всех пользователей из базы данных.
+    Получает список ID всех пользователей, не заблокировавших бота.
     Используется для отправки ежедневных уведомлений.
     
     Returns:
         list: Список ID пользователей
     """
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT user_id FROM users')
+        cursor.execute('SELECT user_id FROM users WHERE blocked = 0')
         users = [row[0] for row in cursor.fetchall()]
         
-        conn.close()
         return users
     except Exception as e:
         logger.error(f"Ошибка при получении списка пользователей: {e}")
         return []
 
+def iter_broadcast_audience(registered_before, chunk_size=1000):
+    """
+    Выдает ID получателей рассылки пачками по chunk_size: зарегистрированных
+    раньше registered_before, не заблокировавших бота и не отключивших уведомления.
+    Каждая пачка - отдельный короткий запрос с продолжением после последнего
+    user_id, поэтому рассылка не держит открытым курсор (и снимок базы в режиме WAL)
+    все время отправки, а список целиком в памяти не собирается.
+    
+    Args:
+        registered_before (datetime): Граница даты регистрации
+        chunk_size (int): Сколько получателей выбирать за один запрос
+        
+    Yields:
+        int: ID пользователя
+    """
+    # ID пользователей Telegram положительные, поэтому первая пачка начинается после нуля
+    last_user_id = 0
+    while True:
+        cursor = db.connection().cursor()
+        try:
+            # Даты хранятся в формате str(datetime), поэтому сравниваются как строки
+            cursor.execute('''
+                SELECT user_id
+                FROM users
+                WHERE user_id > ? AND registration_date < ? AND blocked = 0 AND notifications_enabled = 1
+                ORDER BY user_id
+                LIMIT ?
+            ''', (last_user_id, str(registered_before), chunk_size))
+            user_ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        yield from user_ids
+        if len(user_ids) < chunk_size:
+            return
+        last_user_id = user_ids[-1]
+
+def mark_users_blocked(user_ids):
+    """
+    Помечает пользователей, заблокировавших бота, чтобы исключить их из рассылок.
+    Если пользователь снова напишет боту, пометка снимается (см. update_last_active).
+    
+    Args:
+        user_ids (list): ID пользователей в Telegram
+    """
+    try:
+        conn = db.connection()
+        cursor = conn.cursor()
+        with conn:
+            cursor.executemany('UPDATE users SET blocked = 1 WHERE user_id = ?', [(user_id,) for user_id in user_ids])
+        logger.info(f"Помечено заблокировавших бота пользователей: {len(user_ids)}")
+    except Exception as e:
+        logger.error(f"Ошибка при пометке заблокировавших бота пользователей: {e}")
+
 def is_new_user(user_id):
     """
     Проверяет, является ли пользователь новым (зарегистрировался менее 24 часов назад).
@@ -145,7 +473,7 @@ def is_new_user(user_id):
         bool: True если пользователь новый, False если нет
     """
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.connection()
         cursor = conn.cursor()
         
         # Получаем дату регистрации пользователя
@@ -156,7 +484,6 @@ def is_new_user(user_id):
         ''', (user_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         # Если пользователь не найден, считаем его новым
         if not result:
@@ -195,9 +522,9 @@ def save_user(user_id: int, username: str = None, first_name: str = None, last_n
             logger.info(f"User {user_id} not found, creating new record")
             # Insert new user
             cursor.execute('''
-                INSERT INTO users (user_id, username, first_name, last_name)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, username, first_name, last_name))
+                INSERT INTO users (user_id, username, first_name, last_name, registration_date, last_active)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, username, first_name, last_name, datetime.now(), datetime.now()))
             logger.info(f"Created new user record for user {user_id}")
         
         conn.commit()
@@ -213,9 +540,6 @@ def save_user(user_id: int, username: str = None, first_name: str = None, last_n
         if conn:
             conn.rollback()
         raise
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_user_ids():
     """Get all user IDs from database."""
@@ -235,9 +559,6 @@ def get_all_user_ids():
     except Exception as e:
         logger.error(f"Error retrieving users from database: {str(e)}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 def load_cache(cache_file):
     """Load data from cache file if it exists and is not expired."""
@@ -258,114 +579,9 @@ def save_cache(cache_file, data):
     except Exception as e:
         logging.error(f"Error saving cache to {cache_file}: {e}")
 
-def save_user_state(chat_id, state):
-    """Save user state to database."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        state_json = json.dumps(state, ensure_ascii=False)
-        cursor.execute('''
-            INSERT OR REPLACE INTO users (user_id, state)
-            VALUES (?, ?)
-        ''', (chat_id, state_json))
-        conn.commit()
-        logger.debug(f"User {chat_id} state saved: {state_json}")
-    except Exception as e:
-        logger.error(f"Error saving user state for {chat_id}: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
-
-def get_user_state(chat_id):
-    """Get user state from database."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT state FROM users WHERE user_id = ?', (chat_id,))
-        result = cursor.fetchone()
-        if result and result[0]:
-            state = json.loads(result[0])
-            logger.debug(f"User {chat_id} state retrieved: {state}")
-            return state
-        logger.debug(f"No state found for user {chat_id}")
-        return {}
-    except Exception as e:
-        logger.error(f"Error retrieving user state for {chat_id}: {e}")
-        return {}
-    finally:
-        if conn:
-            conn.close()
-
-def update_user_state(chat_id, new_state_data):
-    """Update user state in database."""
-    current_state = get_user_state(chat_id)
-    current_state.update(new_state_data)
-    save_user_state(chat_id, current_state)
-
-def ensure_users_table():
-    """Ensure users table exists with correct structure."""
-    conn = None
-    try:
-        logger.info("Checking users table structure...")
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Create users table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                state TEXT
-            )
-        ''')
-        
-        # Define all expected columns with their types and default values
-        expected_columns = {
-            'user_id': 'INTEGER PRIMARY KEY',
-            'username': 'TEXT',
-            'first_name': 'TEXT',
-            'last_name': 'TEXT',
-            'created_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
-            'updated_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
-            'state': 'TEXT',
-            'first_start_time': 'TIMESTAMP'
-        }
-
-        # Check for missing columns and add them
-        cursor.execute("PRAGMA table_info(users)")
-        existing_columns = {row[1] for row in cursor.fetchall()}
-        
-        for column_name, column_definition in expected_columns.items():
-            if column_name not in existing_columns:
-                # For simplicity, we are adding columns without NOT NULL or UNIQUE constraints
-                # and without default values for existing rows unless specified.
-                # If `first_start_time` is missing, it implies older schema, so we should add it without default.
-                if column_name == 'first_start_time':
-                    cursor.execute(f"ALTER TABLE users ADD COLUMN {column_name} {column_definition.replace('TIMESTAMP', '').strip()}")
-                else:
-                    cursor.execute(f"ALTER TABLE users ADD COLUMN {column_name} {column_definition}")
-                logger.warning(f"Added missing column: {column_name}")
-
-        conn.commit()
-        logger.info("Users table structure verified")
-    except Exception as e:
-        logger.error(f"Error ensuring users table: {str(e)}")
-        raise
-    finally:
-        if conn:
-            conn.close()
-
 def get_db_connection():
-    """Get database connection."""
-    return sqlite3.connect('bot.db')
+    """Get database connection (persistent, one per thread)."""
+    return db.connection()
 
 def is_user_new(user_id: int) -> bool:
     """Check if user was registered today."""
@@ -373,16 +589,13 @@ def is_user_new(user_id: int) -> bool:
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        today = datetime.date.today().strftime('%Y-%m-%d')
+        today = date.today().strftime('%Y-%m-%d')
         cursor.execute('SELECT COUNT(*) FROM users WHERE user_id = ? AND DATE(created_at) = ?', (user_id, today))
         count = cursor.fetchone()[0]
         return count > 0
     except Exception as e:
         logger.error(f"Error checking if user {user_id} is new: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def set_user_first_start_time(user_id: int):
     """Set the first start time for a user."""
@@ -390,13 +603,7 @@ def set_user_first_start_time(user_id: int):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute('UPDATE users SET first_start_time = CURRENT_TIMESTAMP WHERE user_id = ? AND first_start_time IS NULL', (user_id,))
-        conn.commit()
+        with conn:
+            cursor.execute('UPDATE users SET first_start_time = CURRENT_TIMESTAMP WHERE user_id = ? AND first_start_time IS NULL', (user_id,))
     except Exception as e:
         logger.error(f"Error setting first start time for user {user_id}: {e}")
-    finally:
-        if conn:
-            conn.close()
-
-# Call this function when module is imported
-ensure_users_table() 
\ No newline at end of file
@@ -0,0 +1,165 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import DISPATCH_WORKERS, DISPATCH_HEAVY_WORKERS, DISPATCH_MAX_PENDING, DISPATCH_CLOSE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+def heavy(handler):
+    """
+    Помечает обработчик как тяжелый (Selenium, графики, долгие запросы).
+    Такие обработчики выполняются в отдельном пуле и не занимают потоки,
+    которые обслуживают быструю навигацию по меню.
+    """
+    handler.heavy = True
+    return handler
+
+def _get_chat_id(update):
+    """Определяет чат, к которому относится обновление (сообщение или нажатие кнопки)"""
+    chat = getattr(update, 'chat', None)
+    if chat is None:
+        message = getattr(update, 'message', None)
+        chat = getattr(message, 'chat', None)
+    if chat is not None:
+        return chat.id
+    from_user = getattr(update, 'from_user', None)
+    return from_user.id if from_user is not None else None
+
+class ChatOrderedDispatcher:
+    """
+    Замена пула потоков TeleBot (bot.worker_pool).
+    Обновления разных чатов обрабатываются параллельно, а обновления одного
+    чата - строго по очереди, в порядке поступления. Тяжелые обработчики
+    (помеченные @heavy) выполняются в отдельном медленном пуле.
+    Одновременно принято не больше max_pending обновлений (ожидающих и выполняемых):
+    когда лимит исчерпан, put ждет завершения обработчиков, и прием новых
+    обновлений (опрос или разбор очереди вебхука) приостанавливается.
+    """
+
+    def __init__(self, bot, workers=DISPATCH_WORKERS, heavy_workers=DISPATCH_HEAVY_WORKERS,
+                 max_pending=DISPATCH_MAX_PENDING):
+        """
+        :param bot: Экземпляр TeleBot, для которого выполняются обработчики
+        :param workers: Количество потоков быстрого пула
+        :param heavy_workers: Количество потоков пула тяжелых обработчиков
+        :param max_pending: Сколько обновлений может одновременно ждать и выполняться
+        """
+        self.bot = bot
+        self._fast = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Dispatch")
+        self._slow = ThreadPoolExecutor(max_workers=heavy_workers, thread_name_prefix="DispatchHeavy")
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._queues = {}  # chat_id -> очередь ожидающих задач этого чата
+        self._pending = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._closed = False
+        # Интерфейс util.ThreadPool: TeleBot ждет это событие при опросе
+        self.exception_event = threading.Event()
+
+    def _is_heavy(self, update, handlers):
+        """Проверяет, помечен ли @heavy обработчик, который сработает на обновление"""
+        try:
+            for handler in handlers or []:
+                if self.bot._test_message_handler(handler, update):
+                    return getattr(handler['function'], 'heavy', False)
+        except Exception as e:
+            logger.debug(f"[DISPATCH] Failed to test handlers: {e}")
+        return False
+
+    def put(self, task, *args, **kwargs):
+        """
+        Ставит задачу TeleBot в очередь (вызывается из TeleBot._exec_task).
+        Если принято уже max_pending обновлений, ждет, пока какое-нибудь из них обработается.
+        :param task: Функция обработки, первым аргументом получает обновление
+        """
+        update = args[0] if args else None
+        chat_id = _get_chat_id(update)
+        pool = self._slow if self._is_heavy(update, kwargs.get('handlers')) else self._fast
+        job = (pool, task, args, kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            logger.warning("[DISPATCH] Too many pending updates, waiting for handlers to finish.")
+            self._slots.acquire()
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                logger.warning("[DISPATCH] Dispatcher is closed, update dropped.")
+                return
+            self._pending += 1
+            if chat_id is not None:
+                queue = self._queues.get(chat_id)
+                if queue is not None:
+                    # В чате уже выполняется задача, ждем своей очереди
+                    queue.append(job)
+                    return
+                self._queues[chat_id] = deque()
+
+        pool.submit(self._run, chat_id, job)
+
+    def _run(self, chat_id, job):
+        _, task, args, kwargs = job
+        try:
+            task(*args, **kwargs)
+        except Exception as e:
+            handled = False
+            if self.bot.exception_handler is not None:
+                try:
+                    handled = self.bot.exception_handler.handle(e)
+                except Exception:
+                    pass
+            if not handled:
+                logger.error(f"[DISPATCH] Error in handler for chat {chat_id}: {e}", exc_info=True)
+
+        next_job = None
+        with self._lock:
+            self._pending -= 1
+            if chat_id is not None:
+                queue = self._queues[chat_id]
+                if queue:
+                    next_job = queue.popleft()
+                else:
+                    del self._queues[chat_id]
+            if self._pending == 0:
+                self._drained.notify_all()
+        self._slots.release()
+
+        if next_job is not None:
+            try:
+                next_job[0].submit(self._run, chat_id, next_job)
+            except RuntimeError:
+                logger.warning(f"[DISPATCH] Dispatcher shut down, queued updates for chat {chat_id} dropped.")
+
+    def raise_exceptions(self):
+        # Ошибки обработчиков логируются и не прерывают опрос
+        pass
+
+    def clear_exceptions(self):
+        self.exception_event.clear()
+
+    def close(self, timeout=DISPATCH_CLOSE_TIMEOUT):
+        """
+        Прекращает прием новых обновлений и дожидается уже принятых
+        :param timeout: Сколько секунд ждать завершения очередей
+        """
+        with self._lock:
+            self._closed = True
+            if not self._drained.wait_for(lambda: self._pending == 0, timeout=timeout):
+                logger.warning(f"[DISPATCH] {self._pending} updates still pending on close.")
+        self._fast.shutdown(wait=False)
+        self._slow.shutdown(wait=False)
+
+def install_dispatcher(bot):
+    """
+    Подключает к боту диспетчер с очередностью по чатам вместо стандартного пула TeleBot
+    :param bot: Экземпляр TeleBot
+    :return: Установленный диспетчер
+    """
+    worker_pool = getattr(bot, 'worker_pool', None)
+    if isinstance(worker_pool, ChatOrderedDispatcher):
+        return worker_pool
+    if worker_pool is not None:
+        worker_pool.close()
+    bot.threaded = True
+    bot.worker_pool = ChatOrderedDispatcher(bot)
+    return bot.worker_pool
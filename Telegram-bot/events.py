@@ -1,15 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 from datetime import datetime, timedelta
-import re
-import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
+from yarnews_feed import feed_store, backfill_archive
+from article_archive import article_archive
+from keywords import EVENT_KEYWORDS
+from classifier import tag, has_table_tag, EVENT, EVENT_NEGATIVE, EVENT_ADMIN
 
 # Настройка логирования
 logging.basicConfig(
@@ -42,201 +36,13 @@ event_types = {
     "мероприятие": "Мероприятие 📅"
 }
 
-def get_events_by_category(category, limit_days=1, specific_date=None, week_range=False):
+def get_events_by_category(category, limit_days=1, specific_date=None, week_range=False, progress=None):
     """Fetch events from yarnews.net."""
     try:
         logging.info(f"[EVENTS] Starting get_events_by_category for category: {category}, limit_days: {limit_days}, week_range: {week_range}")
         
-        url = "https://www.yarnews.net/"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        
-        event_keywords = {
-            "culture": {
-                "keywords": [
-                    "выставка", "концерт", "спектакль", "театр", "музей", "галерея",
-                    "культурный", "творческий", "искусство", "музыкальный", "литературный", "поэтический",
-                    "художественный", "творческая встреча", "культурная программа", "культурное событие",
-                    "открытие выставки", "перформанс", "инсталляция", "библиотека",
-                    "фестиваль", "праздник", "празднование", "торжество", "юбилей",
-                    "награждение", "победа", "достижение", "успех", "признание",
-                    "открытие", "презентация", "премьера", "дебют", "возрождение",
-                    "реставрация", "реконструкция", "обновление", "развитие", "прогресс"
-                ],
-                "negative_keywords": [
-                    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-                    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-                    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-                    "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
-                    "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
-                    "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
-                    "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
-                ]
-            },
-            "sport": {
-                "keywords": [
-                    "соревнование", "турнир", "чемпионат", "спортивный", "матч", "победа",
-                    "спорт", "тренировка", "сбор", "олимпиада", "спартакиада", "эстафета", "забег",
-                    "пробег", "кросс", "соревнования", "спортивное мероприятие",
-                    "спортивный праздник", "спортивный фестиваль", "спортивный турнир", "спортивные игры",
-                    "спортивный матч", "спортивное соревнование", "спортивный сбор", "спортивная тренировка",
-                    "Локомотив", "КХЛ", "хоккей", "футбол", "баскетбол", "волейбол",
-                    "награждение", "медаль", "кубок", "трофей", "чемпион", "рекорд",
-                    "достижение", "успех", "победа", "триумф", "лидерство", "первенство",
-                    # Добавляем новые ключевые слова для хоккея
-                    "хоккейный", "хоккеист", "хоккейная команда", "хоккейный клуб", "хоккейный матч",
-                    "хоккейный турнир", "хоккейное соревнование", "хоккейный сезон", "хоккейная лига",
-                    "Кубок Гагарина", "плей-офф", "регулярный чемпионат", "хоккейная арена",
-                    "хоккейная школа", "хоккейная академия", "хоккейная тренировка", "хоккейный сбор",
-                    "хоккейный тренер", "хоккейная сборная", "хоккейный стадион", "хоккейный матч",
-                    "хоккейный турнир", "хоккейное первенство", "хоккейный чемпионат", "хоккейная победа",
-                    "хоккейный гол", "хоккейная шайба", "хоккейная клюшка", "хоккейные коньки",
-                    "хоккейная форма", "хоккейная экипировка", "хоккейный судья", "хоккейный арбитр",
-                    "хоккейный рефери", "хоккейный матч", "хоккейная игра", "хоккейный период",
-                    "хоккейный овертайм", "хоккейный буллит", "хоккейный пенальти", "хоккейный штраф",
-                    "хоккейная скамейка", "хоккейная раздевалка", "хоккейный тренер", "хоккейный менеджер",
-                    "хоккейный директор", "хоккейный президент", "хоккейный клуб", "хоккейная команда",
-                    "хоккейный игрок", "хоккейный вратарь", "хоккейный защитник", "хоккейный нападающий",
-                    "хоккейный форвард", "хоккейный центр", "хоккейный край", "хоккейный капитан",
-                    "хоккейный ассистент", "хоккейный бомбардир", "хоккейный снайпер", "хоккейный пас",
-                    "хоккейная передача", "хоккейный бросок", "хоккейный удар", "хоккейный отбор",
-                    "хоккейная борьба", "хоккейный силовой прием", "хоккейный фол", "хоккейный штраф",
-                    "хоккейная дисквалификация", "хоккейное удаление", "хоккейный матч", "хоккейная игра",
-                    "хоккейный турнир", "хоккейное соревнование", "хоккейный чемпионат", "хоккейное первенство",
-                    "хоккейная лига", "хоккейный дивизион", "хоккейная конференция", "хоккейный плей-офф",
-                    "хоккейный финал", "хоккейный полуфинал", "хоккейный четвертьфинал", "хоккейный матч",
-                    "хоккейная игра", "хоккейный период", "хоккейный овертайм", "хоккейный буллит",
-                    "хоккейный пенальти", "хоккейный штраф", "хоккейная скамейка", "хоккейная раздевалка",
-                    "хоккейный тренер", "хоккейный менеджер", "хоккейный директор", "хоккейный президент",
-                    "хоккейный клуб", "хоккейная команда", "хоккейный игрок", "хоккейный вратарь",
-                    "хоккейный защитник", "хоккейный нападающий", "хоккейный форвард", "хоккейный центр",
-                    "хоккейный край", "хоккейный капитан", "хоккейный ассистент", "хоккейный бомбардир",
-                    "хоккейный снайпер", "хоккейный пас", "хоккейная передача", "хоккейный бросок",
-                    "хоккейный удар", "хоккейный отбор", "хоккейная борьба", "хоккейный силовой прием",
-                    "хоккейный фол", "хоккейный штраф", "хоккейная дисквалификация", "хоккейное удаление"
-                ],
-                "negative_keywords": [
-                    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-                    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-                    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-                    "травма", "повреждение", "ушиб", "перелом", "растяжение", "вывих",
-                    "поражение", "проигрыш", "неудача", "провал", "дисквалификация", "нарушение",
-                    "допинг", "скандал", "конфликт", "спор", "разногласие", "протест",
-                    "отмена", "перенос", "задержка", "проблема", "трудность", "сложность",
-                    # Добавляем негативные ключевые слова для хоккея
-                    "травма", "повреждение", "ушиб", "перелом", "растяжение", "вывих",
-                    "поражение", "проигрыш", "неудача", "провал", "дисквалификация", "нарушение",
-                    "допинг", "скандал", "конфликт", "спор", "разногласие", "протест",
-                    "отмена", "перенос", "задержка", "проблема", "трудность", "сложность",
-                    "хоккейная травма", "хоккейное повреждение", "хоккейный ушиб", "хоккейный перелом",
-                    "хоккейное растяжение", "хоккейный вывих", "хоккейное поражение", "хоккейный проигрыш",
-                    "хоккейная неудача", "хоккейный провал", "хоккейная дисквалификация", "хоккейное нарушение",
-                    "хоккейный допинг", "хоккейный скандал", "хоккейный конфликт", "хоккейный спор",
-                    "хоккейное разногласие", "хоккейный протест", "хоккейная отмена", "хоккейный перенос",
-                    "хоккейная задержка", "хоккейная проблема", "хоккейная трудность", "хоккейная сложность"
-                ]
-            },
-            "education": {
-                "keywords": [
-                    "лекция", "семинар", "конференция", "форум", "образование", "обучение", "курс",
-                    "школа", "университет", "академия", "институт", "колледж", "училище", "лицей",
-                    "гимназия", "образовательный", "учебный", "научный", "исследование", "проект",
-                    "встреча", "дискуссия", "круглый стол", "мастер-класс", "тренинг", "практикум",
-                    "выпускной", "выпуск", "диплом", "сертификат", "аттестат", "награждение",
-                    "олимпиада", "конкурс", "соревнование", "победа", "достижение", "успех",
-                    "открытие", "праздник", "торжество", "юбилей", "премьера", "дебют"
-                ],
-                "negative_keywords": [
-                    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-                    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-                    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-                    "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
-                    "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
-                    "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
-                    "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
-                ]
-            },
-            "entertainment": {
-                "keywords": [
-                    "развлечение", "игра", "празднование", "торжество",
-                    "вечеринка", "дискотека", "карнавал", "маскарад", "бал", "праздничный", "развлекательный",
-                    "досуговый", "досуг", "отдых", "развлечения",
-                    "досуговое мероприятие", "праздничная программа", "развлекательная программа", "досуговая программа",
-                    "фестиваль", "праздник", "юбилей", "открытие", "премьера", "дебют",
-                    "награждение", "победа", "достижение", "успех", "признание",
-                    "концерт", "шоу", "представление", "спектакль", "выступление"
-                ],
-                "negative_keywords": [
-                    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-                    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-                    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-                    "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
-                    "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
-                    "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
-                    "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
-                ]
-            },
-            "concerts": {
-                "keywords": [
-                    "концерт", "выступление", "музыка", "музыкальный", "оркестр", "ансамбль", "группа",
-                    "исполнитель", "певец", "певица", "музыкант", "композитор", "дирижер", "солист",
-                    "вокалист", "инструменталист", "музыкальное выступление", "музыкальный концерт",
-                    "музыкальное мероприятие", "музыкальный фестиваль", "музыкальный праздник", "музыкальное шоу",
-                    "музыкальная программа", "музыкальное представление", "музыкальное действо", "музыкальное событие",
-                    "премьера", "дебют", "открытие", "праздник", "торжество", "юбилей",
-                    "награждение", "победа", "достижение", "успех", "признание"
-                ],
-                "negative_keywords": [
-                    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-                    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-                    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-                    "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
-                    "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
-                    "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
-                    "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
-                ]
-            }
-        }
-        
-        # Список слов, которые указывают на административные новости
-        administrative_keywords = [
-            "министр", "губернатор", "мэр", "администрация", "департамент", "управление",
-            "советник", "заместитель", "руководитель", "директор", "начальник", "перевод",
-            "назначение", "отставка", "увольнение", "прием", "встреча", "совещание",
-            "утверждение", "проект", "строительство", "дорога", "магистраль", "трасса",
-            "разработка", "планирование", "реконструкция", "ремонт", "благоустройство",
-            "комиссия", "заседание", "доклад", "отчет", "решение", "постановление", "распоряжение",
-            "омбудсмен", "форум",
-            "конкурс", "тендер", "закупка", "госзакупка", "контракт", "муниципальный контракт",
-            "бюджет", "финансы", "экономика", "инвестиции", "предприятие", "бизнес", "налог", "субсидия",
-            "жкх", "коммунальный", "тариф", "услуги",
-            "городской", "областной", "региональный", "районный", "муниципальный", # Re-adding with caution, rely more on other keywords
-            "открытие", "закрытие", "начало", "завершение", "итоги", "планы", "перспективы",
-            "создание", "развитие", "реализация", "проведение", "организация"
-        ]
-        
-        # Общие негативные ключевые слова для всех категорий событий (для фильтрации "негативных" новостей)
-        general_negative_keywords = [
-            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
-            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
-            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
-            "конфликт", "протест", "запрет", "отмена", "закрытие", "ликвидация", "угроза",
-            "катастрофа", "чрезвычайная ситуация", "эвакуация", "пострадавшие", "жертвы",
-            "больница", "травма", "болезнь", "эпидемия", "карантин", "ограничения",
-            "отключение", "прорыв", "утечка", "загрязнение", "отходы", "свалка",
-            "долг", "банкротство", "убытки", "сокращение",
-            "уголовное дело", "административное дело", "проверка", "расследование"
-        ]
-        
-        category_data = event_keywords.get(category)
+        category_data = EVENT_KEYWORDS.get(category)
         keywords = category_data.get("keywords", []) if category_data else []
-        # Объединяем специфичные негативные ключевые слова с общими
-        negative_keywords = list(set(category_data.get("negative_keywords", []) if category_data else []).union(set(general_negative_keywords)))
 
         if not keywords and category:
             logging.info(f"[EVENTS] No keywords found for category: {category}. Returning empty list.")
@@ -245,153 +51,24 @@ def get_events_by_category(category, limit_days=1, specific_date=None, week_rang
         try:
             logging.info(f"[EVENTS] Attempting to fetch events for category: {category}, week_range: {week_range}")
 
-            page_source = None
-
             if week_range:
-                logging.info("[EVENTS] Using Selenium for weekly events.")
-                chrome_options = Options()
-                chrome_options.add_argument('--headless')
-                chrome_options.add_argument('--no-sandbox')
-                chrome_options.add_argument('--disable-dev-shm-usage')
-                chrome_options.add_argument('--disable-gpu')
-                chrome_options.add_argument('--window-size=1920,1080')
-                chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-
-                driver = webdriver.Chrome(options=chrome_options)
-                driver.set_page_load_timeout(45)
-
-                try:
-                    driver.get(url)
-                    logging.info("[EVENTS] Page loaded successfully with Selenium.")
-
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "news-feed"))
-                    )
-                    logging.info("[EVENTS] Initial news feed loaded with Selenium.")
-
-                    # Увеличиваем количество циклов прокрутки для событий
-                    scroll_and_click_cycles = 15
-                    scroll_amount = 700
-
-                    logging.info(f"[EVENTS] Starting scroll and click cycles ({scroll_and_click_cycles} cycles) for events.")
-
-                    for cycle in range(scroll_and_click_cycles):
-                        logging.info(f"[EVENTS] Scroll/Click cycle {cycle + 1} of {scroll_and_click_cycles}")
-                        driver.execute_script(f"window.scrollBy(0, {scroll_amount});")
-                        time.sleep(3)
-
-                        selectors = [
-                            "//button[contains(@class, 'js-nexter')]",
-                            "//button[contains(text(), 'больше новостей')]",
-                            "//button[contains(text(), 'еще новости')]",
-                            "//a[contains(@class, 'js-nexter')]",
-                            "//a[contains(text(), 'больше новостей')]",
-                            "//a[contains(text(), 'еще новости')]",
-                            "//div[contains(@class, 'js-nexter')]",
-                            "//div[contains(text(), 'больше новостей')]",
-                            "//div[contains(text(), 'еще новости')]",
-                        ]
-
-                        buttons = []
-                        for selector in selectors:
-                            try:
-                                elements = driver.find_elements(By.XPATH, selector)
-                                buttons.extend(elements)
-                            except Exception as e:
-                                logging.debug(f"[EVENTS] Error finding elements with selector {selector}: {str(e)}")
-                                continue
-
-                        seen = set()
-                        buttons = [x for x in buttons if not (x in seen or seen.add(x))]
-
-                        clicked_count = 0
-                        for button in buttons:
-                            try:
-                                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-                                time.sleep(1)
-
-                                is_visible = driver.execute_script("""
-                                    const rect = arguments[0].getBoundingClientRect();
-                                    const style = window.getComputedStyle(arguments[0]);
-                                    return (
-                                        rect.top >= 0 &&
-                                        rect.left >= 0 &&
-                                        rect.bottom <= (window.innerHeight || document.documentElement.clientHeight) &&
-                                        rect.right <= (window.innerWidth || document.documentElement.clientWidth) &&
-                                        style.display !== 'none' &&
-                                        style.visibility !== 'hidden' &&
-                                        style.opacity !== '0'
-                                    );
-                                """, button)
-
-                                if is_visible:
-                                    try:
-                                        driver.execute_script("arguments[0].click();", button)
-                                        clicked_count += 1
-                                        logging.info(f"[EVENTS] Successfully clicked button {clicked_count} using JavaScript in cycle {cycle + 1}")
-                                    except Exception as e1:
-                                        try:
-                                            from selenium.webdriver.common.action_chains import ActionChains
-                                            ActionChains(driver).move_to_element(button).click().perform()
-                                            clicked_count += 1
-                                            logging.info(f"[EVENTS] Successfully clicked button {clicked_count} using Actions in cycle {cycle + 1}")
-                                        except Exception as e2:
-                                            try:
-                                                button.click()
-                                                clicked_count += 1
-                                                logging.info(f"[EVENTS] Successfully clicked button {clicked_count} using direct click in cycle {cycle + 1}")
-                                            except Exception as e3:
-                                                logging.error(f"[EVENTS] All click methods failed for button in cycle {cycle + 1}: {str(e1)}, {str(e2)}, {str(e3)}")
-                                                continue
-                                time.sleep(2)
-
-                            except Exception as e:
-                                logging.error(f"[EVENTS] Error processing button in cycle {cycle + 1}: {str(e)}")
-                                continue
-
-                        logging.info(f"[EVENTS] Clicked {clicked_count} 'больше новостей' buttons in cycle {cycle + 1}")
-
-                        if clicked_count == 0 and cycle > 0:
-                            logging.info("[EVENTS] No more 'больше новостей' buttons found or clickable. Ending cycles.")
-                            break
-
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(3)
-                    logging.info("[EVENTS] Completed scroll/click cycles and scrolled to the bottom.")
-
-                    page_source = driver.page_source
-                    logging.info("[EVENTS] Got final page source after all loading attempts with Selenium.")
-
-                except TimeoutException:
-                    logging.error("[EVENTS] Timeout while loading page with Selenium")
-                    return []
-                except Exception as e:
-                    logging.error(f"[EVENTS] Error during page processing with Selenium: {e}")
-                    return []
-                finally:
-                    driver.quit()
+                # Недельные события берем из локального архива, догружая его через браузер только при пропусках
+                logging.info("[EVENTS] Using article archive for weekly events.")
+                today_start = datetime.combine(datetime.now().date(), datetime.min.time())
+                week_start = today_start - timedelta(days=7)
+                backfill_archive(week_start, max_cycles=15, progress=progress, log_prefix="[EVENTS]")
+                articles = article_archive.get_articles(
+                    week_start, today_start - timedelta(days=2),
+                    tag=tag(EVENT, category) if category else None
+                )
 
             else:
-                # Use requests and BeautifulSoup for recent events (faster)
-                logging.info("[EVENTS] Using requests and BeautifulSoup for recent events.")
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers)
-                response.raise_for_status() # Raise an exception for bad status codes
-                page_source = response.text
-                logging.info("[EVENTS] Got page source with requests.")
-
-            soup = BeautifulSoup(page_source, 'html.parser')
-
-            news_item_elements = soup.select(".news-feed-item") # Assuming event items also use this class
-            logging.info(f"[EVENTS] Found {len(news_item_elements)} news items with BeautifulSoup after initial fetch.")
+                # Для недавних событий используем общую ленту, обновляемую в фоне
+                logging.info("[EVENTS] Using shared feed store for recent events.")
+                articles = feed_store.get_articles()
 
             events = []
-            seen_urls = set()
             today = datetime.now()
-            today_str = today.strftime("%d.%m.%Y")
-            yesterday = (today - timedelta(days=1)).strftime("%d.%m.%Y")
 
             if specific_date:
                 try:
@@ -413,136 +90,73 @@ def get_events_by_category(category, limit_days=1, specific_date=None, week_rang
                 end_date_exclusive = today + timedelta(days=1)  # Исключаем завтрашний день
                 logging.info(f"[EVENTS] Filtering for recent events (today and yesterday): {start_date_inclusive.date().strftime('%d.%m.%Y')} - {end_date_exclusive.date().strftime('%d.%m.%Y')} (exclusive)")
             
-            for item in news_item_elements:
+            for article in articles:
+                title = article["title"]
+                description = article["description"]
+                link = article["link"]
+                pub_date_dt = article["datetime"]
                 try:
-                    title_elem = item.find("a", class_="news-name") or item.find("h2") or item.find("h3") or item
-                    if not title_elem:
-                        logging.debug("[EVENTS] No title element found for an item. Skipping.")
-                        continue
-                        
-                    title = title_elem.text.strip()
-                    link = title_elem.get("href", "")
-                    if not link.startswith("http"):
-                        link = "https://www.yarnews.net" + link
-
-                    if link in seen_urls:
-                        logging.info(f"[EVENTS] [SKIP] Event ('{title}'): duplicate link.")
-                        continue # Skip duplicate events
-                    seen_urls.add(link)
-
-                    desc_elem = (
-                        item.find("div", class_="news-excerpt") or
-                        item.find("div", class_="description") or
-                        item.find("p") or
-                        item.find_next("p")
-                    )
-                    description = desc_elem.text.strip() if desc_elem else ""
-
-                    # Получаем дату публикации
-                    pub_date_elem = (
-                        item.find("span", class_="news-date") or
-                        item.find("span", class_="date") or
-                        item.find("time") or
-                        item.find_previous("span", class_="date")
-                    )
-                    pub_date = pub_date_elem.text.strip() if pub_date_elem else today_str
-
                     # Проверяем, что новость опубликована в нужном диапазоне
-                    try:
-                        # Parse datetime similar to news.py
-                        try:
-                            pub_date_dt = datetime.strptime(pub_date, "%d.%m.%Y в %H:%M")
-                        except ValueError:
-                            try:
-                                pub_date_dt = datetime.strptime(pub_date, "%d.%m.%Y")
-                            except ValueError:
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): date parse error ('{pub_date}').")
-                                continue
-
-                        if week_range:
-                            # Для недельных событий
-                            if not (start_date_inclusive.date() <= pub_date_dt.date() < end_date_exclusive.date()):
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in adjusted week range ({start_date_inclusive.date().strftime('%d.%m.%Y')} - {end_date_exclusive.date().strftime('%d.%m.%Y')} exclusive). Event date: {pub_date_dt.date().strftime('%d.%m.%Y')}.")
-                                continue
-                        elif specific_date:
-                            # Для конкретной даты
-                            if not (date_limit <= pub_date_dt <= date_max):
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in date range ({date_limit.date().strftime('%d.%m.%Y')} - {date_max.date().strftime('%d.%m.%Y')}).")
-                                continue
-                        else:
-                            # Для недавних событий (сегодня и вчера)
-                            if not (start_date_inclusive.date() <= pub_date_dt.date() < end_date_exclusive.date()):
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in recent range (today and yesterday). Event date: {pub_date_dt.date().strftime('%d.%m.%Y')}.")
-                                continue
-
-                        title_lower = title.lower()
-                        desc_lower = description.lower()
-                        
-                        # Проверяем на административные новости (temporarily commented out for debugging)
-                        is_administrative = any(keyword.lower() in title_lower or keyword.lower() in desc_lower 
-                                              for keyword in administrative_keywords)
-                        if is_administrative:
-                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): contains administrative keyword (filter temporarily disabled).")
-                            # continue # Temporarily disabled
-                        
-                        # --- Проверка на негативные ключевые слова (temporarily commented out for debugging) ---
-                        is_negative = False
-                        for neg_keyword in negative_keywords:
-                            if neg_keyword.lower() in title_lower or neg_keyword.lower() in desc_lower:
-                                is_negative = True
-                                logging.debug(f"[EVENTS] Excluding event due to negative keyword '{neg_keyword}' in title or description (filter temporarily disabled).")
-                                break # Нашли негативное слово, можно пропустить событие
-                        
-                        if is_negative:
-                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): contains negative keyword (filter temporarily disabled).")
-                            # continue # Temporarily disabled
-                        
-                        # Main category matching logic: Check if the event matches keywords for the *requested* category.
-                        event_matches_requested_category = False
-                        if category: # A specific category is requested (e.g., 'culture', 'sport')
-                            current_category_keywords = event_keywords.get(category, {}).get("keywords", [])
-                            if any(keyword.lower() in title_lower or keyword.lower() in desc_lower for keyword in current_category_keywords):
-                                event_matches_requested_category = True
-                            else:
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): does not match keywords for requested category '{category}'.")
-                        else: # No specific category requested, include if it matches *any* event type
-                            for cat_key in event_keywords: # Iterate through all known event categories
-                                current_category_keywords = event_keywords.get(cat_key, {}).get("keywords", [])
-                                if any(keyword.lower() in title_lower or keyword.lower() in desc_lower for keyword in current_category_keywords):
-                                    event_matches_requested_category = True
-                                    break # Found at least one matching event category
-                            if not event_matches_requested_category:
-                                logging.info(f"[EVENTS] [SKIP] Event ('{title}'): does not match any event category keywords (no specific category requested).")
-
-                        if not event_matches_requested_category:
+                    if week_range:
+                        # Для недельных событий
+                        if not (start_date_inclusive.date() <= pub_date_dt.date() < end_date_exclusive.date()):
+                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in adjusted week range ({start_date_inclusive.date().strftime('%d.%m.%Y')} - {end_date_exclusive.date().strftime('%d.%m.%Y')} exclusive). Event date: {pub_date_dt.date().strftime('%d.%m.%Y')}.")
+                            continue
+                    elif specific_date:
+                        # Для конкретной даты
+                        if not (date_limit <= pub_date_dt <= date_max):
+                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in date range ({date_limit.date().strftime('%d.%m.%Y')} - {date_max.date().strftime('%d.%m.%Y')}).")
+                            continue
+                    else:
+                        # Для недавних событий (сегодня и вчера)
+                        if not (start_date_inclusive.date() <= pub_date_dt.date() < end_date_exclusive.date()):
+                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): not in recent range (today and yesterday). Event date: {pub_date_dt.date().strftime('%d.%m.%Y')}.")
                             continue
 
-                        # Получаем URL изображения, если есть
-                        image_url = None
-                        img_elem = item.find("img")
-                        if img_elem and img_elem.get("src"):
-                            image_url = img_elem["src"]
-                            if not image_url.startswith("http"):
-                                image_url = "https://www.yarnews.net" + image_url
+                    # Категории статьи уже вычислены при загрузке ленты, здесь только проверяем теги
+                    tags = article["tags"]
+
+                    # Проверяем на административные новости (temporarily commented out for debugging)
+                    is_administrative = tag(EVENT_ADMIN) in tags
+                    if is_administrative:
+                        logging.info(f"[EVENTS] [SKIP] Event ('{title}'): contains administrative keyword (filter temporarily disabled).")
+                        # continue # Temporarily disabled
+                    
+                    # --- Проверка на негативные ключевые слова (temporarily commented out for debugging) ---
+                    # Специфичные негативные слова категории объединяются с общими
+                    is_negative = tag(EVENT_NEGATIVE) in tags or tag(EVENT_NEGATIVE, category) in tags
+                    
+                    if is_negative:
+                        logging.info(f"[EVENTS] [SKIP] Event ('{title}'): contains negative keyword (filter temporarily disabled).")
+                        # continue # Temporarily disabled
+                    
+                    # Main category matching logic: Check if the event matches keywords for the *requested* category.
+                    if category: # A specific category is requested (e.g., 'culture', 'sport')
+                        event_matches_requested_category = tag(EVENT, category) in tags
+                        if not event_matches_requested_category:
+                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): does not match keywords for requested category '{category}'.")
+                    else: # No specific category requested, include if it matches *any* event type
+                        event_matches_requested_category = has_table_tag(tags, EVENT)
+                        if not event_matches_requested_category:
+                            logging.info(f"[EVENTS] [SKIP] Event ('{title}'): does not match any event category keywords (no specific category requested).")
 
-                        event = {
-                            'title': title,
-                            'description': description,
-                            'date': pub_date_dt.strftime("%d.%m.%Y"),
-                            'time': pub_date_dt.strftime("%H:%M"),
-                            'link': link,
-                            'datetime': pub_date_dt
-                        }
+                    if not event_matches_requested_category:
+                        continue
 
-                        # Use the input 'category' to determine the display name, fallback to a generic one
-                        event['display_category'] = event_types.get(category, "Мероприятие 📅") 
+                    event = {
+                        'title': title,
+                        'description': description,
+                        'date': pub_date_dt.strftime("%d.%m.%Y"),
+                        'time': pub_date_dt.strftime("%H:%M"),
+                        'link': link,
+                        'datetime': pub_date_dt
+                    }
 
-                        events.append(event)
-                        logging.info(f"[EVENTS] Added event: '{title}' (Category: {category}, Date: {event['date']})")
+                    # Use the input 'category' to determine the display name, fallback to a generic one
+                    event['display_category'] = event_types.get(category, "Мероприятие 📅") 
 
-                    except ValueError:
-                        logging.info(f"[EVENTS] [SKIP] Event ('{title}'): date parsing error.")
-                        continue
+                    events.append(event)
+                    logging.info(f"[EVENTS] Added event: '{title}' (Category: {category}, Date: {event['date']})")
 
                 except Exception as e:
                     logging.error(f"[EVENTS] Error processing event item (Title: '{title}'): {e}", exc_info=True)
@@ -556,9 +170,6 @@ def get_events_by_category(category, limit_days=1, specific_date=None, week_rang
             else:
                 return events[:3]  # Return only 3 most recent events
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"[EVENTS] Request error during event fetching: {e}", exc_info=True)
-            return []
         except Exception as e:
             logging.error(f"[EVENTS] Unexpected error in get_events_by_category: {e}", exc_info=True)
             return []
@@ -571,9 +182,9 @@ def get_events_by_date(date):
     """Get events for a specific date."""
     return get_events_by_category(None, specific_date=date)
 
-def get_events_by_week():
+def get_events_by_week(progress=None):
     """Get events for the next week."""
-    return get_events_by_category(None, limit_days=7, week_range=True)
+    return get_events_by_category(None, limit_days=7, week_range=True, progress=progress)
 
 def format_event_message(event):
     """Format event message for display."""
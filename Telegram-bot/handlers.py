@@ -1,16 +1,15 @@
-import telebot
 import telebot.types as types
 from datetime import datetime, timedelta
 import logging
 import os
-import matplotlib.pyplot as plt
 from io import BytesIO
-import time
 from database import add_user, update_last_active
 from bot_instance import bot
+from dispatcher import heavy
+from progress import LoadingIndicator
+from state_store import main_states, question_messages
+from media import media_registry
 
-# Словарь для хранения ID последнего сообщения с вопросом по каждой категории
-last_question_message_ids = {}
 # Словарь для хранения ID последнего сообщения с выбором категории новостей/событий
 # last_category_message_id = {} # УДАЛЯЕМ ЭТУ СТРОКУ
 
@@ -28,7 +27,7 @@ logger = logging.getLogger(__name__)
 
 from config import BOT_TOKEN, LOCATIONS
 from news import get_yarnews_articles, get_news_by_category, get_news_by_date, get_news_by_week
-from weather import get_openmeteo_weather, format_weather_message, get_weather_description, generate_hourly_temperature_graph_image
+from weather import get_openmeteo_weather, format_weather_message, get_weather_description, temperature_chart_cache
 from events import get_events_by_category, format_event_message, event_types
 from locations import get_locations_by_category, get_location_info
 from about_city import (
@@ -123,9 +122,6 @@ EVENT_CATEGORY_NAMES = {
     }
 }
 
-# Словарь для хранения состояний пользователей
-user_states = {}
-
 # Текст помощи
 HELP_TEXT = (
     "⚙️ Для получения технической поддержки перейдите в наш бот поддержки:\n\n"
@@ -143,7 +139,7 @@ def save_user_state(user_id, state):
     Используется для отслеживания текущего раздела и предыдущего меню
     """
     try:
-        user_states[user_id] = state
+        main_states[user_id] = state
         logger.debug(f"Сохранено состояние пользователя {user_id}: {state}")
     except Exception as e:
         logger.error(f"Ошибка при сохранении состояния пользователя {user_id}: {e}")
@@ -154,7 +150,7 @@ def get_user_state(user_id):
     Возвращает словарь с информацией о текущем разделе и предыдущем меню
     """
     try:
-        return user_states.get(user_id)
+        return main_states.get(user_id)
     except Exception as e:
         logger.error(f"Ошибка при получении состояния пользователя {user_id}: {e}")
         return None
@@ -165,8 +161,7 @@ def clear_user_state(user_id):
     Используется при возврате в главное меню или при завершении работы с разделом
     """
     try:
-        if user_id in user_states:
-            del user_states[user_id]
+        if main_states.pop(user_id) is not None:
             logger.debug(f"Очищено состояние пользователя {user_id}")
     except Exception as e:
         logger.error(f"Ошибка при очистке состояния пользователя {user_id}: {e}")
@@ -223,14 +218,14 @@ def setup_handlers(bot):
         """
         try:
             # Отправляем сообщение со справкой
-            with open('Materials/helpPhoto.jpg', 'rb') as photo:
-                bot.send_photo(
-                    message.chat.id,
-                    photo,
-                    caption=HELP_TEXT,
-                    parse_mode='HTML',
-                    reply_markup=create_main_keyboard()
-                )
+            media_registry.send_photo(
+                bot,
+                message.chat.id,
+                'Materials/helpPhoto.jpg',
+                caption=HELP_TEXT,
+                parse_mode='HTML',
+                reply_markup=create_main_keyboard()
+            )
         except Exception as e:
             logger.error(f"Ошибка в обработчике команды /help: {e}")
             bot.send_message(
@@ -492,14 +487,14 @@ def setup_handlers(bot):
         """
         try:
             # Отправляем сообщение со справкой
-            with open('Materials/helpPhoto.jpg', 'rb') as photo:
-                bot.send_photo(
-                    message.chat.id,
-                    photo,
-                    caption=HELP_TEXT,
-                    parse_mode='HTML',
-                    reply_markup=create_main_keyboard()
-                )
+            media_registry.send_photo(
+                bot,
+                message.chat.id,
+                'Materials/helpPhoto.jpg',
+                caption=HELP_TEXT,
+                parse_mode='HTML',
+                reply_markup=create_main_keyboard()
+            )
         except Exception as e:
             logger.error(f"Ошибка в обработчике справки: {e}")
             bot.send_message(
@@ -606,7 +601,7 @@ def setup_handlers(bot):
                     text="👀 Хотите посмотреть новости за последнюю неделю?",
                     reply_markup=keyboard
                 )
-                last_question_message_ids[message.chat.id] = question_message.message_id
+                question_messages[message.chat.id] = question_message.message_id
 
             else:
                 # Если новостей по категории нет
@@ -618,7 +613,7 @@ def setup_handlers(bot):
                 weekly_news_button = types.InlineKeyboardButton("Новости за неделю", callback_data=f"news_week_{category_name}")
                 keyboard.add(weekly_news_button)
                 question_message = bot.send_message(message.chat.id, message_text, reply_markup=keyboard, parse_mode='HTML')
-                last_question_message_ids[message.chat.id] = question_message.message_id
+                question_messages[message.chat.id] = question_message.message_id
 
         except Exception as e:
             proper_category = CATEGORY_NAMES.get(category_name, {}).get("by", "этой категории")
@@ -695,7 +690,7 @@ def setup_handlers(bot):
                     f"👀 Хотите посмотреть события за последнюю неделю?",
                     reply_markup=keyboard
                 )
-                last_question_message_ids[message.chat.id] = question_message.message_id
+                question_messages[message.chat.id] = question_message.message_id
 
             else:
                 # Если событий по категории нет
@@ -707,7 +702,7 @@ def setup_handlers(bot):
                 weekly_events_button = types.InlineKeyboardButton("События за неделю", callback_data=f"event_week_{category_name}")
                 keyboard.add(weekly_events_button)
                 question_message = bot.send_message(message.chat.id, message_text, reply_markup=keyboard, parse_mode='HTML')
-                last_question_message_ids[message.chat.id] = question_message.message_id
+                question_messages[message.chat.id] = question_message.message_id
 
         except Exception as e:
             proper_category = EVENT_CATEGORY_NAMES.get(category_name, {}).get("by", "этой категории")
@@ -743,13 +738,13 @@ def setup_handlers(bot):
             logger.debug(f"about_city_text length: {len(about_city_text)}")
 
             photo_path = "Materials/yaroslavl.jpg"
-            with open(photo_path, "rb") as photo:
-                bot.send_photo(
-                    message.chat.id,
-                    photo,
-                    caption=about_city_text,
-                    parse_mode='HTML'
-                )
+            media_registry.send_photo(
+                bot,
+                message.chat.id,
+                photo_path,
+                caption=about_city_text,
+                parse_mode='HTML'
+            )
             # Отправляем отдельное сообщение с выбором темы и инлайн-клавиатурой
             theme_message_text = "Выберите тему:"
             about_keyboard = get_about_keyboard()
@@ -774,6 +769,7 @@ def setup_handlers(bot):
             logger.error(f"Sent error message to user {message.chat.id}.")
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith(('news_week_', 'event_week_')))
+    @heavy
     def handle_week_button(call):
         """
         Обработчик кнопки 'Новости/События за неделю'
@@ -788,42 +784,20 @@ def setup_handlers(bot):
             
             # Удаляем сообщение с вопросом
             try:
-                if call.message.chat.id in last_question_message_ids:
+                if call.message.chat.id in question_messages:
                     bot.delete_message(
                         chat_id=call.message.chat.id,
-                        message_id=last_question_message_ids[call.message.chat.id]
+                        message_id=question_messages[call.message.chat.id]
                     )
-                    del last_question_message_ids[call.message.chat.id]
+                    del question_messages[call.message.chat.id]
             except Exception as e:
                 logger.debug(f"Error deleting question message: {e}")
 
-            # Отправляем сообщение о загрузке
-            loading_message = bot.send_message(
-                call.message.chat.id,
-                f"⏳ {'Загружаю новости' if action_type == 'news' else 'Загружаю события'}   ",
-                reply_markup=None
-            )
-            message_id_to_delete = loading_message.message_id
-
-            # Анимация загрузки
-            dots_animation_frames = ["", ".", "..", "..."]
-            # 4 цикла * 4 кадра * 0.3 сек = 4.8 секунд
-            for _ in range(4):
-                for frame in dots_animation_frames:
-                    current_loading_text = f"⏳ {'Загружаю новости' if action_type == 'news' else 'Загружаю события'}{frame}"
-                    try:
-                        bot.edit_message_text(
-                            current_loading_text,
-                            chat_id=call.message.chat.id,
-                            message_id=message_id_to_delete,
-                            reply_markup=None
-                        )
-                    except telebot.apihelper.ApiTelegramException as e:
-                        if "message is not modified" in str(e):
-                            logger.debug(f"Message not modified: {e}")
-                        else:
-                            raise e
-                    time.sleep(0.3)
+            # Сообщение о загрузке обновляется по ходу реальной загрузки, параллельно с ней
+            loading = LoadingIndicator(
+                bot, call.message.chat.id,
+                'Загружаю новости' if action_type == 'news' else 'Загружаю события'
+            ).start()
 
             if action_type == 'news':
                 # Получаем новости за неделю для выбранной категории
@@ -833,11 +807,11 @@ def setup_handlers(bot):
                     mapped_category_name = category_name
 
                 logger.info(f"[HANDLER] Fetching news for week. Original category: {category_name}, Mapped category: {mapped_category_name}")
-                news_items = get_news_by_week(mapped_category_name)
+                news_items = get_news_by_week(mapped_category_name, progress=loading)
                 
                 if news_items:
                     # Удаляем сообщение о загрузке
-                    bot.delete_message(chat_id=call.message.chat.id, message_id=message_id_to_delete)
+                    loading.stop()
                     
                     # Отправляем заголовок
                     bot.send_message(
@@ -861,7 +835,7 @@ def setup_handlers(bot):
                         )
                 else:
                     # Удаляем сообщение о загрузке, если новости не найдены
-                    bot.delete_message(chat_id=call.message.chat.id, message_id=message_id_to_delete)
+                    loading.stop()
                     bot.send_message(
                         call.message.chat.id,
                         f"😔 Нет последних новостей по категории {CATEGORY_NAMES[category_name]['default']} за последнюю неделю"
@@ -877,11 +851,11 @@ def setup_handlers(bot):
                     mapped_category_name = category_name
 
                 logger.info(f"[HANDLER] Fetching events for week. Original category: {category_name}, Mapped category: {mapped_category_name}")
-                events = get_events_by_category(mapped_category_name, week_range=True)
+                events = get_events_by_category(mapped_category_name, week_range=True, progress=loading)
                 
                 if events:
                     # Удаляем сообщение о загрузке
-                    bot.delete_message(chat_id=call.message.chat.id, message_id=message_id_to_delete)
+                    loading.stop()
                     
                     # Отправляем заголовок
                     bot.send_message(
@@ -901,7 +875,7 @@ def setup_handlers(bot):
                         )
                 else:
                     # Удаляем сообщение о загрузке, если события не найдены
-                    bot.delete_message(chat_id=call.message.chat.id, message_id=message_id_to_delete)
+                    loading.stop()
                     bot.send_message(
                         call.message.chat.id,
                         f"😔 Нет последних событий по категории {EVENT_CATEGORY_NAMES[category_name]['default']} за последнюю неделю"
@@ -915,11 +889,8 @@ def setup_handlers(bot):
         except Exception as e:
             logger.error(f"Ошибка в handle_week_button: {e}")
             # В случае ошибки, также удаляем сообщение о загрузке, если оно было отправлено
-            if 'message_id_to_delete' in locals():
-                try:
-                    bot.delete_message(chat_id=call.message.chat.id, message_id=message_id_to_delete)
-                except Exception as delete_error:
-                    logger.error(f"Ошибка при удалении сообщения о загрузке в обработчике handle_week_button: {delete_error}")
+            if 'loading' in locals():
+                loading.stop()
             bot.answer_callback_query(
                 call.id,
                 "Произошла ошибка при получении данных. Пожалуйста, попробуйте позже."
@@ -936,6 +907,7 @@ def setup_handlers(bot):
                 show_event_categories(call.message)
 
     @bot.callback_query_handler(func=lambda call: call.data in ["show_weather", "weather_news"])
+    @heavy
     def handle_weather_callback(call):
         """
         Обработчик callback-кнопок, связанных с погодой (прогноз или новости о погоде)
@@ -981,13 +953,13 @@ def setup_handlers(bot):
                     
                     try:
                         # Пытаемся отправить GIF-анимацию с подписью о погоде
-                        with open(gif_path, 'rb') as gif:
-                            bot.send_animation(
-                                chat_id=call.message.chat.id,
-                                animation=gif,
-                                caption=weather_message,
-                                reply_markup=markup
-                            )
+                        media_registry.send_animation(
+                            bot,
+                            call.message.chat.id,
+                            gif_path,
+                            caption=weather_message,
+                            reply_markup=markup
+                        )
                     except FileNotFoundError:
                         # Если GIF не найден, отправляем только текстовое сообщение
                         bot.send_message(
@@ -996,15 +968,21 @@ def setup_handlers(bot):
                             reply_markup=markup
                         )
                     
-                    # Генерируем и отправляем график температуры
-                    hourly_chart_image = generate_hourly_temperature_graph_image(weather_data['hourly'])
-                    if hourly_chart_image:
+                    # График рисуется один раз на прогноз в фоне и берется из кэша;
+                    # если он еще не готов, текст уже отправлен, а график придет после отрисовки
+                    chart_chat_id = call.message.chat.id
+
+                    def send_chart(image):
                         bot.send_photo(
-                            call.message.chat.id,
-                            hourly_chart_image,
+                            chart_chat_id,
+                            image,
                             caption="📊 График температуры на сегодня:"
                         )
 
+                    hourly_chart_image = temperature_chart_cache.get(weather_data, on_ready=send_chart)
+                    if hourly_chart_image:
+                        send_chart(hourly_chart_image)
+
                 else:
                     # Сообщение, если не удалось получить данные о погоде
                     bot.send_message(
@@ -1069,7 +1047,7 @@ def setup_handlers(bot):
                     text="👀 Хотите посмотреть новости за последнюю неделю?", 
                     reply_markup=keyboard
                 )
-                last_question_message_ids[call.message.chat.id] = question_message.message_id
+                question_messages[call.message.chat.id] = question_message.message_id
 
                 # Убираем возврат в меню категорий новостей
                 # show_news_categories(call.message)
@@ -1150,8 +1128,7 @@ def setup_handlers(bot):
             photo_path = photo_paths.get(topic_key)
             if photo_path:
                 # Если изображение есть, отправляем его с текстом в качестве подписи
-                with open(photo_path, "rb") as photo:
-                    bot.send_photo(message.chat.id, photo, caption=history_text, parse_mode='HTML')
+                media_registry.send_photo(bot, message.chat.id, photo_path, caption=history_text, parse_mode='HTML')
             else:
                 # Если изображения нет, отправляем только текст
                 bot.send_message(message.chat.id, history_text, parse_mode='HTML')
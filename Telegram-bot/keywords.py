@@ -0,0 +1,303 @@
+# Словари ключевых слов для отбора новостей и событий yarnews.net.
+# Все таблицы компилируются в единый классификатор (см. classifier.py).
+
+# Ключевые и исключающие слова для категорий новостей
+NEWS_CATEGORY_KEYWORDS = {
+    "general": {
+        "keywords": [
+            "новости", "события", "происшествия", "информация",
+            "объявление", "сообщение", "репортаж", "интервью",
+            "заметка", "статья", "публикация", "материал"
+        ],
+        "exclude_keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "администрация", "мэр", "губернатор", "власть", "правительство",
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "ремонт", "строительство", "благоустройство", "реконструкция",
+            "культура", "искусство", "театр", "музей", "выставка", "концерт"
+        ]
+    },
+    "transport": {
+        "keywords": [
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "общественный транспорт", "пассажирский транспорт", "перевозки",
+            "остановка", "расписание", "интервал", "движение",
+            "такси", "каршеринг", "велосипед", "велодорожка",
+            "парковка", "стоянка", "парковочное место",
+            "дорожное движение", "пробка", "затор", "регулирование",
+            "светофор", "пешеходный переход", "разметка", "знак"
+        ],
+        "exclude_keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "администрация", "мэр", "губернатор", "власть", "правительство",
+            "ремонт", "строительство", "благоустройство", "реконструкция",
+            "культура", "искусство", "театр", "музей", "выставка", "концерт"
+        ]
+    },
+    "construction": {
+        "keywords": [
+            "ремонт", "благоустройство", "строительство", "реконструкция",
+            "капитальный ремонт", "ремонт зданий", "строительная площадка",
+            "подрядчик", "застройщик", "инфраструктура", "городская среда",
+            "городское пространство", "муниципальный контракт", "госзакупка",
+            "тендер", "стройка", "строительный объект", "реновация",
+            "озеленение", "ландшафтный дизайн", "высадка деревьев",
+            "посадка кустарников", "ЖКХ", "коммунальный",
+            "проект", "смета", "экспертиза", "разрешение", "договор",
+            "объект", "площадка", "работы", "материалы", "оборудование",
+            "инженерные сети", "дорога", "тротуар", "асфальт", "брусчатка",
+            "освещение", "фонарь", "скамейка", "урна", "детская площадка",
+            "спортивная площадка", "сквер", "парк", "набережная"
+        ],
+        "exclude_keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "администрация", "мэр", "губернатор", "власть", "правительство",
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "культура", "искусство", "театр", "музей", "выставка", "концерт"
+        ]
+    },
+    "culture": {
+        "keywords": [
+            "культура", "искусство", "театр", "музей", "выставка", "концерт",
+            "фестиваль", "галерея", "библиотека", "литература", "кино",
+            "музыка", "танец", "живопись", "скульптура", "архитектура",
+            "наследие", "памятник", "история", "традиция", "ремесло",
+            "народное творчество", "художник", "писатель", "актер", "режиссер",
+            "творчество", "искусствовед", "культурный центр", "дворец культуры",
+            "филармония", "оперетта", "балет", "опера", "фольклор", "этнография",
+            "мастер-класс", "лекция", "семинар", "презентация", "открытие", "закрытие",
+            "спектакль", "премьера", "дебют", "творческая встреча", "вернисаж",
+            "экспозиция", "коллекция", "артефакт", "реликвия", "шедевр"
+        ],
+        "exclude_keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "администрация", "мэр", "губернатор", "власть", "правительство",
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "ремонт", "строительство", "благоустройство", "реконструкция"
+        ]
+    },
+    "weather": {
+        "keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "прогноз погоды", "метео", "метеорология", "климат",
+            "мороз", "жара", "туман", "гроза", "град",
+            "ураган", "шторм", "наводнение", "паводок",
+            "засуха", "гололед", "атмосферное давление", "влажность", "облачность",
+            "солнце", "метеорологический", "прогноз", "циклон", "антициклон",
+            "атмосфера", "климатический", "температурный", "метеосводка",
+            "гидрометцентр", "синоптик", "прогнозирование", "градус", "фаренгейт",
+            "цельсий", "минус", "плюс", "осадки", "ливень", "моросящий дождь",
+            "снегопад", "метель", "вьюга", "пурга", "иней", "изморозь",
+            "радуга", "гром", "молния", "шквал", "буря", "тайфун"
+        ],
+        "exclude_keywords": [
+            "администрация", "мэр", "губернатор", "власть", "правительство",
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "ремонт", "строительство", "благоустройство", "реконструкция",
+            "культура", "искусство", "театр", "музей", "выставка", "концерт",
+            "школьный автобус", "дорога", "яма", "асфальт", "здание", "гостиница",
+            "дом", "проект", "реставрация", "благоустройство", "капитальный ремонт",
+            "строительная площадка", "подрядчик", "застройщик", "инфраструктура",
+            "городская среда", "городское пространство", "муниципальный контракт",
+            "госзакупка", "тендер"
+        ]
+    },
+    "administration": {
+        "keywords": [
+            "администрация", "мэрия", "губернатор", "управление", "власти",
+            "мэр", "глава", "департамент", "комитет", "бюджет", "финансы",
+            "социальная защита", "образование", "здравоохранение", "молодежная политика",
+            "градостроительство", "благоустройство", "коммунальное хозяйство",
+            "муниципальный", "городской", "областной", "постановление", "распоряжение",
+            "программа", "служба", "инспекция", "фонд", "регулирование", "субсидия",
+            "дотация", "грант", "закупка", "торги", "отчетность", "мониторинг",
+            "чиновник", "чиновники", "совещание", "административный", "муниципалитет",
+            "муниципалитеты", "муниципальные власти", "закон", "нормативный акт",
+            "регламент", "стандарт", "требование", "проверка", "контроль",
+            "надзор", "лицензия", "разрешение", "сертификат", "аккредитация"
+        ],
+        "exclude_keywords": [
+            "погода", "температура", "осадки", "дождь", "снег", "ветер",
+            "транспорт", "автобус", "троллейбус", "трамвай", "маршрут",
+            "культура", "искусство", "театр", "музей", "выставка", "концерт"
+        ]
+    }
+}
+
+# Ключевые и негативные слова для категорий событий
+EVENT_KEYWORDS = {
+    "culture": {
+        "keywords": [
+            "выставка", "концерт", "спектакль", "театр", "музей", "галерея",
+            "культурный", "творческий", "искусство", "музыкальный", "литературный", "поэтический",
+            "художественный", "творческая встреча", "культурная программа", "культурное событие",
+            "открытие выставки", "перформанс", "инсталляция", "библиотека",
+            "фестиваль", "праздник", "празднование", "торжество", "юбилей",
+            "награждение", "победа", "достижение", "успех", "признание",
+            "открытие", "презентация", "премьера", "дебют", "возрождение",
+            "реставрация", "реконструкция", "обновление", "развитие", "прогресс"
+        ],
+        "negative_keywords": [
+            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+            "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
+            "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
+            "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
+            "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
+        ]
+    },
+    "sport": {
+        "keywords": [
+            "соревнование", "турнир", "чемпионат", "спортивный", "матч", "победа",
+            "спорт", "тренировка", "сбор", "олимпиада", "спартакиада", "эстафета", "забег",
+            "пробег", "кросс", "соревнования", "спортивное мероприятие",
+            "спортивный праздник", "спортивный фестиваль", "спортивный турнир", "спортивные игры",
+            "спортивный матч", "спортивное соревнование", "спортивный сбор", "спортивная тренировка",
+            "Локомотив", "КХЛ", "хоккей", "футбол", "баскетбол", "волейбол",
+            "награждение", "медаль", "кубок", "трофей", "чемпион", "рекорд",
+            "достижение", "успех", "победа", "триумф", "лидерство", "первенство",
+            # Добавляем новые ключевые слова для хоккея
+            "хоккейный", "хоккеист", "хоккейная команда", "хоккейный клуб", "хоккейный матч",
+            "хоккейный турнир", "хоккейное соревнование", "хоккейный сезон", "хоккейная лига",
+            "Кубок Гагарина", "плей-офф", "регулярный чемпионат", "хоккейная арена",
+            "хоккейная школа", "хоккейная академия", "хоккейная тренировка", "хоккейный сбор",
+            "хоккейный тренер", "хоккейная сборная", "хоккейный стадион", "хоккейный матч",
+            "хоккейный турнир", "хоккейное первенство", "хоккейный чемпионат", "хоккейная победа",
+            "хоккейный гол", "хоккейная шайба", "хоккейная клюшка", "хоккейные коньки",
+            "хоккейная форма", "хоккейная экипировка", "хоккейный судья", "хоккейный арбитр",
+            "хоккейный рефери", "хоккейный матч", "хоккейная игра", "хоккейный период",
+            "хоккейный овертайм", "хоккейный буллит", "хоккейный пенальти", "хоккейный штраф",
+            "хоккейная скамейка", "хоккейная раздевалка", "хоккейный тренер", "хоккейный менеджер",
+            "хоккейный директор", "хоккейный президент", "хоккейный клуб", "хоккейная команда",
+            "хоккейный игрок", "хоккейный вратарь", "хоккейный защитник", "хоккейный нападающий",
+            "хоккейный форвард", "хоккейный центр", "хоккейный край", "хоккейный капитан",
+            "хоккейный ассистент", "хоккейный бомбардир", "хоккейный снайпер", "хоккейный пас",
+            "хоккейная передача", "хоккейный бросок", "хоккейный удар", "хоккейный отбор",
+            "хоккейная борьба", "хоккейный силовой прием", "хоккейный фол", "хоккейный штраф",
+            "хоккейная дисквалификация", "хоккейное удаление", "хоккейный матч", "хоккейная игра",
+            "хоккейный турнир", "хоккейное соревнование", "хоккейный чемпионат", "хоккейное первенство",
+            "хоккейная лига", "хоккейный дивизион", "хоккейная конференция", "хоккейный плей-офф",
+            "хоккейный финал", "хоккейный полуфинал", "хоккейный четвертьфинал", "хоккейный матч",
+            "хоккейная игра", "хоккейный период", "хоккейный овертайм", "хоккейный буллит",
+            "хоккейный пенальти", "хоккейный штраф", "хоккейная скамейка", "хоккейная раздевалка",
+            "хоккейный тренер", "хоккейный менеджер", "хоккейный директор", "хоккейный президент",
+            "хоккейный клуб", "хоккейная команда", "хоккейный игрок", "хоккейный вратарь",
+            "хоккейный защитник", "хоккейный нападающий", "хоккейный форвард", "хоккейный центр",
+            "хоккейный край", "хоккейный капитан", "хоккейный ассистент", "хоккейный бомбардир",
+            "хоккейный снайпер", "хоккейный пас", "хоккейная передача", "хоккейный бросок",
+            "хоккейный удар", "хоккейный отбор", "хоккейная борьба", "хоккейный силовой прием",
+            "хоккейный фол", "хоккейный штраф", "хоккейная дисквалификация", "хоккейное удаление"
+        ],
+        "negative_keywords": [
+            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+            "травма", "повреждение", "ушиб", "перелом", "растяжение", "вывих",
+            "поражение", "проигрыш", "неудача", "провал", "дисквалификация", "нарушение",
+            "допинг", "скандал", "конфликт", "спор", "разногласие", "протест",
+            "отмена", "перенос", "задержка", "проблема", "трудность", "сложность",
+            # Добавляем негативные ключевые слова для хоккея
+            "травма", "повреждение", "ушиб", "перелом", "растяжение", "вывих",
+            "поражение", "проигрыш", "неудача", "провал", "дисквалификация", "нарушение",
+            "допинг", "скандал", "конфликт", "спор", "разногласие", "протест",
+            "отмена", "перенос", "задержка", "проблема", "трудность", "сложность",
+            "хоккейная травма", "хоккейное повреждение", "хоккейный ушиб", "хоккейный перелом",
+            "хоккейное растяжение", "хоккейный вывих", "хоккейное поражение", "хоккейный проигрыш",
+            "хоккейная неудача", "хоккейный провал", "хоккейная дисквалификация", "хоккейное нарушение",
+            "хоккейный допинг", "хоккейный скандал", "хоккейный конфликт", "хоккейный спор",
+            "хоккейное разногласие", "хоккейный протест", "хоккейная отмена", "хоккейный перенос",
+            "хоккейная задержка", "хоккейная проблема", "хоккейная трудность", "хоккейная сложность"
+        ]
+    },
+    "education": {
+        "keywords": [
+            "лекция", "семинар", "конференция", "форум", "образование", "обучение", "курс",
+            "школа", "университет", "академия", "институт", "колледж", "училище", "лицей",
+            "гимназия", "образовательный", "учебный", "научный", "исследование", "проект",
+            "встреча", "дискуссия", "круглый стол", "мастер-класс", "тренинг", "практикум",
+            "выпускной", "выпуск", "диплом", "сертификат", "аттестат", "награждение",
+            "олимпиада", "конкурс", "соревнование", "победа", "достижение", "успех",
+            "открытие", "праздник", "торжество", "юбилей", "премьера", "дебют"
+        ],
+        "negative_keywords": [
+            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+            "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
+            "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
+            "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
+            "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
+        ]
+    },
+    "entertainment": {
+        "keywords": [
+            "развлечение", "игра", "празднование", "торжество",
+            "вечеринка", "дискотека", "карнавал", "маскарад", "бал", "праздничный", "развлекательный",
+            "досуговый", "досуг", "отдых", "развлечения",
+            "досуговое мероприятие", "праздничная программа", "развлекательная программа", "досуговая программа",
+            "фестиваль", "праздник", "юбилей", "открытие", "премьера", "дебют",
+            "награждение", "победа", "достижение", "успех", "признание",
+            "концерт", "шоу", "представление", "спектакль", "выступление"
+        ],
+        "negative_keywords": [
+            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+            "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
+            "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
+            "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
+            "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
+        ]
+    },
+    "concerts": {
+        "keywords": [
+            "концерт", "выступление", "музыка", "музыкальный", "оркестр", "ансамбль", "группа",
+            "исполнитель", "певец", "певица", "музыкант", "композитор", "дирижер", "солист",
+            "вокалист", "инструменталист", "музыкальное выступление", "музыкальный концерт",
+            "музыкальное мероприятие", "музыкальный фестиваль", "музыкальный праздник", "музыкальное шоу",
+            "музыкальная программа", "музыкальное представление", "музыкальное действо", "музыкальное событие",
+            "премьера", "дебют", "открытие", "праздник", "торжество", "юбилей",
+            "награждение", "победа", "достижение", "успех", "признание"
+        ],
+        "negative_keywords": [
+            "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+            "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+            "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+            "протест", "митинг", "демонстрация", "конфликт", "спор", "разногласие",
+            "проблема", "трудность", "сложность", "неудача", "поражение", "провал",
+            "закрытие", "отмена", "приостановка", "задержка", "опоздание", "недостаток",
+            "дефицит", "кризис", "упадок", "ухудшение", "деградация", "разрушение"
+        ]
+    }
+}
+
+# Список слов, которые указывают на административные новости
+ADMINISTRATIVE_KEYWORDS = [
+    "министр", "губернатор", "мэр", "администрация", "департамент", "управление",
+    "советник", "заместитель", "руководитель", "директор", "начальник", "перевод",
+    "назначение", "отставка", "увольнение", "прием", "встреча", "совещание",
+    "утверждение", "проект", "строительство", "дорога", "магистраль", "трасса",
+    "разработка", "планирование", "реконструкция", "ремонт", "благоустройство",
+    "комиссия", "заседание", "доклад", "отчет", "решение", "постановление", "распоряжение",
+    "омбудсмен", "форум",
+    "конкурс", "тендер", "закупка", "госзакупка", "контракт", "муниципальный контракт",
+    "бюджет", "финансы", "экономика", "инвестиции", "предприятие", "бизнес", "налог", "субсидия",
+    "жкх", "коммунальный", "тариф", "услуги",
+    "городской", "областной", "региональный", "районный", "муниципальный", # Re-adding with caution, rely more on other keywords
+    "открытие", "закрытие", "начало", "завершение", "итоги", "планы", "перспективы",
+    "создание", "развитие", "реализация", "проведение", "организация"
+]
+
+# Общие негативные ключевые слова для всех категорий событий (для фильтрации "негативных" новостей)
+GENERAL_NEGATIVE_KEYWORDS = [
+    "пожар", "ДТП", "авария", "криминал", "происшествие", "смерть", "убийство",
+    "суд", "тюрьма", "кража", "мошенничество", "взрыв", "теракт", "нападение",
+    "задержание", "расследование", "штраф", "иск", "жалоба", "скандал", "забастовка",
+    "конфликт", "протест", "запрет", "отмена", "закрытие", "ликвидация", "угроза",
+    "катастрофа", "чрезвычайная ситуация", "эвакуация", "пострадавшие", "жертвы",
+    "больница", "травма", "болезнь", "эпидемия", "карантин", "ограничения",
+    "отключение", "прорыв", "утечка", "загрязнение", "отходы", "свалка",
+    "долг", "банкротство", "убытки", "сокращение",
+    "уголовное дело", "административное дело", "проверка", "расследование"
+]
@@ -3,7 +3,11 @@ import logging
 from handlers import bot as main_bot, setup_handlers
 from support_bot import bot as support_bot
 from scheduler import start_scheduler
+from yarnews_feed import start_feed_refresher
 from database import init_db
+from weather_service import weather_service
+from runtime import run_bots
+from config import BOT_RUNTIME, BOT_MODE
 
 # Настройка логирования для записи всех событий бота
 # Логи сохраняются в файл bot.log и выводятся в консоль
@@ -18,17 +22,27 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def prepare_main_bot():
+    """Подготавливает основной бот: база данных, обработчики и фоновые задачи."""
+    # Инициализируем базу данных для хранения информации о пользователях
+    init_db()
+
+    # Настраиваем все обработчики команд и сообщений
+    setup_handlers(main_bot)
+
+    # Запускаем планировщик для отправки ежедневных уведомлений
+    start_scheduler(main_bot)
+
+    # Запускаем фоновое обновление ленты yarnews.net для новостей и событий
+    start_feed_refresher()
+
+    # Читаем сохраненный прогноз погоды, чтобы график был нарисован до первого запроса
+    weather_service.warm_up()
+
 def run_main_bot():
     """Запускает основной Telegram-бот."""
     try:
-        # Инициализируем базу данных для хранения информации о пользователях
-        init_db()
-        
-        # Настраиваем все обработчики команд и сообщений
-        setup_handlers(main_bot)
-        
-        # Запускаем планировщик для отправки ежедневных уведомлений
-        start_scheduler(main_bot)
+        prepare_main_bot()
         
         # Запускаем бота в режиме постоянного опроса новых сообщений
         logger.info("Запуск основного бота...")
@@ -49,6 +63,30 @@ def run_support_bot():
         logger.error(f"Ошибка в боте поддержки: {e}") # Логируем ошибку
         print(f"❌ Ошибка в боте поддержки: {e}") # Выводим ошибку в консоль
 
+def run_async():
+    """Запускает оба бота в общем цикле asyncio."""
+    try:
+        prepare_main_bot()
+        logger.info("Запуск ботов в общем цикле asyncio...")
+        print("🤖 Основной бот и 🛟 бот поддержки запущены и готовы к работе!")
+        run_bots({"MainBot": main_bot, "SupportBot": support_bot})
+    except Exception as e:
+        logger.error(f"Ошибка при запуске ботов: {e}")
+        print(f"❌ Ошибка при запуске ботов: {e}")
+
+def run_webhook_server():
+    """Запускает оба бота на вебхуках вместо длинного опроса."""
+    try:
+        prepare_main_bot()
+        logger.info("Запуск сервера вебхуков...")
+        print("🤖 Основной бот и 🛟 бот поддержки принимают обновления через вебхук!")
+        # aiohttp нужен только в режиме вебхуков, поэтому импортируем сервер здесь
+        from webhook import run_webhook
+        run_webhook({"main": main_bot, "support": support_bot})
+    except Exception as e:
+        logger.error(f"Ошибка при запуске сервера вебхуков: {e}")
+        print(f"❌ Ошибка при запуске сервера вебхуков: {e}")
+
 def main():
     """
     Основная функция запуска бота.
@@ -58,6 +96,14 @@ def main():
     3. Запускает планировщик ежедневных уведомлений
     4. Запускает бота в режиме постоянного опроса
     """
+    if BOT_MODE == 'webhook':
+        run_webhook_server()
+        return
+
+    if BOT_RUNTIME == 'asyncio':
+        run_async()
+        return
+
     try:
         # Создаем отдельные потоки выполнения для каждого бота
         main_thread = threading.Thread(target=run_main_bot, name="MainBot")
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import logging
+import threading
+from telebot.apihelper import ApiTelegramException
+from config import CACHE_DIR, MEDIA_CACHE_FILE
+
+logger = logging.getLogger(__name__)
+
+class MediaRegistry:
+    """
+    Реестр file_id для статичных картинок и GIF.
+    Файл загружается в Telegram только при первой отправке, а дальше
+    отправляется по file_id, который Telegram вернул в ответ. Запись
+    привязана к пути и хэшу содержимого: если файл изменился, он
+    загружается заново. file_id у каждого бота свой, поэтому в ключе есть ID бота.
+    """
+
+    def __init__(self, cache_file=MEDIA_CACHE_FILE):
+        """
+        :param cache_file: JSON-файл, в котором file_id хранятся между перезапусками
+        """
+        self.cache_file = cache_file
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+        except Exception as e:
+            logger.error(f"[MEDIA] Failed to load {self.cache_file}: {e}")
+
+    def _save_locked(self):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = self.cache_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.error(f"[MEDIA] Failed to save {self.cache_file}: {e}")
+
+    @staticmethod
+    def _key(bot, path):
+        bot_id = bot.token.split(':', 1)[0]
+        return f"{bot_id}:{os.path.normpath(path)}"
+
+    @staticmethod
+    def _file_hash(path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _cached_file_id(self, key, path):
+        """Возвращает file_id, если файл не изменился с момента загрузки, иначе None."""
+        stat = os.stat(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        if not entry:
+            return None
+        if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            return entry['file_id']
+        # Время изменения или размер другие - сверяем содержимое
+        if self._file_hash(path) == entry['sha1']:
+            with self._lock:
+                entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                self._save_locked()
+            return entry['file_id']
+        logger.info(f"[MEDIA] {path} changed, it will be uploaded again.")
+        self._forget(key)
+        return None
+
+    def _remember(self, key, path, file_id):
+        stat = os.stat(path)
+        entry = {
+            'file_id': file_id,
+            'sha1': self._file_hash(path),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+        }
+        with self._lock:
+            self._load()
+            self._entries[key] = entry
+            self._save_locked()
+
+    def _forget(self, key):
+        with self._lock:
+            self._load()
+            if self._entries.pop(key, None) is not None:
+                self._save_locked()
+
+    @staticmethod
+    def _extract_file_id(message, kind):
+        if kind == 'photo':
+            return message.photo[-1].file_id if message.photo else None
+        if kind == 'animation':
+            # GIF без анимации Telegram может вернуть как документ
+            media = message.animation or message.document
+            return media.file_id if media else None
+        media = getattr(message, kind, None)
+        return media.file_id if media else None
+
+    def send(self, bot, kind, chat_id, path, **kwargs):
+        """
+        Отправляет файл по file_id, а при первой отправке (или после изменения файла) загружает его
+        :param bot: Экземпляр TeleBot
+        :param kind: Тип медиа: 'photo', 'animation' или 'document'
+        :param chat_id: ID чата
+        :param path: Путь к файлу
+        :param kwargs: Остальные параметры bot.send_<kind> (caption, reply_markup и т.д.)
+        :return: Отправленное сообщение
+        """
+        send_method = getattr(bot, f"send_{kind}")
+        key = self._key(bot, path)
+        file_id = self._cached_file_id(key, path)
+        if file_id:
+            try:
+                return send_method(chat_id, file_id, **kwargs)
+            except ApiTelegramException as e:
+                if e.error_code != 400 or 'file' not in e.description.lower():
+                    raise
+                # file_id больше не действителен (например, сменился токен) - загружаем заново
+                logger.warning(f"[MEDIA] Cached file_id for {path} was rejected: {e.description}")
+                self._forget(key)
+
+        with open(path, 'rb') as f:
+            message = send_method(chat_id, f, **kwargs)
+        file_id = self._extract_file_id(message, kind)
+        if file_id:
+            self._remember(key, path, file_id)
+            logger.info(f"[MEDIA] Uploaded {path}, file_id cached.")
+        return message
+
+    def send_photo(self, bot, chat_id, path, **kwargs):
+        return self.send(bot, 'photo', chat_id, path, **kwargs)
+
+    def send_animation(self, bot, chat_id, path, **kwargs):
+        return self.send(bot, 'animation', chat_id, path, **kwargs)
+
+media_registry = MediaRegistry()
@@ -6,6 +6,7 @@ import pytz
 import os
 from telebot.types import InputFile
 import logging
+from weather_service import weather_service
 
 class NewsParser:
     def __init__(self):
@@ -13,8 +14,6 @@ class NewsParser:
         # Координаты Ярославля
         self.latitude = 57.6261
         self.longitude = 39.8845
-        # URL для OpenMeteo API
-        self.weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={self.latitude}&longitude={self.longitude}&current=temperature_2m,relative_humidity_2m,weather_code,apparent_temperature&daily=weather_code,temperature_2m_max&timezone=Europe%2FMoscow&forecast_days=2"
         
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -124,10 +123,10 @@ class NewsParser:
 
     def get_weather(self):
         try:
-            # Получаем текущую погоду
-            response = requests.get(self.weather_url, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
+            # Прогноз берется из общего кэша (см. weather_service.py)
+            data = weather_service.get()
+            if not data:
+                return self.get_test_weather()
 
             # Текущая погода
             current = data['current']
@@ -168,11 +167,6 @@ class NewsParser:
                 'current_weather_gif': InputFile(current_weather_icon['gif'])
             }]
 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Request error while fetching weather: {e}")
-            if hasattr(e.response, 'text'):
-                self.logger.error(f"API response: {e.response.text}")
-            return self.get_test_weather()
         except Exception as e:
             self.logger.error(f"Unexpected error while fetching weather: {e}")
             return self.get_test_weather()
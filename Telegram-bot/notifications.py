@@ -0,0 +1,119 @@
+import time
+import atexit
+import logging
+import queue
+import threading
+from telebot.apihelper import ApiTelegramException
+from config import NOTIFY_WORKERS, NOTIFY_QUEUE_SIZE, NOTIFY_RATE, NOTIFY_MAX_RETRIES, NOTIFY_CLOSE_TIMEOUT
+from broadcast import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class NotificationQueue:
+    """
+    Фоновая отправка уведомлений. Обработчик только кладет сообщение в очередь
+    и сразу отвечает пользователю, а отправляют его фоновые потоки: с общим
+    ограничением скорости и повторами после ответа 429.
+    У каждого потока своя очередь, и уведомления одному получателю всегда попадают
+    в одну и ту же, поэтому приходят в том порядке, в котором были поставлены.
+    Очереди хранятся в памяти; при остановке бота оставшиеся уведомления
+    отправляются в течение close_timeout секунд.
+    """
+
+    def __init__(self, bot, workers=NOTIFY_WORKERS, queue_size=NOTIFY_QUEUE_SIZE, rate=NOTIFY_RATE,
+                 max_retries=NOTIFY_MAX_RETRIES, close_timeout=NOTIFY_CLOSE_TIMEOUT):
+        """
+        :param bot: Экземпляр TeleBot, от имени которого отправляются уведомления
+        :param workers: Сколько потоков отправляют уведомления
+        :param queue_size: Емкость очереди каждого потока
+        :param rate: Не больше стольких уведомлений в секунду
+        :param max_retries: Повторов отправки после ответа 429
+        :param close_timeout: Сколько секунд при остановке ждать отправки оставшихся уведомлений
+        """
+        self.bot = bot
+        self.workers = workers
+        self.max_retries = max_retries
+        self.close_timeout = close_timeout
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.bucket = TokenBucket(rate)
+        self._threads = []
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Потоки запускаются при первом уведомлении, а не при импорте модуля
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._worker, args=(pending,), name=f"Notify_{i}", daemon=True)
+                for i, pending in enumerate(self.queues)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def notify(self, chat_id, text, **kwargs):
+        """
+        Ставит уведомление в очередь и сразу возвращается
+        :param chat_id: ID получателя
+        :param text: Текст уведомления
+        :param kwargs: Остальные параметры bot.send_message (reply_markup и т.д.)
+        :return: True, если уведомление принято, False - если очередь переполнена
+        """
+        self._ensure_started()
+        try:
+            self.queues[hash(chat_id) % self.workers].put_nowait((chat_id, text, kwargs))
+            return True
+        except queue.Full:
+            logger.error(f"[NOTIFY] Queue is full, notification to {chat_id} dropped.")
+            return False
+
+    def _send(self, chat_id, text, kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                self.bot.send_message(chat_id, text, **kwargs)
+                return True
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+                    logger.warning(f"[NOTIFY] Flood limit hit, pausing for {retry_after} s.")
+                    self.bucket.pause(retry_after)
+                    continue
+                logger.error(f"[NOTIFY] Error sending notification to {chat_id}: {e}")
+                return False
+            except Exception as e:
+                logger.error(f"[NOTIFY] Error sending notification to {chat_id}: {e}")
+                return False
+        logger.error(f"[NOTIFY] Notification to {chat_id} dropped after {self.max_retries} retries.")
+        return False
+
+    def _worker(self, pending):
+        while True:
+            item = pending.get()
+            try:
+                if item is None:
+                    return
+                self._send(*item)
+            finally:
+                pending.task_done()
+
+    def _unfinished(self):
+        return sum(pending.unfinished_tasks for pending in self.queues)
+
+    def close(self):
+        """Дожидается отправки оставшихся уведомлений (не дольше close_timeout) и останавливает потоки."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        deadline = time.monotonic() + self.close_timeout
+        while self._unfinished() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if self._unfinished():
+            logger.warning(f"[NOTIFY] {self._unfinished()} notifications were not sent before shutdown.")
+            return
+        for pending in self.queues:
+            pending.put(None)
+        for thread in threads:
+            thread.join(timeout=1)
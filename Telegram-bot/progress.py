@@ -0,0 +1,102 @@
+import logging
+import threading
+import telebot
+from config import PROGRESS_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class LoadingIndicator:
+    """
+    Сообщение о ходе загрузки, которое обновляется по реальным событиям парсера.
+    Сам объект передается парсеру как функция progress(stage, **info): он только
+    запоминает последнее состояние, а редактирует сообщение отдельный поток
+    не чаще раза в interval секунд, не задерживая загрузку.
+    """
+
+    def __init__(self, bot, chat_id, title, interval=PROGRESS_EDIT_INTERVAL):
+        """
+        :param bot: Экземпляр TeleBot
+        :param chat_id: ID чата, в который отправляется сообщение
+        :param title: Текст индикатора, например "Загружаю новости"
+        :param interval: Минимальный интервал между правками сообщения (в секундах)
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.title = title
+        self.interval = interval
+        self.message_id = None
+        self._text = f"⏳ {title}..."
+        self._shown_text = None
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __call__(self, stage, **info):
+        if stage == "page_loaded":
+            text = f"⏳ {self.title}: страница загружена, материалов: {info.get('items', 0)}"
+        elif stage == "load_more":
+            text = f"⏳ {self.title}: подгружено материалов: {info.get('items', 0)} ({info.get('cycle')}/{info.get('cycles')})"
+        elif stage == "parsing":
+            text = f"⏳ {self.title}: разбираю материалы ({info.get('items', 0)})..."
+        else:
+            return
+        with self._lock:
+            self._text = text
+        self._changed.set()
+
+    def _edit(self):
+        with self._lock:
+            text = self._text
+        if text == self._shown_text:
+            return
+        try:
+            self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            self._shown_text = text
+        except telebot.apihelper.ApiTelegramException as e:
+            if "message is not modified" in str(e):
+                self._shown_text = text
+            else:
+                logger.debug(f"[PROGRESS] Failed to edit loading message: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._changed.wait()
+            if self._stop.is_set():
+                break
+            self._changed.clear()
+            self._edit()
+            # Ограничиваем частоту правок, чтобы не расходовать лимиты Telegram API
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Отправляет сообщение о загрузке и запускает поток обновлений."""
+        message = self.bot.send_message(self.chat_id, self._text, reply_markup=None)
+        self.message_id = message.message_id
+        self._shown_text = self._text
+        self._thread = threading.Thread(target=self._run, name="LoadingIndicator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, delete=True):
+        """
+        Останавливает обновления и по умолчанию удаляет сообщение о загрузке
+        :param delete: Удалить ли сообщение
+        """
+        self._stop.set()
+        self._changed.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if delete and self.message_id is not None:
+            try:
+                self.bot.delete_message(chat_id=self.chat_id, message_id=self.message_id)
+            except Exception as e:
+                logger.error(f"[PROGRESS] Failed to delete loading message: {e}")
+            self.message_id = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
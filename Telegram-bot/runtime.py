@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from config import RUNTIME_POLL_TIMEOUT
+from dispatcher import install_dispatcher
+
+logger = logging.getLogger(__name__)
+
+class AsyncBotRuntime:
+    """
+    Общий цикл asyncio для нескольких синхронных ботов TeleBot.
+    Длинный опрос каждого бота выполняется в отдельной задаче цикла,
+    а обработка обновлений уходит в диспетчер с пулами потоков (см. dispatcher.py),
+    поэтому медленный запрос одного пользователя (парсинг, Selenium, графики)
+    не задерживает ответы остальным и не блокирует опрос второго бота.
+    """
+
+    def __init__(self, bots, poll_timeout=RUNTIME_POLL_TIMEOUT):
+        """
+        :param bots: Словарь {имя: экземпляр TeleBot}
+        :param poll_timeout: Таймаут длинного опроса Telegram (в секундах)
+        """
+        self.bots = bots
+        self.poll_timeout = poll_timeout
+        self._stop = None
+
+    async def _poll(self, name, bot):
+        offset = None
+        logger.info(f"[RUNTIME] {name}: polling started.")
+        while not self._stop.is_set():
+            try:
+                updates = await asyncio.to_thread(
+                    bot.get_updates, offset=offset,
+                    timeout=self.poll_timeout, long_polling_timeout=self.poll_timeout
+                )
+            except Exception as e:
+                logger.error(f"[RUNTIME] {name}: failed to get updates: {e}")
+                await asyncio.sleep(3)
+                continue
+
+            if not updates:
+                continue
+            offset = updates[-1].update_id + 1
+            try:
+                # Диспетчер только ставит обработчики в очереди чатов, поэтому вызов короткий
+                await asyncio.to_thread(bot.process_new_updates, updates)
+            except Exception as e:
+                logger.error(f"[RUNTIME] {name}: error while dispatching updates: {e}", exc_info=True)
+        logger.info(f"[RUNTIME] {name}: polling stopped.")
+
+    async def run(self):
+        """Опрашивает всех ботов до вызова stop()."""
+        self._stop = asyncio.Event()
+        dispatchers = [install_dispatcher(bot) for bot in self.bots.values()]
+        try:
+            await asyncio.gather(*(self._poll(name, bot) for name, bot in self.bots.items()))
+        finally:
+            # Дожидаемся уже принятых обновлений, чтобы не потерять ответы пользователям
+            for dispatcher in dispatchers:
+                await asyncio.to_thread(dispatcher.close)
+
+    def stop(self):
+        """Останавливает опрос после завершения текущих запросов к Telegram."""
+        if self._stop is not None:
+            self._stop.set()
+
+def run_bots(bots):
+    """
+    Запускает ботов в общем цикле asyncio и блокирует поток до остановки (Ctrl+C)
+    :param bots: Словарь {имя: экземпляр TeleBot}
+    """
+    runtime = AsyncBotRuntime(bots)
+    try:
+        asyncio.run(runtime.run())
+    except KeyboardInterrupt:
+        logger.info("[RUNTIME] Interrupted, shutting down.")
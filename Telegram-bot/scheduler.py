@@ -1,12 +1,12 @@
 import schedule
 import time
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 from telebot import types
 import logging
-from database import get_all_users, is_new_user
 from bot_instance import bot
+from broadcast import Broadcaster
 
 # Настройка логирования для отслеживания ошибок и важных событий
 logger = logging.getLogger(__name__)
@@ -24,21 +24,16 @@ def send_daily_notification(bot):
         events_button = types.InlineKeyboardButton("📅 События", callback_data="daily_events")
         markup.add(news_button, events_button)
 
-        # Получаем список всех пользователей из базы данных
-        users = get_all_users()
-
-        # Отправляем сообщение каждому пользователю
-        for user_id in users:
-            # Пропускаем новых пользователей (зарегистрировавшихся менее 24 часов назад)
-            if not is_new_user(user_id):
-                try:
-                    bot.send_message(
-                        user_id,
-                        "📢 Появились новые новости и события! Хотите посмотреть?",
-                        reply_markup=markup
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке уведомления пользователю {user_id}: {e}")
+        # Получатели выбираются одним запросом к базе: новые пользователи
+        # (зарегистрировавшиеся менее 24 часов назад) в выборку не попадают.
+        # Рассылка идет с соблюдением лимитов Telegram и продолжится после перезапуска бота
+        now = datetime.now()
+        Broadcaster(bot).run(
+            f"daily_{now.strftime('%Y-%m-%d')}",
+            "📢 Появились новые новости и события! Хотите посмотреть?",
+            reply_markup=markup,
+            registered_before=now - timedelta(hours=24)
+        )
 
     except Exception as e:
         logger.error(f"Ошибка в функции send_daily_notification: {e}")
@@ -55,6 +50,12 @@ def run_scheduler(bot):
     # Планируем отправку уведомлений на 12:00 МСК каждый день
     schedule.every().day.at("12:00").do(lambda: send_daily_notification(bot))
     
+    # Досылаем рассылки, прерванные предыдущей остановкой бота
+    try:
+        Broadcaster(bot).resume_unfinished()
+    except Exception as e:
+        logger.error(f"Ошибка при возобновлении рассылок: {e}")
+
     # Бесконечный цикл для проверки и выполнения запланированных задач
     while True:
         schedule.run_pending()
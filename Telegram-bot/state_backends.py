@@ -0,0 +1,337 @@
+import json
+import time
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+from config import STATE_BACKEND, STATE_CACHE_SIZE, REDIS_URL, REDIS_KEY_PREFIX
+from database import db
+
+logger = logging.getLogger(__name__)
+
+def json_round_trip(value):
+    """
+    Возвращает значение в том виде, в котором оно вернется из хранилища после JSON:
+    целые ключи словарей становятся строками, кортежи - списками.
+    """
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+class StateBackend:
+    """
+    Интерфейс хранилища состояний (см. state_store.py).
+    Значения - любые объекты, которые сериализуются в JSON. Сохраняется их
+    JSON-представление: целые ключи словарей возвращаются строками, кортежи - списками
+    (см. json_round_trip; StateStore кэширует значения уже в этом виде).
+    Хранилище с shared = True доступно нескольким процессам бота одновременно,
+    поэтому StateStore не кэширует его значения в памяти процесса.
+    """
+
+    shared = False
+
+    def get(self, namespace, key, max_age):
+        """
+        Читает значение, измененное не раньше max_age секунд назад
+        :return: Пара (значение, время изменения по time.time()) или None
+        """
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, max_age):
+        """Сохраняет значение. max_age подсказывает хранилищу, когда его можно удалить."""
+        raise NotImplementedError
+
+    def delete(self, namespace, key):
+        raise NotImplementedError
+
+    def add_unique(self, namespace, member, max_age):
+        """
+        Добавляет элемент в множество для отсева повторов
+        :return: True, если элемента не было (или он истек), иначе False
+        """
+        raise NotImplementedError
+
+    def remove_unique(self, namespace, member):
+        """Убирает элемент из множества, чтобы следующее добавление снова считалось первым."""
+        raise NotImplementedError
+
+    def purge(self, namespace, max_age):
+        """Удаляет значения и элементы множеств старше max_age секунд."""
+
+class MemoryBackend(StateBackend):
+    """
+    Хранилище в памяти процесса: быстрое, но теряется при перезапуске.
+    В каждом пространстве имен хранится не больше max_entries значений и столько же
+    элементов множеств; при переполнении забываются давно не использованные.
+    """
+
+    def __init__(self, max_entries=STATE_CACHE_SIZE):
+        """
+        :param max_entries: Сколько значений (и элементов множеств) хранить в одном пространстве имен
+        """
+        self.max_entries = max_entries
+        # namespace -> OrderedDict(key -> (значение, время изменения)), давно не использованные - в начале
+        self._values = {}
+        # namespace -> OrderedDict(элемент -> время добавления), давно добавленные - в начале
+        self._members = {}
+        self._lock = threading.Lock()
+
+    def _trim(self, entries):
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def get(self, namespace, key, max_age):
+        with self._lock:
+            values = self._values.get(namespace)
+            entry = values.get(key) if values else None
+            if entry is not None:
+                values.move_to_end(key)
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
+        return entry
+
+    def set(self, namespace, key, value, max_age):
+        with self._lock:
+            values = self._values.setdefault(namespace, OrderedDict())
+            values[key] = (json_round_trip(value), time.time())
+            values.move_to_end(key)
+            self._trim(values)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._values.get(namespace, {}).pop(key, None)
+
+    def add_unique(self, namespace, member, max_age):
+        now = time.time()
+        with self._lock:
+            members = self._members.setdefault(namespace, OrderedDict())
+            added_at = members.get(member)
+            if added_at is not None and now - added_at <= max_age:
+                return False
+            members[member] = now
+            members.move_to_end(member)
+            self._trim(members)
+            return True
+
+    def remove_unique(self, namespace, member):
+        with self._lock:
+            self._members.get(namespace, {}).pop(member, None)
+
+    def purge(self, namespace, max_age):
+        threshold = time.time() - max_age
+        with self._lock:
+            values = self._values.get(namespace, {})
+            for key in [key for key, entry in values.items() if entry[1] < threshold]:
+                del values[key]
+            members = self._members.get(namespace, {})
+            for member in [member for member, added_at in members.items() if added_at < threshold]:
+                del members[member]
+
+class SQLiteBackend(StateBackend):
+    """
+    Хранилище в базе пользователей (таблицы user_states и state_sets).
+    Переживает перезапуск; несколько процессов на одной машине могут работать
+    с одним файлом, но кэш в памяти у каждого свой.
+    """
+
+    def _connection(self):
+        return db.connection()
+
+    def get(self, namespace, key, max_age):
+        row = self._connection().execute(
+            'SELECT state, updated_at FROM user_states WHERE namespace = ? AND user_id = ? AND updated_at >= ?',
+            (namespace, key, time.time() - max_age)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, namespace, key, value, max_age):
+        conn = self._connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO user_states (namespace, user_id, state, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(namespace, user_id) DO UPDATE SET
+                    state = excluded.state, updated_at = excluded.updated_at
+            ''', (namespace, key, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def delete(self, namespace, key):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM user_states WHERE namespace = ? AND user_id = ?', (namespace, key))
+
+    def add_unique(self, namespace, member, max_age):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # Вставка или замена истекшей записи меняет одну строку, повтор - ни одной
+            changed = conn.execute('''
+                INSERT INTO state_sets (namespace, member, added_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(namespace, member) DO UPDATE SET added_at = excluded.added_at
+                WHERE state_sets.added_at < ?
+            ''', (namespace, str(member), now, now - max_age)).rowcount
+        return changed == 1
+
+    def remove_unique(self, namespace, member):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM state_sets WHERE namespace = ? AND member = ?', (namespace, str(member)))
+
+    def purge(self, namespace, max_age):
+        threshold = time.time() - max_age
+        conn = self._connection()
+        with conn:
+            deleted = conn.execute(
+                'DELETE FROM user_states WHERE namespace = ? AND updated_at < ?', (namespace, threshold)
+            ).rowcount
+            deleted += conn.execute(
+                'DELETE FROM state_sets WHERE namespace = ? AND added_at < ?', (namespace, threshold)
+            ).rowcount
+        if deleted:
+            logger.info(f"[STATE] Removed {deleted} expired records from '{namespace}'.")
+
+class RedisError(Exception):
+    """Ошибка, которую вернул сервер Redis."""
+
+class RedisClient:
+    """
+    Минимальный клиент протокола Redis (RESP) без внешних зависимостей:
+    соединение на поток, команды выполняются по одной.
+    Подходит для Redis, KeyDB, Valkey и совместимых серверов.
+    """
+
+    def __init__(self, url=REDIS_URL, timeout=5):
+        """
+        :param url: Адрес вида redis://[:пароль@]хост:порт/номер_базы
+        :param timeout: Таймаут сетевых операций (в секундах)
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self.password:
+            self._command('AUTH', self.password)
+        if self.db:
+            self._command('SELECT', self.db)
+
+    def _disconnect(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+    def _command(self, *args):
+        self._local.sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def execute(self, *args):
+        """Выполняет команду, один раз переподключаясь при обрыве соединения."""
+        for attempt in range(2):
+            try:
+                if getattr(self._local, 'sock', None) is None:
+                    self._connect()
+                return self._command(*args)
+            except (ConnectionError, OSError) as e:
+                self._disconnect()
+                if attempt:
+                    raise
+                logger.warning(f"[STATE] Redis connection lost, reconnecting: {e}")
+
+class RedisBackend(StateBackend):
+    """
+    Хранилище на сервере Redis: общее для всех процессов бота, поэтому
+    несколько рабочих процессов могут обслуживать один вебхук.
+    Истечение записей выполняет сам Redis (EX); время изменения хранится
+    рядом со значением. Значения хранятся в JSON и каждый раз читаются с сервера,
+    поэтому {1: 'a'} вернется как {'1': 'a'} уже при следующем чтении в том же процессе.
+    Для тестов и локальной разработки есть заглушка сервера: tests/redis_stub.py.
+    """
+
+    shared = True
+
+    def __init__(self, client=None, prefix=REDIS_KEY_PREFIX):
+        self.client = client or RedisClient()
+        self.prefix = prefix
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace, key, max_age):
+        value = self.client.execute('GET', self._key(namespace, key))
+        if value is None:
+            return None
+        record = json.loads(value)
+        return record['value'], record['updated_at']
+
+    def set(self, namespace, key, value, max_age):
+        record = json.dumps({'value': value, 'updated_at': time.time()}, ensure_ascii=False)
+        self.client.execute('SET', self._key(namespace, key), record, 'EX', int(max_age))
+
+    def delete(self, namespace, key):
+        self.client.execute('DEL', self._key(namespace, key))
+
+    def add_unique(self, namespace, member, max_age):
+        return self.client.execute('SET', self._key(f"{namespace}:set", member), 1, 'NX', 'EX', int(max_age)) == 'OK'
+
+    def remove_unique(self, namespace, member):
+        self.client.execute('DEL', self._key(f"{namespace}:set", member))
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+    'redis': RedisBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Возвращает общее для процесса хранилище, выбранное в config.STATE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STATE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown STATE_BACKEND: {STATE_BACKEND}")
+            _backend = BACKENDS[STATE_BACKEND]()
+            logger.info(f"[STATE] Using '{STATE_BACKEND}' state backend.")
+        return _backend
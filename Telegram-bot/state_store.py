@@ -0,0 +1,275 @@
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from telebot.storage import StateStorageBase, StateContext
+from config import STATE_CACHE_SIZE, STATE_IDLE_TTL, STATE_PURGE_INTERVAL
+from state_backends import get_backend, json_round_trip
+
+logger = logging.getLogger(__name__)
+
+# Отметка в памяти о том, что состояния у пользователя нет (чтобы не спрашивать хранилище повторно)
+_MISSING = object()
+
+class StateStore:
+    """
+    Состояния диалогов пользователей (FSM) с интерфейсом словаря.
+    Данные лежат в хранилище из state_backends.py (память, SQLite или Redis);
+    для хранилищ одного процесса перед ним стоит ограниченный кэш LRU:
+    в памяти хранится не больше max_entries пользователей.
+    Запись сразу попадает в хранилище, поэтому состояния переживают перезапуск.
+    Состояние, которое не менялось дольше ttl секунд, считается истекшим и удаляется.
+    Значения кэшируются в том виде, в котором их вернет хранилище (после JSON),
+    поэтому тип значения не зависит от того, было ли оно вытеснено из кэша.
+    Несколько ботов делят одно хранилище, разделяясь по пространствам имен.
+    """
+
+    def __init__(self, namespace, max_entries=STATE_CACHE_SIZE, ttl=STATE_IDLE_TTL,
+                 purge_interval=STATE_PURGE_INTERVAL, backend=None):
+        """
+        :param namespace: Пространство имен состояний, например 'main' или 'support'
+        :param max_entries: Сколько пользователей держать в памяти
+        :param ttl: Время жизни состояния без изменений (в секундах)
+        :param purge_interval: Как часто удалять истекшие состояния из хранилища (в секундах)
+        :param backend: Хранилище (по умолчанию - выбранное в config.STATE_BACKEND)
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._backend = backend
+        # user_id -> (состояние или _MISSING, время последнего изменения)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._purged_at = time.time()
+
+    @property
+    def backend(self):
+        # Хранилище выбирается при первом обращении, а не при импорте модуля
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def _cache_enabled(self):
+        # Общее для нескольких процессов хранилище нельзя кэшировать: другой процесс мог изменить состояние
+        return self.max_entries > 0 and not self.backend.shared
+
+    def _remember(self, user_id, state, updated_at):
+        if not self._cache_enabled():
+            return
+        with self._lock:
+            self._cache[user_id] = (state, updated_at)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _load(self, user_id):
+        """Читает состояние из хранилища. Возвращает (состояние или _MISSING, время изменения)."""
+        try:
+            entry = self.backend.get(self.namespace, user_id, self.ttl)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to load state {self.namespace}/{user_id}: {e}")
+            return _MISSING, time.time()
+        # Время изменения берется из хранилища, чтобы перечитывание не продлевало жизнь состояния
+        return entry if entry is not None else (_MISSING, time.time())
+
+    def _lookup(self, user_id):
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                self._cache.move_to_end(user_id)
+        if entry is None:
+            entry = self._load(user_id)
+            self._remember(user_id, *entry)
+        state, updated_at = entry
+        if state is not _MISSING and now - updated_at > self.ttl:
+            logger.debug(f"[STATE] State {self.namespace}/{user_id} expired.")
+            self._delete(user_id)
+            return _MISSING
+        return state
+
+    def _delete(self, user_id):
+        self._remember(user_id, _MISSING, time.time())
+        try:
+            self.backend.delete(self.namespace, user_id)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to delete state {self.namespace}/{user_id}: {e}")
+
+    def _purge_if_due(self, now):
+        """Удаляет из хранилища истекшие состояния не чаще раза в purge_interval секунд."""
+        with self._lock:
+            if now - self._purged_at < self.purge_interval:
+                return
+            self._purged_at = now
+        try:
+            self.backend.purge(self.namespace, self.ttl)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to purge expired states from '{self.namespace}': {e}")
+
+    def get(self, user_id, default=None):
+        state = self._lookup(user_id)
+        return default if state is _MISSING else state
+
+    def pop(self, user_id, default=None):
+        state = self._lookup(user_id)
+        if state is _MISSING:
+            return default
+        self._delete(user_id)
+        return state
+
+    def __getitem__(self, user_id):
+        state = self._lookup(user_id)
+        if state is _MISSING:
+            raise KeyError(user_id)
+        return state
+
+    def __setitem__(self, user_id, state):
+        now = time.time()
+        try:
+            state = json_round_trip(state)
+        except (TypeError, ValueError) as e:
+            logger.error(f"[STATE] State {self.namespace}/{user_id} is not JSON-serializable: {e}")
+            return
+        self._remember(user_id, state, now)
+        try:
+            self.backend.set(self.namespace, user_id, state, self.ttl)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to save state {self.namespace}/{user_id}: {e}")
+        self._purge_if_due(now)
+
+    def __delitem__(self, user_id):
+        if self._lookup(user_id) is _MISSING:
+            raise KeyError(user_id)
+        self._delete(user_id)
+
+    def __contains__(self, user_id):
+        return self._lookup(user_id) is not _MISSING
+
+class DedupSet:
+    """
+    Множество для отсева повторов (например, уже обработанных обновлений),
+    общее для всех процессов, если хранилище общее. Элементы забываются через ttl секунд.
+    """
+
+    def __init__(self, namespace, ttl=STATE_IDLE_TTL, purge_interval=STATE_PURGE_INTERVAL, backend=None):
+        """
+        :param namespace: Пространство имен множества
+        :param ttl: Сколько секунд помнить элемент
+        :param purge_interval: Как часто удалять забытые элементы из хранилища (в секундах)
+        :param backend: Хранилище (по умолчанию - выбранное в config.STATE_BACKEND)
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._purged_at = time.time()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def add(self, member):
+        """
+        Добавляет элемент
+        :return: True, если элемент встретился впервые (или хранилище недоступно), иначе False
+        """
+        now = time.time()
+        with self._lock:
+            purge_due = now - self._purged_at >= self.purge_interval
+            if purge_due:
+                self._purged_at = now
+        try:
+            if purge_due:
+                self.backend.purge(self.namespace, self.ttl)
+            return self.backend.add_unique(self.namespace, member, self.ttl)
+        except Exception as e:
+            # Лучше обработать повтор, чем потерять новое обновление
+            logger.error(f"[STATE] Dedup check failed for {self.namespace}/{member}: {e}")
+            return True
+
+    def discard(self, member):
+        """Забывает элемент, например если обновление не удалось обработать и его доставят повторно."""
+        try:
+            self.backend.remove_unique(self.namespace, member)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to discard {self.namespace}/{member}: {e}")
+
+class TeleBotStateStorage(StateStorageBase):
+    """
+    Хранилище состояний telebot (bot.set_state/bot.retrieve_data) поверх StateStore,
+    замена StateMemoryStorage, которое привязывает бота к одному процессу.
+    Запись для пары (чат, пользователь) имеет вид {'state': ..., 'data': {...}}.
+    """
+
+    def __init__(self, namespace='telebot'):
+        """
+        :param namespace: Пространство имен состояний бота
+        """
+        super().__init__()
+        self.store = StateStore(namespace)
+
+    @staticmethod
+    def _key(chat_id, user_id):
+        return f"{chat_id}:{user_id}"
+
+    def _record(self, chat_id, user_id):
+        record = self.store.get(self._key(chat_id, user_id))
+        # Копия, чтобы изменения не попали в кэш StateStore до сохранения
+        return copy.deepcopy(record) if record is not None else None
+
+    def set_state(self, chat_id, user_id, state):
+        if hasattr(state, 'name'):
+            state = state.name
+        record = self._record(chat_id, user_id) or {'state': None, 'data': {}}
+        record['state'] = state
+        self.store[self._key(chat_id, user_id)] = record
+        return True
+
+    def delete_state(self, chat_id, user_id):
+        return self.store.pop(self._key(chat_id, user_id)) is not None
+
+    def get_state(self, chat_id, user_id):
+        record = self._record(chat_id, user_id)
+        return record['state'] if record else None
+
+    def get_data(self, chat_id, user_id):
+        record = self._record(chat_id, user_id)
+        return record['data'] if record else None
+
+    def reset_data(self, chat_id, user_id):
+        record = self._record(chat_id, user_id)
+        if record is None:
+            return False
+        record['data'] = {}
+        self.store[self._key(chat_id, user_id)] = record
+        return True
+
+    def set_data(self, chat_id, user_id, key, value):
+        record = self._record(chat_id, user_id)
+        if record is None:
+            raise RuntimeError(f'chat_id {chat_id} and user_id {user_id} does not exist')
+        record['data'][key] = value
+        self.store[self._key(chat_id, user_id)] = record
+        return True
+
+    def get_interactive_data(self, chat_id, user_id):
+        return StateContext(self, chat_id, user_id)
+
+    def save(self, chat_id, user_id, data):
+        record = self._record(chat_id, user_id) or {'state': None, 'data': {}}
+        record['data'] = data
+        self.store[self._key(chat_id, user_id)] = record
+
+# Состояния основного бота (handlers.py и bot.py)
+main_states = StateStore('main')
+# ID последнего сообщения с вопросом "Хотите посмотреть за неделю?" в основном боте
+question_messages = StateStore('main_questions')
+# Состояния бота поддержки
+support_states = StateStore('support')
+# Последний поисковый запрос администратора в боте поддержки (для листания результатов)
+support_searches = StateStore('support_search')
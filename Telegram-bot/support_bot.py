@@ -5,10 +5,15 @@ from datetime import datetime
 from support_db import SupportDB
 import os
 from bot_instance import support_bot as bot
+from state_store import support_states, support_searches
+from notifications import NotificationQueue
 
 # Инициализация объекта для работы с базой данных обращений
 db = SupportDB()
 
+# Очередь уведомлений: администраторы и пользователи получают их в фоне, не задерживая ответ боту
+notifier = NotificationQueue(bot)
+
 # Настройка логирования для записи событий бота в файл и вывода в консоль
 logging.basicConfig(
     level=logging.INFO, # Уровень логирования: INFO (информационные сообщения и выше)
@@ -26,9 +31,10 @@ ADMIN_IDS = [
     858193022   # еще один администратор (пример)
 ]
 
-# Словарь для хранения текущих состояний пользователей (для реализации FSM - конечного автомата)
-# Позволяет боту помнить, на каком шаге взаимодействия находится каждый пользователь
-user_states = {}
+# Текущие состояния пользователей (для реализации FSM - конечного автомата).
+# Позволяют боту помнить, на каком шаге взаимодействия находится каждый пользователь,
+# в том числе после перезапуска; неактивные состояния истекают (см. state_store.py)
+user_states = support_states
 
 # Категории обращений, которые пользователи могут выбрать при создании тикета
 # Каждая категория имеет русское название для отображения и английский ключ для внутренней логики
@@ -43,6 +49,12 @@ TICKET_CATEGORIES = {
 # Обратный маппинг для отображения категорий по их внутреннему ключу
 REVERSE_TICKET_CATEGORIES = {v: k for k, v in TICKET_CATEGORIES.items()}
 
+# Сколько обращений показывать в одном сообщении списка
+TICKETS_PAGE_SIZE = 5
+
+# Максимальная длина текста одного сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
 def create_main_keyboard(is_admin=False):
     """
     Создает основную клавиатуру для пользователя.
@@ -169,15 +181,81 @@ def handle_category_selection(message):
         )
     )
 
+def format_ticket_summary(ticket, scope):
+    """Краткое описание обращения для списка.
+    :param ticket: Словарь с данными обращения.
+    :param scope: 'my' - список обращений пользователя, 'open' - список открытых обращений для администратора.
+    :return: Текст описания обращения.
+    """
+    category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана') # Получаем отображаемое название категории
+    if scope == 'open':
+        return (
+            f"🟢 Обращение #{ticket['id']}\n" # Номер обращения и статус
+            f"От: {ticket['username']}\n" # От кого обращение
+            f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания
+            f"Категория: {category_display}\n" # Категория
+            f"Ответственный: {ticket['assigned_admin'] or 'не назначен'}\n" # Назначенный администратор
+            f"Текст: {ticket['subject']}\n" # Текст обращения
+            f"Для ответа отправьте: /reply_{ticket['id']}" # Инструкция для ответа
+        )
+    status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Определяем эмодзи статуса (открыто/закрыто)
+    return (
+        f"{status_emoji} Обращение #{ticket['id']}\n" # Номер обращения и его статус
+        f"Статус: {ticket['status']}\n" # Текстовый статус
+        f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания (без микросекунд)
+        f"Категория: {category_display}\n" # Категория обращения
+        f"Текст: {ticket['subject']}\n" # Текст обращения
+        f"Для просмотра деталей отправьте: /ticket_{ticket['id']}" # Инструкция для просмотра деталей
+    )
+
+def build_tickets_page(scope, user_id, cursor=None, direction='next'):
+    """Формирует одну страницу списка обращений.
+    Из базы читается только эта страница; соседние страницы открываются кнопками,
+    в которых записан курсор (updated_at, id) крайнего обращения страницы.
+    :param scope: 'my' - обращения пользователя user_id, 'open' - открытые обращения.
+    :param user_id: ID пользователя, который смотрит список.
+    :param cursor: Курсор из кнопки или None для первой страницы.
+    :param direction: 'next' или 'prev'.
+    :return: Пара (текст, клавиатура) или None, если на странице нет обращений.
+    """
+    if scope == 'open':
+        page = db.get_open_tickets_page(TICKETS_PAGE_SIZE, cursor, direction)
+        title = "📨 Открытые обращения:"
+    else:
+        page = db.get_user_tickets_page(user_id, TICKETS_PAGE_SIZE, cursor, direction)
+        title = "📋 Ваши обращения:"
+    tickets = page['tickets']
+    if not tickets:
+        return None
+
+    text = title + "\n\n" + "\n\n".join(format_ticket_summary(ticket, scope) for ticket in tickets)
+
+    # Кнопки листания; в callback_data помещаются курсор и направление (не длиннее 64 байт)
+    buttons = []
+    if page['has_prev']:
+        first = tickets[0]
+        buttons.append(types.InlineKeyboardButton(
+            "◀️ Назад", callback_data=f"tickets_{scope}_prev_{first['id']}_{first['updated_at']}"
+        ))
+    if page['has_next']:
+        last = tickets[-1]
+        buttons.append(types.InlineKeyboardButton(
+            "Далее ▶️", callback_data=f"tickets_{scope}_next_{last['id']}_{last['updated_at']}"
+        ))
+    keyboard = types.InlineKeyboardMarkup()
+    if buttons:
+        keyboard.row(*buttons)
+    return text, keyboard
+
 @bot.message_handler(func=lambda message: message.text == "📋 Мои обращения")
 def show_user_tickets(message):
-    """Показывает список всех обращений, созданных текущим пользователем.
+    """Показывает первую страницу обращений, созданных текущим пользователем.
     Отображает статус, дату создания, категорию и тему каждого обращения.
     :param message: Объект сообщения от пользователя, запросившего свои обращения.
     """
-    tickets = db.get_user_tickets(message.from_user.id) # Получаем все обращения пользователя из базы данных
-    
-    if not tickets: # Если обращений нет
+    page = build_tickets_page('my', message.from_user.id) # Получаем первую страницу обращений пользователя
+
+    if not page: # Если обращений нет
         bot.send_message(
             message.chat.id,
             "У вас пока нет обращений.",
@@ -185,20 +263,8 @@ def show_user_tickets(message):
         )
         return
 
-    # Проходим по каждому обращению и формируем сообщение
-    for ticket in tickets:
-        status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Определяем эмодзи статуса (открыто/закрыто)
-        # Получаем отображаемое название категории, используя обратный маппинг
-        category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана')
-        ticket_text = (
-            f"{status_emoji} Обращение #{ticket['id']}\n" # Номер обращения и его статус
-            f"Статус: {ticket['status']}\n" # Текстовый статус
-            f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания (без микросекунд)
-            f"Категория: {category_display}\n" # Категория обращения
-            f"Текст: {ticket['subject']}\n\n" # Текст обращения
-            f"Для просмотра деталей отправьте: /ticket_{ticket['id']}" # Инструкция для просмотра деталей
-        )
-        bot.send_message(message.chat.id, ticket_text) # Отправляем информацию об обращении
+    text, keyboard = page
+    bot.send_message(message.chat.id, text, reply_markup=keyboard) # Отправляем страницу одним сообщением
 
 @bot.message_handler(func=lambda message: message.text == "🛠️ Панель администратора")
 def show_admin_panel(message):
@@ -217,69 +283,178 @@ def show_admin_panel(message):
 
 @bot.message_handler(func=lambda message: message.text == "📨 Открытые обращения")
 def show_open_tickets(message):
-    """Показывает список всех открытых обращений для администраторов.
-    Отображает информацию о каждом открытом тикете.
+    """Показывает первую страницу открытых обращений для администраторов.
+    Отображает информацию о каждом открытом тикете на странице.
     :param message: Объект сообщения от администратора.
     """
     if message.from_user.id not in ADMIN_IDS: # Проверяем права доступа
         return
 
-    tickets = db.get_open_tickets() # Получаем список открытых обращений из базы данных
-    if not tickets: # Если нет открытых обращений
+    page = build_tickets_page('open', message.from_user.id) # Получаем первую страницу открытых обращений
+    if not page: # Если нет открытых обращений
         bot.send_message(message.chat.id, "Нет открытых обращений.")
         return
 
-    # Проходим по каждому открытому обращению и формируем сообщение
-    for ticket in tickets:
-        category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана') # Получаем отображаемое название категории
-        ticket_text = (
-            f"🟢 Обращение #{ticket['id']}\n" # Номер обращения и статус
-            f"От: {ticket['username']}\n" # От кого обращение
-            f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания
-            f"Категория: {category_display}\n" # Категория
-            f"Текст: {ticket['subject']}\n\n" # Текст обращения
-            f"Для ответа отправьте: /reply_{ticket['id']}" # Инструкция для ответа
-        )
-        bot.send_message(message.chat.id, ticket_text) # Отправляем информацию об обращении
+    text, keyboard = page
+    bot.send_message(message.chat.id, text, reply_markup=keyboard) # Отправляем страницу одним сообщением
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('tickets_'))
+def turn_tickets_page(call):
+    """Обработчик кнопок листания списка обращений.
+    Заменяет текст сообщения со списком на соседнюю страницу.
+    :param call: Объект callback-запроса с курсором страницы.
+    """
+    try:
+        _, scope, direction, ticket_id, updated_at = call.data.split('_', 4) # Разбираем область списка, направление и курсор
+        if scope == 'open' and call.from_user.id not in ADMIN_IDS: # Открытые обращения доступны только администраторам
+            bot.answer_callback_query(call.id, "У вас нет доступа к этому списку.")
+            return
+
+        page = build_tickets_page(scope, call.from_user.id, (updated_at, int(ticket_id)), direction)
+        if not page: # Обращения могли закрыться или обновиться с момента показа страницы
+            bot.answer_callback_query(call.id, "Больше обращений нет.")
+            return
+
+        text, keyboard = page
+        bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=keyboard)
+        bot.answer_callback_query(call.id)
+    except Exception as e:
+        logger.error(f"Ошибка при листании обращений ({call.data}): {e}")
+        bot.answer_callback_query(call.id, "Не удалось загрузить страницу.")
+
+def message_length(text):
+    """Длина текста так, как ее считает Telegram (в единицах UTF-16).
+    :param text: Текст сообщения.
+    :return: Длина текста.
+    """
+    return len(text.encode('utf-16-le')) // 2
+
+def truncate_text(text, limit):
+    """Обрезает текст до limit единиц длины Telegram, добавляя многоточие.
+    :param text: Исходный текст.
+    :param limit: Допустимая длина.
+    :return: Текст не длиннее limit.
+    """
+    if message_length(text) <= limit:
+        return text
+    text = text[:max(limit - 1, 0)]
+    while text and message_length(text) > limit - 1:
+        text = text[:-1]
+    return text + '…'
+
+def format_ticket_header(ticket):
+    """Шапка обращения перед перепиской: статус, автор, дата, категория и тема.
+    :param ticket: Словарь с данными обращения.
+    :return: Текст шапки.
+    """
+    status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Эмодзи статуса
+    category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана') # Отображаемое название категории
+    return (
+        f"{status_emoji} Обращение #{ticket['id']}\n" # Номер и статус
+        f"Статус: {ticket['status']}\n" # Текстовый статус
+        f"От: {ticket['username']}\n" # От кого обращение
+        f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания
+        f"Категория: {category_display}\n" # Категория
+        f"Текст: {ticket['subject']}\n\n" # Текст
+        "Переписка:\n" # Заголовок для переписки
+    )
+
+def build_transcript_page(ticket, viewer_id, cursor=None, direction='older'):
+    """Формирует одну страницу переписки по обращению, не длиннее лимита Telegram.
+    Сообщения читаются из базы по курсору, пока помещаются на страницу, и режутся
+    только по границам сообщений; вся переписка в память не загружается.
+    Первая страница показывает самые новые сообщения.
+    :param ticket: Словарь с данными обращения (без переписки).
+    :param viewer_id: ID пользователя, который смотрит переписку.
+    :param cursor: Пара (created_at, id) крайнего сообщения соседней страницы или None.
+    :param direction: 'older' - сообщения старше курсора, 'newer' - новее курсора.
+    :return: Пара (текст, клавиатура с кнопками листания).
+    """
+    header = format_ticket_header(ticket)
+    # Добавляем инструкции для ответа, если обращение открыто
+    footer = f"\nДля ответа отправьте: /reply_{ticket['id']}" if ticket['status'] == 'open' else ""
+    budget = MAX_MESSAGE_LENGTH - message_length(header) - message_length(footer)
+    viewer_is_admin = viewer_id in ADMIN_IDS
+
+    entries = [] # Пары (сообщение, его текст на странице)
+    has_more = False # Есть ли сообщения дальше в направлении чтения
+    for msg in db.iter_messages(ticket['id'], cursor, direction):
+        # Определяем отправителя сообщения: администратор видит, кто писал, пользователь - свои сообщения и ответы поддержки
+        if viewer_is_admin:
+            sender = "👨‍💼 Поддержка" if msg['is_admin'] else "👤 Пользователь"
+        else:
+            sender = "👤 Вы" if msg['user_id'] == viewer_id else "👨‍💼 Поддержка"
+        entry = f"\n{sender} ({str(msg['created_at']).split('.')[0]}):\n{msg['message']}\n"
+        length = message_length(entry)
+        if length > budget:
+            if entries:
+                has_more = True
+                break
+            # Одно сообщение длиннее страницы - показываем его начало
+            entry = truncate_text(entry, budget)
+            length = budget
+        entries.append((msg, entry))
+        budget -= length
+
+    if direction == 'older':
+        entries.reverse() # На странице сообщения идут от старых к новым
+    text = header + "".join(entry for _, entry in entries) + footer
+
+    has_older = has_more if direction == 'older' else cursor is not None
+    has_newer = cursor is not None if direction == 'older' else has_more
+    buttons = []
+    if entries and has_older:
+        oldest = entries[0][0]
+        buttons.append(types.InlineKeyboardButton(
+            "◀️ Старше", callback_data=f"transcript_{ticket['id']}_older_{oldest['id']}_{oldest['created_at']}"
+        ))
+    if entries and has_newer:
+        newest = entries[-1][0]
+        buttons.append(types.InlineKeyboardButton(
+            "Новее ▶️", callback_data=f"transcript_{ticket['id']}_newer_{newest['id']}_{newest['created_at']}"
+        ))
+    keyboard = types.InlineKeyboardMarkup()
+    if buttons:
+        keyboard.row(*buttons)
+    return text, keyboard
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('transcript_'))
+def turn_transcript_page(call):
+    """Обработчик кнопок листания переписки по обращению.
+    :param call: Объект callback-запроса с ID обращения, направлением и курсором.
+    """
+    try:
+        _, ticket_id, direction, message_id, created_at = call.data.split('_', 4) # Разбираем обращение, направление и курсор
+        ticket = db.get_ticket(int(ticket_id), with_messages=False)
+        # Проверяем наличие обращения и права доступа к нему
+        if not ticket or (ticket['user_id'] != call.from_user.id and call.from_user.id not in ADMIN_IDS):
+            bot.answer_callback_query(call.id, "Обращение не найдено или у вас нет к нему доступа.")
+            return
+
+        text, keyboard = build_transcript_page(ticket, call.from_user.id, (created_at, int(message_id)), direction)
+        bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=keyboard)
+        bot.answer_callback_query(call.id)
+    except Exception as e:
+        logger.error(f"Ошибка при листании переписки ({call.data}): {e}")
+        bot.answer_callback_query(call.id, "Не удалось загрузить страницу.")
 
 @bot.message_handler(func=lambda message: message.text and message.text.startswith('/ticket_'))
 def view_ticket(message):
     """Показывает подробные детали конкретного обращения по его ID.
-    Включает всю переписку по обращению.
+    Включает переписку по обращению: последние сообщения и кнопки для листания к более старым.
     :param message: Объект сообщения, содержащий команду /ticket_ID.
     """
     try:
         ticket_id = int(message.text.split('_')[1]) # Извлекаем ID обращения из команды
-        ticket = db.get_ticket(ticket_id) # Получаем данные обращения из базы данных
+        ticket = db.get_ticket(ticket_id, with_messages=False) # Получаем данные обращения из базы данных
         
         # Проверяем наличие обращения и права доступа к нему
         if not ticket or (ticket['user_id'] != message.from_user.id and message.from_user.id not in ADMIN_IDS):
             bot.send_message(message.chat.id, "Обращение не найдено или у вас нет к нему доступа.")
             return
 
-        # Формируем сообщение с деталями обращения
-        status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Эмодзи статуса
-        category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана') # Отображаемое название категории
-        ticket_text = (
-            f"{status_emoji} Обращение #{ticket['id']}\n" # Номер и статус
-            f"Статус: {ticket['status']}\n" # Текстовый статус
-            f"От: {ticket['username']}\n" # От кого обращение
-            f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания
-            f"Категория: {category_display}\n" # Категория
-            f"Текст: {ticket['subject']}\n\n" # Текст
-            "Переписка:\n" # Заголовок для переписки
-        )
-
-        # Добавляем все сообщения из переписки по данному обращению
-        for msg in ticket['messages']:
-            sender = "👤 Вы" if msg['user_id'] == message.from_user.id else "👨‍💼 Поддержка" # Определяем отправителя сообщения
-            ticket_text += f"\n{sender} ({str(msg['created_at']).split('.')[0]}):\n{msg['message']}\n" # Форматируем и добавляем сообщение
-
-        # Добавляем инструкции для ответа, если обращение открыто
-        if ticket['status'] == 'open':
-            ticket_text += f"\nДля ответа отправьте: /reply_{ticket['id']}" # Инструкция для ответа
-
-        bot.send_message(message.chat.id, ticket_text)
+        text, keyboard = build_transcript_page(ticket, message.from_user.id) # Формируем страницу с последними сообщениями
+        bot.send_message(message.chat.id, text, reply_markup=keyboard)
 
     except (ValueError, IndexError):
         bot.send_message(message.chat.id, "Неверный формат команды.")
@@ -292,7 +467,7 @@ def reply_to_ticket(message):
     """
     try:
         ticket_id = int(message.text.split('_')[1]) # Извлекаем ID обращения
-        ticket = db.get_ticket(ticket_id) # Получаем информацию об обращении
+        ticket = db.get_ticket(ticket_id, with_messages=False) # Получаем информацию об обращении
         
         # Проверяем, существует ли обращение и имеет ли пользователь к нему доступ
         if not ticket or (ticket['user_id'] != message.from_user.id and message.from_user.id not in ADMIN_IDS):
@@ -358,9 +533,10 @@ def handle_back_button(message):
 
 @bot.message_handler(func=lambda message: user_states.get(message.from_user.id, {}).get('state') == 'waiting_ticket_search')
 def search_ticket_process(message):
-    """Обработчик процесса поиска обращения по ID для администраторов.
-    Принимает введенный ID и отображает детали обращения или сообщение об ошибке.
-    :param message: Объект сообщения с введенным ID обращения.
+    """Обработчик процесса поиска обращения для администраторов.
+    Принимает введенный ID и отображает детали обращения или сообщение об ошибке;
+    любой другой текст ищется по темам обращений и переписке.
+    :param message: Объект сообщения с введенным ID обращения или словами для поиска.
     """
     if message.text == "❌ Отмена": # Если администратор отменил поиск
         user_states.pop(message.from_user.id, None) # Удаляем состояние поиска
@@ -371,9 +547,15 @@ def search_ticket_process(message):
         )
         return
 
+    query = (message.text or '').strip()
+    if not query.isdigit(): # Не номер обращения - ищем по словам в темах и переписке
+        user_states.pop(message.from_user.id, None) # Очищаем состояние поиска
+        show_search_results(message, query)
+        return
+
     try:
-        ticket_id = int(message.text.strip()) # Преобразуем текст сообщения в числовой ID
-        ticket = db.get_ticket(ticket_id) # Получаем обращение из базы данных
+        ticket_id = int(query) # Преобразуем текст сообщения в числовой ID
+        ticket = db.get_ticket(ticket_id, with_messages=False) # Получаем обращение из базы данных
         
         if not ticket: # Если обращение не найдено
             # Отправляем более подробное сообщение, если обращение не найдено
@@ -390,29 +572,17 @@ def search_ticket_process(message):
                     reply_markup=create_admin_keyboard()
                 )
         else:
-            # Формируем сообщение с деталями найденного обращения
-            status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Эмодзи статуса
-            category_display = REVERSE_TICKET_CATEGORIES.get(ticket['category'], 'не указана') # Отображаемое название категории
-            ticket_text = (
-                f"{status_emoji} Обращение #{ticket['id']}\n" # Номер обращения и статус
-                f"Статус: {ticket['status']}\n" # Текстовый статус
-                f"От: {ticket['username']}\n" # Отправитель
-                f"Создано: {str(ticket['created_at']).split('.')[0]}\n" # Дата и время создания
-                f"Категория: {category_display}\n" # Категория
-                f"Текст: {ticket['subject']}\n\n" # Текст
-                "Переписка:\n" # Заголовок для переписки
-            )
-            
-            # Добавляем все сообщения из переписки
-            for msg in ticket['messages']:
-                sender = "👤 Пользователь" if not msg['is_admin'] else "👨‍💼 Поддержка" # Определяем, кто отправил сообщение
-                ticket_text += f"\n{sender} ({str(msg['created_at']).split('.')[0]}):\n{msg['message']}\n" # Форматируем и добавляем сообщение
-            
-            bot.send_message(
-                message.chat.id,
-                ticket_text,
-                reply_markup=create_admin_keyboard() # Возвращаем административную клавиатуру
-            )
+            # Формируем страницу с деталями найденного обращения и последними сообщениями
+            text, keyboard = build_transcript_page(ticket, message.from_user.id)
+            if keyboard.keyboard: # У сообщения с кнопками листания не может быть обычной клавиатуры
+                bot.send_message(message.chat.id, "Выберите действие:", reply_markup=create_admin_keyboard())
+                bot.send_message(message.chat.id, text, reply_markup=keyboard)
+            else:
+                bot.send_message(
+                    message.chat.id,
+                    text,
+                    reply_markup=create_admin_keyboard() # Возвращаем административную клавиатуру
+                )
     except ValueError:
         # Если введенный ID не является числом
         bot.send_message(
@@ -430,6 +600,91 @@ def search_ticket_process(message):
     
     user_states.pop(message.from_user.id, None) # Очищаем состояние пользователя после обработки запроса
 
+def build_search_page(query, offset=0):
+    """Формирует страницу результатов полнотекстового поиска обращений.
+    :param query: Слова для поиска.
+    :param offset: Сколько лучших результатов пропустить.
+    :return: Пара (текст, клавиатура) или None, если ничего не найдено.
+    """
+    page = db.search_tickets(query, TICKETS_PAGE_SIZE, offset)
+    if not page['tickets']:
+        return None
+
+    entries = []
+    for ticket in page['tickets']:
+        status_emoji = "🟢" if ticket['status'] == 'open' else "🔴" # Эмодзи статуса
+        entry = (
+            f"{status_emoji} Обращение #{ticket['id']}\n" # Номер обращения и статус
+            f"От: {ticket['username']}\n" # Отправитель
+            f"Текст: {ticket['subject']}\n" # Тема обращения
+        )
+        if ticket['snippet']: # Отрывок сообщения, в котором найдены слова
+            entry += f"Найдено: {ticket['snippet']}\n"
+        entry += f"Подробнее: /ticket_{ticket['id']}"
+        entries.append(entry)
+    text = f"🔍 Результаты поиска «{query}»:\n\n" + "\n\n".join(entries)
+
+    buttons = []
+    if page['has_prev']:
+        buttons.append(types.InlineKeyboardButton("◀️ Назад", callback_data=f"search_page_{max(offset - TICKETS_PAGE_SIZE, 0)}"))
+    if page['has_next']:
+        buttons.append(types.InlineKeyboardButton("Далее ▶️", callback_data=f"search_page_{offset + TICKETS_PAGE_SIZE}"))
+    keyboard = types.InlineKeyboardMarkup()
+    if buttons:
+        keyboard.row(*buttons)
+    return text, keyboard
+
+def show_search_results(message, query):
+    """Показывает первую страницу результатов поиска обращений по словам.
+    Запрос запоминается, чтобы кнопки могли листать результаты.
+    :param message: Объект сообщения от администратора.
+    :param query: Слова для поиска.
+    """
+    try:
+        page = build_search_page(query)
+        if not page:
+            bot.send_message(
+                message.chat.id,
+                "По вашему запросу ничего не найдено.",
+                reply_markup=create_admin_keyboard()
+            )
+            return
+        support_searches[message.from_user.id] = query # Запоминаем запрос для листания страниц
+        text, keyboard = page
+        bot.send_message(message.chat.id, "Выберите действие:", reply_markup=create_admin_keyboard()) # Возвращаем административную клавиатуру
+        bot.send_message(message.chat.id, text, reply_markup=keyboard)
+    except Exception as e:
+        logger.error(f"Ошибка при поиске обращений по запросу '{query}': {e}")
+        bot.send_message(
+            message.chat.id,
+            "Произошла ошибка при поиске обращения. Попробуйте позже.",
+            reply_markup=create_admin_keyboard()
+        )
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('search_page_'))
+def turn_search_page(call):
+    """Обработчик кнопок листания результатов поиска.
+    :param call: Объект callback-запроса со смещением страницы.
+    """
+    if call.from_user.id not in ADMIN_IDS: # Поиск доступен только администраторам
+        bot.answer_callback_query(call.id, "У вас нет доступа к поиску обращений.")
+        return
+    query = support_searches.get(call.from_user.id)
+    if not query: # Запрос истек или был заменен
+        bot.answer_callback_query(call.id, "Поиск устарел, выполните его заново.")
+        return
+    try:
+        page = build_search_page(query, int(call.data.rsplit('_', 1)[1]))
+        if not page:
+            bot.answer_callback_query(call.id, "Больше результатов нет.")
+            return
+        text, keyboard = page
+        bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=keyboard)
+        bot.answer_callback_query(call.id)
+    except Exception as e:
+        logger.error(f"Ошибка при листании результатов поиска ({call.data}): {e}")
+        bot.answer_callback_query(call.id, "Не удалось загрузить страницу.")
+
 @bot.message_handler(func=lambda message: message.text == "🔍 Поиск обращения")
 def search_ticket_start(message):
     """Обработчик кнопки "Поиск обращения" для администраторов.
@@ -445,7 +700,7 @@ def search_ticket_start(message):
     cancel_keyboard.row(types.KeyboardButton("❌ Отмена")) # Кнопка для отмены
     bot.send_message(
         message.chat.id,
-        "Введите ID обращения для поиска:",
+        "Введите номер обращения или слова из темы и переписки:",
         reply_markup=cancel_keyboard
     )
 
@@ -471,6 +726,10 @@ def handle_message(message):
         # Сохраняем первое сообщение пользователя как часть обращения
         db.add_message(ticket_id, user_id, message.text)
         
+        # Назначаем обращение администратору с наименьшим числом открытых обращений
+        assigned_admin = db.assign_ticket(ticket_id, ADMIN_IDS)
+        logger.info(f"[SUPPORT] Ticket #{ticket_id} assigned to admin {assigned_admin}")
+        
         # Отправляем пользователю подтверждение создания обращения
         bot.send_message(
             message.chat.id,
@@ -479,24 +738,23 @@ def handle_message(message):
             reply_markup=create_main_keyboard(user_id in ADMIN_IDS)
         )
         
-        # Уведомляем всех администраторов о новом обращении
+        # Уведомляем всех администраторов о новом обращении через фоновую очередь
+        # Получаем отображаемое название категории для уведомления администратора
+        category_for_admin = user_states[user_id].get('category', 'не указана') # Получаем категорию из user_states
+        logger.debug(f"[ADMIN NOTIFICATION] User state category: {category_for_admin}")
+        category_display_admin = REVERSE_TICKET_CATEGORIES.get(category_for_admin, 'не указана') # Преобразуем в отображаемый текст
+        logger.debug(f"[ADMIN NOTIFICATION] Display category: {category_display_admin}")
         for admin_id in ADMIN_IDS:
-            try:
-                # Получаем отображаемое название категории для уведомления администратора
-                category_for_admin = user_states[user_id].get('category', 'не указана') # Получаем категорию из user_states
-                logger.debug(f"[ADMIN NOTIFICATION] User state category: {category_for_admin}")
-                category_display_admin = REVERSE_TICKET_CATEGORIES.get(category_for_admin, 'не указана') # Преобразуем в отображаемый текст
-                logger.debug(f"[ADMIN NOTIFICATION] Display category: {category_display_admin}")
-                bot.send_message(
-                    admin_id,
-                    f"📩 Новое обращение #{ticket_id}\n"
-                    f"От: {message.from_user.username or f'user_{user_id}'}\n"
-                    f"Категория: {category_display_admin}\n" # Включаем категорию в уведомление для админа
-                    f"Текст: {message.text[:100]}\n\n"
-                    f"Для ответа отправьте: /reply_{ticket_id}"
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке уведомления администратору {admin_id}: {e}", exc_info=True)
+            assignment = "📌 Назначено вам" if admin_id == assigned_admin else f"Ответственный: {assigned_admin}"
+            notifier.notify(
+                admin_id,
+                f"📩 Новое обращение #{ticket_id}\n"
+                f"От: {message.from_user.username or f'user_{user_id}'}\n"
+                f"Категория: {category_display_admin}\n" # Включаем категорию в уведомление для админа
+                f"{assignment}\n"
+                f"Текст: {message.text[:100]}\n\n"
+                f"Для ответа отправьте: /reply_{ticket_id}"
+            )
         
         # Очищаем состояние пользователя после завершения создания обращения
         del user_states[user_id]
@@ -510,21 +768,26 @@ def handle_message(message):
         db.add_message(ticket_id, user_id, message.text, is_admin=is_admin)
         
         # Получаем обновленную информацию о тикете
-        ticket = db.get_ticket(ticket_id)
+        ticket = db.get_ticket(ticket_id, with_messages=False)
         
-        # Определяем ID получателя уведомления (пользователь, если отвечал админ, или первый админ, если отвечал пользователь)
-        recipient_id = ticket['user_id'] if is_admin else next(iter(ADMIN_IDS), None)
+        # Определяем ID получателя уведомления: пользователь, если отвечал админ, или ответственный
+        # администратор, если отвечал пользователь (обращение без ответственного назначается сейчас)
+        if is_admin:
+            recipient_id = ticket['user_id']
+        elif ticket['assigned_admin'] in ADMIN_IDS:
+            recipient_id = ticket['assigned_admin']
+        else:
+            recipient_id = db.assign_ticket(ticket_id, ADMIN_IDS)
         if recipient_id:
-            try:
-                sender_type = "Поддержка" if is_admin else "Пользователь" # Определяем тип отправителя для уведомления
-                bot.send_message(
-                    recipient_id,
-                    f"📩 Новый ответ в обращении #{ticket_id}\n"
-                    f"{sender_type}: {message.text}\n\n"
-                    f"Для ответа отправьте: /reply_{ticket_id}"
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке уведомления получателю {recipient_id}: {e}")
+            sender_type = "Поддержка" if is_admin else "Пользователь" # Определяем тип отправителя для уведомления
+            footer = f"\n\nДля ответа отправьте: /reply_{ticket_id}"
+            notifier.notify(
+                recipient_id,
+                truncate_text(
+                    f"📩 Новый ответ в обращении #{ticket_id}\n{sender_type}: {message.text}",
+                    MAX_MESSAGE_LENGTH - message_length(footer)
+                ) + footer
+            )
         
         # Подтверждаем отправку ответа пользователю, который его отправил
         bot.send_message(
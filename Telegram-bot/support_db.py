@@ -1,11 +1,166 @@
+import re
+import time
 import sqlite3
 import json
+import atexit
+import logging
 from datetime import datetime
+from database import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Полнотекстовые индексы FTS5 по темам обращений и по сообщениям. Таблицы хранят только
+# индекс (content=...), сами тексты читаются из tickets и messages; триггеры обновляют
+# индекс при каждом изменении исходных таблиц
+FTS_SCHEMA = {
+    'tickets_fts': '''
+        CREATE VIRTUAL TABLE tickets_fts USING fts5(
+            subject, content='tickets', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    ''',
+    'messages_fts': '''
+        CREATE VIRTUAL TABLE messages_fts USING fts5(
+            message, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    ''',
+}
+
+FTS_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+        INSERT INTO tickets_fts (rowid, subject) VALUES (new.id, new.subject);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+        INSERT INTO tickets_fts (tickets_fts, rowid, subject) VALUES ('delete', old.id, old.subject);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS tickets_fts_update AFTER UPDATE OF subject ON tickets BEGIN
+        INSERT INTO tickets_fts (tickets_fts, rowid, subject) VALUES ('delete', old.id, old.subject);
+        INSERT INTO tickets_fts (rowid, subject) VALUES (new.id, new.subject);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF message ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+    END''',
+]
+
+# Счетчики открытых обращений администраторов для распределения нагрузки. Триггеры
+# меняют счетчик при назначении, закрытии, повторном открытии и удалении обращения
+LOAD_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS tickets_load_insert AFTER INSERT ON tickets
+    WHEN new.status = 'open' AND new.assigned_admin IS NOT NULL BEGIN
+        INSERT INTO admin_load (admin_id, open_tickets) VALUES (new.assigned_admin, 1)
+        ON CONFLICT (admin_id) DO UPDATE SET open_tickets = open_tickets + 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS tickets_load_update AFTER UPDATE OF status, assigned_admin ON tickets BEGIN
+        UPDATE admin_load SET open_tickets = open_tickets - 1
+        WHERE old.status = 'open' AND admin_id = old.assigned_admin;
+        INSERT INTO admin_load (admin_id, open_tickets)
+        SELECT new.assigned_admin, 1 WHERE new.status = 'open' AND new.assigned_admin IS NOT NULL
+        ON CONFLICT (admin_id) DO UPDATE SET open_tickets = open_tickets + 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS tickets_load_delete AFTER DELETE ON tickets
+    WHEN old.status = 'open' AND old.assigned_admin IS NOT NULL BEGIN
+        UPDATE admin_load SET open_tickets = open_tickets - 1 WHERE admin_id = old.assigned_admin;
+    END''',
+]
+
+# Совпадение в теме обращения весит больше, чем совпадение в одном из сообщений
+SUBJECT_RANK_WEIGHT = 2.0
+# Со скольких лучших совпадений каждого полнотекстового индекса начинать ранжирование при поиске
+SEARCH_CANDIDATES = 200
+# Сколько сообщений переписки читать из базы за один запрос
+MESSAGES_BATCH_SIZE = 50
+
+def _migration_create_tables(cursor):
+    """Таблицы обращений и сообщений в том виде, в котором их создавали первые версии бота."""
+    # Создание таблицы обращений
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, -- Уникальный идентификатор обращения
+            user_id INTEGER NOT NULL,             -- ID пользователя в Telegram
+            username TEXT,                        -- Имя пользователя в Telegram
+            status TEXT NOT NULL,                 -- Статус обращения (open/closed)
+            created_at TIMESTAMP NOT NULL,        -- Время создания
+            updated_at TIMESTAMP NOT NULL,        -- Время последнего обновления
+            category TEXT,                        -- Категория обращения
+            subject TEXT,                         -- Тема обращения
+            priority TEXT DEFAULT 'normal'        -- Приоритет обращения
+        )
+    ''')
+    
+    # Создание таблицы сообщений
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, -- Уникальный идентификатор сообщения
+            ticket_id INTEGER NOT NULL,           -- ID обращения
+            user_id INTEGER NOT NULL,             -- ID отправителя
+            is_admin BOOLEAN NOT NULL,            -- Флаг сообщения от администратора
+            message TEXT NOT NULL,                -- Текст сообщения
+            created_at TIMESTAMP NOT NULL,        -- Время отправки
+            FOREIGN KEY (ticket_id) REFERENCES tickets (id) -- Связь с таблицей обращений
+        )
+    ''')
+
+def _migration_indexes(cursor):
+    """
+    Индексы под выборки бота: обращения пользователя и обращения по статусу по времени обновления
+    (для постраничного просмотра), открытые обращения по времени создания и сообщения обращения по времени отправки
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_user_updated ON tickets (user_id, updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_status_updated ON tickets (status, updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_ticket_created ON messages (ticket_id, created_at)')
+
+def _migration_assigned_admin(cursor):
+    """Колонка ответственного администратора обращения (assigned_admin - ID в Telegram)."""
+    # В базах, созданных до появления миграций, колонка уже могла быть добавлена
+    cursor.execute('PRAGMA table_info(tickets)')
+    if 'assigned_admin' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE tickets ADD COLUMN assigned_admin INTEGER')
+
+def _migration_admin_load(cursor):
+    """
+    Таблица нагрузки администраторов для распределения обращений.
+    Нагрузка один раз считается по существующим обращениям, дальше ее ведут триггеры.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admin_load'")
+    load_exists = cursor.fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admin_load (
+            admin_id INTEGER PRIMARY KEY,         -- ID администратора в Telegram
+            open_tickets INTEGER NOT NULL DEFAULT 0, -- Число открытых обращений администратора
+            last_assigned_at REAL NOT NULL DEFAULT 0 -- Время последнего назначения (для очередности)
+        )
+    ''')
+    if not load_exists:
+        cursor.execute('''
+            INSERT INTO admin_load (admin_id, open_tickets)
+            SELECT assigned_admin, COUNT(*) FROM tickets
+            WHERE status = 'open' AND assigned_admin IS NOT NULL
+            GROUP BY assigned_admin
+        ''')
+    for trigger in LOAD_TRIGGERS:
+        cursor.execute(trigger)
+
+# Миграции схемы по порядку. Номер примененной миграции хранится в PRAGMA user_version,
+# поэтому новые миграции добавляются только в конец списка
+MIGRATIONS = [
+    _migration_create_tables,
+    _migration_indexes,
+    _migration_assigned_admin,
+    _migration_admin_load,
+]
 
 class SupportDB:
     """
     Класс для работы с базой данных технической поддержки
     Обеспечивает хранение и управление обращениями пользователей
+    Каждый поток переиспользует одно соединение в режиме WAL (см. database.ConnectionManager)
     """
     
     def __init__(self, db_file='support.db'):
@@ -14,46 +169,65 @@ class SupportDB:
         :param db_file: Путь к файлу базы данных SQLite
         """
         self.db_file = db_file
+        self.fts_enabled = False
+        self.connections = ConnectionManager(db_file)
+        atexit.register(self.connections.close_all)
         self.init_db()
 
+    def _connect(self):
+        """Соединение текущего потока; закрывать его после запроса не нужно."""
+        return self.connections.connection()
+
     def init_db(self):
         """
         Инициализация структуры базы данных
-        Создает необходимые таблицы, если они не существуют
+        Применяет недостающие миграции схемы и создает полнотекстовые индексы
         """
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        
-        # Создание таблицы обращений
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS tickets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, -- Уникальный идентификатор обращения
-                user_id INTEGER NOT NULL,             -- ID пользователя в Telegram
-                username TEXT,                        -- Имя пользователя в Telegram
-                status TEXT NOT NULL,                 -- Статус обращения (open/closed)
-                created_at TIMESTAMP NOT NULL,        -- Время создания
-                updated_at TIMESTAMP NOT NULL,        -- Время последнего обновления
-                category TEXT,                        -- Категория обращения
-                subject TEXT,                         -- Тема обращения
-                priority TEXT DEFAULT 'normal'        -- Приоритет обращения
-            )
-        ''')
-        
-        # Создание таблицы сообщений
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, -- Уникальный идентификатор сообщения
-                ticket_id INTEGER NOT NULL,           -- ID обращения
-                user_id INTEGER NOT NULL,             -- ID отправителя
-                is_admin BOOLEAN NOT NULL,            -- Флаг сообщения от администратора
-                message TEXT NOT NULL,                -- Текст сообщения
-                created_at TIMESTAMP NOT NULL,        -- Время отправки
-                FOREIGN KEY (ticket_id) REFERENCES tickets (id) -- Связь с таблицей обращений
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.migrate()
+        self.init_fts()
+
+    def migrate(self):
+        """
+        Применяет к базе еще не примененные миграции, каждую в отдельной транзакции
+        :return: Версия схемы после миграции
+        """
+        conn = self._connect()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                conn.execute('BEGIN')
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {number}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info(f"[SUPPORT DB] Applied migration {number}: {migration.__name__}")
+            version = number
+        return version
+
+    def init_fts(self):
+        """
+        Создает полнотекстовые индексы и триггеры. Индекс, созданный для уже
+        заполненной базы, сразу строится по существующим обращениям и сообщениям.
+        Если SQLite собран без FTS5, поиск работает через LIKE (медленно).
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                for table, schema in FTS_SCHEMA.items():
+                    exists = conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                    ).fetchone()
+                    if not exists:
+                        conn.execute(schema)
+                        conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+                        logger.info(f"[SUPPORT DB] Built full-text index {table}")
+                for trigger in FTS_TRIGGERS:
+                    conn.execute(trigger)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"[SUPPORT DB] Full-text search is unavailable, falling back to LIKE: {e}")
 
     def create_ticket(self, user_id, username, category=None, subject=None):
         """
@@ -64,19 +238,17 @@ class SupportDB:
         :param subject: Тема обращения
         :return: ID созданного обращения
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         now = datetime.now()
         
-        c.execute('''
-            INSERT INTO tickets (user_id, username, status, created_at, updated_at, category, subject)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, username, 'open', now, now, category, subject))
+        with conn:
+            c.execute('''
+                INSERT INTO tickets (user_id, username, status, created_at, updated_at, category, subject)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, username, 'open', now, now, category, subject))
         
-        ticket_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        return ticket_id
+        return c.lastrowid
 
     def add_message(self, ticket_id, user_id, message, is_admin=False):
         """
@@ -86,31 +258,31 @@ class SupportDB:
         :param message: Текст сообщения
         :param is_admin: Флаг сообщения от администратора
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         now = datetime.now()
         
-        # Добавление сообщения
-        c.execute('''
-            INSERT INTO messages (ticket_id, user_id, message, is_admin, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (ticket_id, user_id, message, is_admin, now))
-        
-        # Обновление времени последнего изменения обращения
-        c.execute('''
-            UPDATE tickets SET updated_at = ? WHERE id = ?
-        ''', (now, ticket_id))
-        
-        conn.commit()
-        conn.close()
+        # Сообщение и время обновления обращения записываются одной транзакцией
+        with conn:
+            # Добавление сообщения
+            c.execute('''
+                INSERT INTO messages (ticket_id, user_id, message, is_admin, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (ticket_id, user_id, message, is_admin, now))
+            
+            # Обновление времени последнего изменения обращения
+            c.execute('''
+                UPDATE tickets SET updated_at = ? WHERE id = ?
+            ''', (now, ticket_id))
 
-    def get_ticket(self, ticket_id):
+    def get_ticket(self, ticket_id, with_messages=True):
         """
         Получение информации об обращении
         :param ticket_id: ID обращения
+        :param with_messages: Загрузить всю переписку (для длинных обращений лучше iter_messages)
         :return: Словарь с информацией об обращении и его сообщениями
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         
         # Получение основной информации об обращении
@@ -119,8 +291,10 @@ class SupportDB:
         
         if ticket:
             # Преобразование данных в словарь
-            columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority']
+            columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
             ticket_dict = dict(zip(columns, ticket))
+            if not with_messages:
+                return ticket_dict
             
             # Получение всех сообщений обращения
             c.execute('SELECT * FROM messages WHERE ticket_id = ? ORDER BY created_at', (ticket_id,))
@@ -128,28 +302,60 @@ class SupportDB:
             message_columns = ['id', 'ticket_id', 'user_id', 'is_admin', 'message', 'created_at']
             ticket_dict['messages'] = [dict(zip(message_columns, msg)) for msg in messages]
             
-            conn.close()
             return ticket_dict
         
-        conn.close()
         return None
 
+    def iter_messages(self, ticket_id, cursor=None, direction='older', batch_size=MESSAGES_BATCH_SIZE):
+        """
+        Сообщения обращения по одному, от курсора в сторону более старых или более новых
+        Сообщения читаются из базы пачками по batch_size с пагинацией по ключу (created_at, id),
+        поэтому длинная переписка никогда не загружается в память целиком
+        :param ticket_id: ID обращения
+        :param cursor: Пара (created_at, id) сообщения, после которого продолжить (само оно не входит),
+                       или None - начать с самого нового ('older') или самого старого ('newer') сообщения
+        :param direction: 'older' - от новых к старым, 'newer' - от старых к новым
+        :param batch_size: Сколько сообщений читать за один запрос
+        :return: Генератор словарей сообщений
+        """
+        conn = self._connect()
+        c = conn.cursor()
+        order, comparison = ('DESC', '<') if direction == 'older' else ('ASC', '>')
+        message_columns = ['id', 'ticket_id', 'user_id', 'is_admin', 'message', 'created_at']
+        
+        while True:
+            query = 'SELECT * FROM messages WHERE ticket_id = ?'
+            params = [ticket_id]
+            if cursor is not None:
+                query += f' AND (created_at, id) {comparison} (?, ?)'
+                params.extend(cursor)
+            query += f' ORDER BY created_at {order}, id {order} LIMIT ?'
+            params.append(batch_size)
+            
+            c.execute(query, params)
+            messages = c.fetchall()
+            for msg in messages:
+                yield dict(zip(message_columns, msg))
+            if len(messages) < batch_size:
+                return
+            last = messages[-1]
+            cursor = (last[5], last[0])
+
     def get_user_tickets(self, user_id):
         """
         Получение всех обращений пользователя
         :param user_id: ID пользователя в Telegram
         :return: Список обращений пользователя
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         
         c.execute('SELECT * FROM tickets WHERE user_id = ? ORDER BY updated_at DESC', (user_id,))
         tickets = c.fetchall()
         
-        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority']
+        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
         result = [dict(zip(columns, ticket)) for ticket in tickets]
         
-        conn.close()
         return result
 
     def get_open_tickets(self):
@@ -157,64 +363,295 @@ class SupportDB:
         Получение всех открытых обращений
         :return: Список открытых обращений
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         
-        c.execute('SELECT * FROM tickets WHERE status = "open" ORDER BY created_at')
+        c.execute('SELECT * FROM tickets WHERE status = ? ORDER BY created_at', ('open',))
         tickets = c.fetchall()
         
-        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority']
+        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
         result = [dict(zip(columns, ticket)) for ticket in tickets]
         
-        conn.close()
         return result
 
+    def _tickets_page(self, where, params, descending, limit, cursor, direction):
+        """
+        Страница обращений с пагинацией по ключу (updated_at, id): вместо OFFSET
+        запрос продолжает выборку от последнего показанного обращения, поэтому
+        читает из индекса только строки самой страницы.
+        :param where: Условие отбора обращений
+        :param params: Параметры условия
+        :param descending: True - сначала недавно обновленные, False - сначала давно обновленные
+        :param limit: Размер страницы
+        :param cursor: Пара (updated_at, id) крайнего обращения текущей страницы или None для первой страницы
+        :param direction: 'next' - страница после курсора, 'prev' - страница перед курсором
+        :return: Словарь с ключами tickets, has_prev и has_next
+        """
+        conn = self._connect()
+        c = conn.cursor()
+        
+        # Страницу "назад" читаем в обратном порядке от курсора и затем разворачиваем
+        backwards = direction == 'prev'
+        order = 'DESC' if descending != backwards else 'ASC'
+        query = f'SELECT * FROM tickets WHERE {where}'
+        query_params = list(params)
+        if cursor is not None:
+            query += f" AND (updated_at, id) {'<' if order == 'DESC' else '>'} (?, ?)"
+            query_params.extend(cursor)
+        query += f' ORDER BY updated_at {order}, id {order} LIMIT ?'
+        # Лишняя строка показывает, есть ли обращения дальше в этом направлении
+        query_params.append(limit + 1)
+        
+        c.execute(query, query_params)
+        tickets = c.fetchall()
+        has_more = len(tickets) > limit
+        tickets = tickets[:limit]
+        if backwards:
+            tickets.reverse()
+        
+        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
+        return {
+            'tickets': [dict(zip(columns, ticket)) for ticket in tickets],
+            # Если пришли по курсору, то с той стороны, откуда пришли, обращения есть
+            'has_prev': has_more if backwards else cursor is not None,
+            'has_next': cursor is not None if backwards else has_more,
+        }
+
+    def get_user_tickets_page(self, user_id, limit, cursor=None, direction='next'):
+        """
+        Страница обращений пользователя, сначала недавно обновленные
+        :param user_id: ID пользователя в Telegram
+        :param limit: Размер страницы
+        :param cursor: Пара (updated_at, id) крайнего обращения текущей страницы или None для первой страницы
+        :param direction: 'next' или 'prev'
+        :return: Словарь с ключами tickets, has_prev и has_next
+        """
+        return self._tickets_page('user_id = ?', (user_id,), True, limit, cursor, direction)
+
+    def get_open_tickets_page(self, limit, cursor=None, direction='next'):
+        """
+        Страница открытых обращений, сначала дольше всех ожидающие ответа
+        :param limit: Размер страницы
+        :param cursor: Пара (updated_at, id) крайнего обращения текущей страницы или None для первой страницы
+        :param direction: 'next' или 'prev'
+        :return: Словарь с ключами tickets, has_prev и has_next
+        """
+        return self._tickets_page('status = ?', ('open',), False, limit, cursor, direction)
+
+    @staticmethod
+    def _search_words(text):
+        """Слова из текста пользователя для поиска."""
+        return re.findall(r'\w+', text.lower())
+
+    @classmethod
+    def _fts_query(cls, text):
+        """
+        Превращает текст пользователя в запрос FTS5: каждое слово ищется по началу
+        ("ошибк" найдет "ошибка" и "ошибки"), все слова должны встретиться.
+        Кавычки не дают словам вроде OR и NEAR стать операторами запроса.
+        """
+        return ' '.join(f'"{word}"*' for word in cls._search_words(text))
+
+    @staticmethod
+    def _snippet(text, words, width=12):
+        """Отрывок сообщения вокруг первого найденного слова, найденные слова выделены «»."""
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\w*', re.IGNORECASE)
+        tokens = text.split()
+        first = next((i for i, token in enumerate(tokens) if pattern.search(token)), 0)
+        start = max(first - width // 3, 0)
+        snippet = pattern.sub(lambda match: f"«{match.group(0)}»", ' '.join(tokens[start:start + width]))
+        if start > 0:
+            snippet = '…' + snippet
+        if start + width < len(tokens):
+            snippet += '…'
+        return snippet
+
+    def _rank_fts(self, c, query, need):
+        """
+        Лучшие совпадения по темам и по сообщениям, сгруппированные по обращениям
+        Из каждого индекса берутся только лучшие совпадения (сначала SEARCH_CANDIDATES), поэтому
+        частые слова не заставляют группировать все найденные сообщения. Несобранные совпадения
+        не лучше худшего собранного, поэтому кандидатов добавляется, пока need-е обращение
+        не окажется строго лучше этой границы: результат совпадает с группировкой всех совпадений
+        :return: Список не более чем need пар (ID обращения, ID лучшего сообщения или None)
+                 по убыванию релевантности
+        """
+        candidates = max(SEARCH_CANDIDATES, need * 10)
+        while True:
+            c.execute('''
+                SELECT rowid, bm25(tickets_fts) * ? AS score FROM tickets_fts
+                WHERE tickets_fts MATCH ? ORDER BY score LIMIT ?
+            ''', (SUBJECT_RANK_WEIGHT, query, candidates))
+            subject_hits = c.fetchall()
+            c.execute('''
+                SELECT m.ticket_id, hits.score, hits.id FROM (
+                    SELECT rowid AS id, bm25(messages_fts) AS score FROM messages_fts
+                    WHERE messages_fts MATCH ? ORDER BY score LIMIT ?
+                ) hits JOIN messages m ON m.id = hits.id
+            ''', (query, candidates))
+            message_hits = c.fetchall()
+            
+            # Лучший результат обращения - совпадение в теме или в одном из сообщений
+            best = {}
+            for ticket_id, score in subject_hits:
+                best[ticket_id] = (score, None)
+            for ticket_id, score, message_id in message_hits:
+                if ticket_id not in best or score < best[ticket_id][0]:
+                    best[ticket_id] = (score, message_id)
+            ranked = sorted(best.items(), key=lambda item: (item[1][0], item[0]))[:need]
+            
+            # Совпадения, не попавшие в усеченный список, не лучше худшего из собранных
+            bounds = [max(hit[1] for hit in hits) for hits in (subject_hits, message_hits) if len(hits) == candidates]
+            if not bounds or (len(ranked) == need and ranked[-1][1][0] < min(bounds)):
+                return [(ticket_id, message_id) for ticket_id, (_, message_id) in ranked]
+            candidates *= 4
+
+    def search_tickets(self, text, limit, offset=0):
+        """
+        Полнотекстовый поиск обращений по теме и по сообщениям переписки
+        Обращения упорядочены по релевантности (bm25) лучшего совпадения
+        :param text: Слова для поиска
+        :param limit: Размер страницы
+        :param offset: Сколько лучших результатов пропустить
+        :return: Словарь с ключами tickets (у каждого обращения есть snippet - отрывок
+                 найденного сообщения или None), has_prev и has_next
+        """
+        page = {'tickets': [], 'has_prev': offset > 0, 'has_next': False}
+        words = self._search_words(text)
+        if not words:
+            return page
+        conn = self._connect()
+        c = conn.cursor()
+        
+        if self.fts_enabled:
+            hits = self._rank_fts(c, self._fts_query(text), offset + limit + 1)[offset:]
+        else:
+            pattern = f"%{text.strip()}%"
+            c.execute('''
+                SELECT id, NULL FROM tickets
+                WHERE subject LIKE ? OR id IN (SELECT ticket_id FROM messages WHERE message LIKE ?)
+                ORDER BY updated_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ''', (pattern, pattern, limit + 1, offset))
+            hits = c.fetchall()
+        page['has_next'] = len(hits) > limit
+        hits = hits[:limit]
+        if not hits:
+            return page
+        
+        ticket_ids = [ticket_id for ticket_id, _ in hits]
+        placeholders = ', '.join('?' * len(ticket_ids))
+        c.execute(f'SELECT * FROM tickets WHERE id IN ({placeholders})', ticket_ids)
+        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
+        tickets = {row[0]: dict(zip(columns, row)) for row in c.fetchall()}
+        
+        message_ids = [message_id for _, message_id in hits if message_id is not None]
+        texts = {}
+        if message_ids:
+            placeholders = ', '.join('?' * len(message_ids))
+            c.execute(f'SELECT id, message FROM messages WHERE id IN ({placeholders})', message_ids)
+            texts = dict(c.fetchall())
+        
+        for ticket_id, message_id in hits:
+            ticket = tickets[ticket_id]
+            ticket['snippet'] = self._snippet(texts[message_id], words) if message_id in texts else None
+            page['tickets'].append(ticket)
+        return page
+
+    def assign_ticket(self, ticket_id, admin_ids):
+        """
+        Назначает обращение наименее загруженному администратору
+        Нагрузка - число открытых обращений администратора - хранится в таблице admin_load
+        и поддерживается триггерами, поэтому выбор не перебирает обращения.
+        При равной нагрузке выбирается тот, кому дольше ничего не назначали.
+        :param ticket_id: ID обращения
+        :param admin_ids: ID администраторов, из которых выбирать
+        :return: ID назначенного администратора или None, если администраторов нет
+        """
+        admin_ids = list(admin_ids)
+        if not admin_ids:
+            return None
+        conn = self._connect()
+        placeholders = ', '.join('?' * len(admin_ids))
+        # Блокировка на запись с начала транзакции: два одновременных назначения
+        # не выберут одного администратора по одной и той же нагрузке
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR IGNORE INTO admin_load (admin_id, open_tickets, last_assigned_at) VALUES (?, 0, 0)',
+                [(admin_id,) for admin_id in admin_ids]
+            )
+            admin_id = conn.execute(f'''
+                SELECT admin_id FROM admin_load WHERE admin_id IN ({placeholders})
+                ORDER BY open_tickets, last_assigned_at, admin_id LIMIT 1
+            ''', admin_ids).fetchone()[0]
+            # Счетчик нагрузки увеличит триггер tickets_load_update
+            conn.execute('UPDATE tickets SET assigned_admin = ? WHERE id = ?', (admin_id, ticket_id))
+            conn.execute('UPDATE admin_load SET last_assigned_at = ? WHERE admin_id = ?', (time.time(), admin_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return admin_id
+
+    def get_admin_load(self, admin_ids):
+        """
+        Число открытых обращений у каждого администратора
+        :param admin_ids: ID администраторов
+        :return: Словарь {ID администратора: число открытых обращений}
+        """
+        admin_ids = list(admin_ids)
+        load = {admin_id: 0 for admin_id in admin_ids}
+        if not admin_ids:
+            return load
+        conn = self._connect()
+        placeholders = ', '.join('?' * len(admin_ids))
+        load.update(conn.execute(
+            f'SELECT admin_id, open_tickets FROM admin_load WHERE admin_id IN ({placeholders})', admin_ids
+        ).fetchall())
+        return load
+
     def close_ticket(self, ticket_id):
         """
         Закрытие обращения
         :param ticket_id: ID обращения
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         now = datetime.now()
         
-        c.execute('''
-            UPDATE tickets 
-            SET status = 'closed', updated_at = ? 
-            WHERE id = ?
-        ''', (now, ticket_id))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            c.execute('''
+                UPDATE tickets 
+                SET status = 'closed', updated_at = ? 
+                WHERE id = ?
+            ''', (now, ticket_id))
 
     def reopen_ticket(self, ticket_id):
         """
         Повторное открытие закрытого обращения
         :param ticket_id: ID обращения
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         now = datetime.now()
         
-        c.execute('''
-            UPDATE tickets 
-            SET status = 'open', updated_at = ? 
-            WHERE id = ?
-        ''', (now, ticket_id))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            c.execute('''
+                UPDATE tickets 
+                SET status = 'open', updated_at = ? 
+                WHERE id = ?
+            ''', (now, ticket_id))
 
     def get_all_tickets(self):
         """
         Получение всех обращений
         :return: Список всех обращений
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         c = conn.cursor()
         c.execute('SELECT * FROM tickets ORDER BY created_at')
         tickets = c.fetchall()
-        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority']
+        columns = ['id', 'user_id', 'username', 'status', 'created_at', 'updated_at', 'category', 'subject', 'priority', 'assigned_admin']
         result = [dict(zip(columns, ticket)) for ticket in tickets]
-        conn.close()
         return result 
\ No newline at end of file
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# Модули бота лежат в родительской папке и импортируются без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import ConnectionManager
+from redis_stub import RedisStub
+
+
+@pytest.fixture
+def redis_server():
+    """Запущенная в процессе заглушка сервера Redis; останавливается после теста."""
+    server = RedisStub()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def users_db(tmp_path, monkeypatch):
+    """База пользователей во временном файле вместо USERS_DB_FILE, со всеми миграциями."""
+    manager = ConnectionManager(str(tmp_path / 'users.db'))
+    monkeypatch.setattr(database, 'db', manager)
+    # Старая база users.db из папки бота не должна попасть в тестовую
+    monkeypatch.setattr(database, 'LEGACY_USERS_DB_FILE', str(tmp_path / 'missing.db'))
+    database.migrate()
+    yield manager
+    manager.close_all()
@@ -0,0 +1,106 @@
+import socket
+import threading
+import time
+
+
+class RedisStub:
+    """
+    Заглушка сервера Redis для тестов: слушает порт на localhost и понимает
+    протокол RESP и те команды, которые использует RedisBackend
+    (GET, SET с EX/NX, DEL, AUTH, SELECT, PING).
+    Время истечения ключей считается по собственным часам заглушки,
+    которые тест может перевести вперед методом advance.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen()
+        self.port = self._sock.getsockname()[1]
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+        self._clients = []
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._sock.close()
+        for client in self._clients:
+            try:
+                client.close()
+            except OSError:
+                pass
+
+    def advance(self, seconds):
+        """Переводит часы заглушки вперед, чтобы ключи с EX истекли без ожидания."""
+        with self._lock:
+            self._offset += seconds
+
+    def _now(self):
+        return time.monotonic() + self._offset
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return
+            self._clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        reader = client.makefile('rb')
+        try:
+            while True:
+                line = reader.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(reader.readline()[1:-2])
+                    args.append(reader.read(length + 2)[:-2].decode('utf-8'))
+                client.sendall(self._reply(args))
+        except OSError:
+            return
+
+    def _reply(self, args):
+        command, args = args[0].upper(), args[1:]
+        with self._lock:
+            if command in ('PING', 'AUTH', 'SELECT'):
+                return b"+OK\r\n" if command != 'PING' else b"+PONG\r\n"
+            if command == 'GET':
+                value = self._get(args[0])
+                if value is None:
+                    return b"$-1\r\n"
+                data = value.encode('utf-8')
+                return f"${len(data)}\r\n".encode() + data + b"\r\n"
+            if command == 'SET':
+                return self._set(args[0], args[1], [arg.upper() for arg in args[2:]])
+            if command == 'DEL':
+                deleted = sum(1 for key in args if self._get(key) is not None and self._values.pop(key))
+                return f":{deleted}\r\n".encode()
+        return f"-ERR unknown command '{command}'\r\n".encode()
+
+    def _get(self, key):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and self._now() >= expires_at:
+            del self._values[key]
+            return None
+        return value
+
+    def _set(self, key, value, options):
+        expires_at = None
+        if 'EX' in options:
+            expires_at = self._now() + int(options[options.index('EX') + 1])
+        if 'NX' in options and self._get(key) is not None:
+            return b"$-1\r\n"
+        self._values[key] = (value, expires_at)
+        return b"+OK\r\n"
@@ -0,0 +1,85 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from telebot.apihelper import ApiTelegramException
+
+import broadcast
+import database
+from broadcast import Broadcaster, BroadcastProgress
+
+USERS = range(1, 41)
+BLOCKED = {3, 11, 17, 29, 38}
+
+
+class FakeBot:
+    """Запоминает отправленные сообщения; пользователи из BLOCKED заблокировали бота."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, reply_markup=None):
+        if chat_id in BLOCKED:
+            raise ApiTelegramException('sendMessage', None, {
+                'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user',
+            })
+        self.sent.append(chat_id)
+
+
+@pytest.fixture
+def audience(users_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(broadcast, 'BROADCAST_DIR', str(tmp_path / 'broadcasts'))
+    # Прогресс сохраняется после каждого получателя, как если бы процесс упал между сохранениями
+    monkeypatch.setattr(broadcast, 'PROGRESS_SAVE_INTERVAL', 0)
+    for user_id in USERS:
+        database.add_user(user_id, f'user{user_id}')
+    return datetime.now() + timedelta(seconds=1)
+
+
+def blocked_users():
+    rows = database.db.connection().execute('SELECT user_id FROM users WHERE blocked = 1').fetchall()
+    return {row[0] for row in rows}
+
+
+def test_blocked_users_are_flagged_after_crash_and_resume(audience, monkeypatch):
+    real_audience = broadcast.iter_broadcast_audience
+
+    def crashing_audience(registered_before):
+        for number, chat_id in enumerate(real_audience(registered_before)):
+            if number == 20:
+                raise RuntimeError('process crashed')
+            yield chat_id
+
+    monkeypatch.setattr(broadcast, 'iter_broadcast_audience', crashing_audience)
+    bot = FakeBot()
+    broadcaster = Broadcaster(bot, rate=1000, per_chat_interval=0, workers=2)
+    with pytest.raises(RuntimeError):
+        broadcaster.run('daily_test', 'text', registered_before=audience)
+
+    progress = BroadcastProgress.load('daily_test')
+    assert not progress.data['done']
+    assert set(progress.data['blocked']) == BLOCKED & set(range(1, 21))
+    assert blocked_users() == set(progress.data['blocked'])
+
+    monkeypatch.setattr(broadcast, 'iter_broadcast_audience', real_audience)
+    summary = broadcaster.run('daily_test', 'text')
+    assert summary == {'sent': len(USERS) - len(BLOCKED), 'failed': 0, 'blocked': len(BLOCKED)}
+    assert sorted(bot.sent) == sorted(set(USERS) - BLOCKED)
+    assert blocked_users() == BLOCKED
+
+
+def test_resume_flags_blocked_users_saved_in_progress(audience):
+    # Прогресс, сохраненный до пометки в базе: чаты обработаны, но пользователи не помечены
+    os.makedirs(broadcast.BROADCAST_DIR)
+    with open(os.path.join(broadcast.BROADCAST_DIR, 'daily_old.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'broadcast_id': 'daily_old', 'text': 'text', 'reply_markup': None,
+            'registered_before': str(audience), 'sent': [1, 2], 'failed': [], 'blocked': [3], 'done': False,
+        }, f)
+    assert blocked_users() == set()
+
+    bot = FakeBot()
+    Broadcaster(bot, rate=1000, per_chat_interval=0, workers=2).resume_unfinished()
+    assert blocked_users() == BLOCKED
+    assert 1 not in bot.sent and 3 not in bot.sent
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+
+
+def test_broadcast_audience_in_batches(users_db):
+    for user_id in range(1, 11):
+        database.add_user(user_id)
+    database.mark_users_blocked([4, 7])
+    conn = users_db.connection()
+    conn.execute('UPDATE users SET notifications_enabled = 0 WHERE user_id = 9')
+    conn.commit()
+    registered_before = datetime.now() + timedelta(seconds=1)
+
+    assert list(database.iter_broadcast_audience(registered_before, chunk_size=3)) == [1, 2, 3, 5, 6, 8, 10]
+    assert list(database.iter_broadcast_audience(registered_before, chunk_size=100)) == [1, 2, 3, 5, 6, 8, 10]
+
+
+def test_broadcast_audience_does_not_hold_snapshot(users_db):
+    for user_id in range(1, 11):
+        database.add_user(user_id)
+    audience = database.iter_broadcast_audience(datetime.now() + timedelta(seconds=1), chunk_size=3)
+    assert next(audience) == 1
+
+    # Пока рассылка отправляет первую пачку, запись и контрольная точка WAL проходят полностью
+    writer = sqlite3.connect(users_db.db_file)
+    writer.execute("UPDATE users SET username = 'changed'")
+    writer.commit()
+    busy, _, _ = writer.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    writer.close()
+    assert busy == 0
+    assert list(audience) == list(range(2, 11))
+
+
+def test_connection_keeps_open_transaction(users_db):
+    database.add_user(1)
+    conn = users_db.connection()
+    conn.execute("UPDATE users SET username = 'pending' WHERE user_id = 1")
+    # Повторное получение соединения в том же потоке не откатывает начатую запись
+    assert users_db.connection() is conn
+    assert conn.in_transaction
+    conn.commit()
+    assert conn.execute('SELECT username FROM users WHERE user_id = 1').fetchone()[0] == 'pending'
+
+
+def test_failed_write_leaves_no_transaction(users_db):
+    conn = users_db.connection()
+    conn.execute('CREATE TRIGGER fail_blocked BEFORE UPDATE OF blocked ON users BEGIN SELECT RAISE(ABORT, "fail"); END')
+    database.add_user(1)
+    database.mark_users_blocked([1])
+    assert not conn.in_transaction
+
+
+def last_active(user_id):
+    return database.db.connection().execute('SELECT last_active FROM users WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def registered(users_db):
+    for user_id in range(1, 4):
+        database.add_user(user_id)
+    database.db.connection().execute("UPDATE users SET last_active = 'old'")
+    database.db.connection().commit()
+
+
+def test_last_active_flushed_on_interval(registered):
+    buffer = database.LastActiveBuffer(interval=0.1, max_pending=100)
+    try:
+        buffer.touch(1)
+        assert last_active(1) == 'old'
+        assert wait_for(lambda: last_active(1) != 'old')
+        assert last_active(2) == 'old'
+    finally:
+        buffer.stop()
+
+
+def test_last_active_flushed_on_size(registered):
+    buffer = database.LastActiveBuffer(interval=3600, max_pending=3)
+    try:
+        buffer.touch(1)
+        buffer.touch(2)
+        time.sleep(0.2)
+        assert last_active(1) == 'old'
+        # Третий пользователь достигает порога, и запись начинается, не дожидаясь интервала
+        buffer.touch(3)
+        assert wait_for(lambda: last_active(3) != 'old', timeout=1)
+        assert last_active(1) != 'old' and last_active(2) != 'old'
+    finally:
+        buffer.stop()
+
+
+def test_last_active_flushed_at_exit(tmp_path):
+    path = str(tmp_path / 'users.db')
+    script = f'''
+import config
+config.USERS_DB_FILE = {path!r}
+config.LEGACY_USERS_DB_FILE = {str(tmp_path / 'missing.db')!r}
+config.LAST_ACTIVE_FLUSH_INTERVAL = 3600
+import database
+database.migrate()
+database.add_user(1)
+database.db.connection().execute("UPDATE users SET last_active = 'old', blocked = 1")
+database.db.connection().commit()
+database.update_last_active(1)
+'''
+    subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(database.__file__), check=True, timeout=60)
+    conn = sqlite3.connect(path)
+    last_active_at, blocked = conn.execute('SELECT last_active, blocked FROM users WHERE user_id = 1').fetchone()
+    conn.close()
+    assert last_active_at != 'old'
+    assert blocked == 0
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+import telebot
+from telebot import types
+
+from dispatcher import heavy, install_dispatcher
+
+
+def make_message(message_id, chat_id, text):
+    return types.Message.de_json({
+        'message_id': message_id, 'date': 0, 'text': text,
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'user'},
+    })
+
+
+@pytest.fixture
+def bot():
+    bot = telebot.TeleBot('1:test')
+    dispatcher = install_dispatcher(bot)
+    yield bot
+    dispatcher.close(timeout=5)
+
+
+def test_same_chat_runs_in_order(bot):
+    calls = []
+
+    @bot.message_handler(func=lambda message: True)
+    def handle(message):
+        # Первые сообщения обрабатываются дольше: без очереди чата порядок бы перемешался
+        time.sleep(0.02 * (10 - message.message_id))
+        calls.append(message.message_id)
+
+    bot.process_new_messages([make_message(i, 1, 'text') for i in range(10)])
+    bot.worker_pool.close(timeout=5)
+    assert calls == list(range(10))
+
+
+def test_different_chats_run_concurrently(bot):
+    started = threading.Barrier(3, timeout=5)
+    calls = []
+
+    @bot.message_handler(func=lambda message: True)
+    def handle(message):
+        # Барьер пройдут, только если обработчики трех чатов выполняются одновременно
+        started.wait()
+        calls.append(message.chat.id)
+
+    bot.process_new_messages([make_message(1, chat_id, 'text') for chat_id in (1, 2, 3)])
+    bot.worker_pool.close(timeout=5)
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_heavy_handlers_do_not_block_light_ones(bot):
+    release = threading.Event()
+    calls = []
+
+    @bot.message_handler(func=lambda message: message.text == 'chart')
+    @heavy
+    def handle_chart(message):
+        release.wait(timeout=5)
+        calls.append(('chart', message.chat.id))
+
+    @bot.message_handler(func=lambda message: True)
+    def handle_menu(message):
+        calls.append(('menu', message.chat.id))
+        if len(calls) == bot.worker_pool._slow._max_workers:
+            release.set()
+
+    # Тяжелые обработчики заняли весь медленный пул, но меню других чатов отвечает сразу
+    workers = bot.worker_pool._slow._max_workers
+    bot.process_new_messages([make_message(1, chat_id, 'chart') for chat_id in range(100, 100 + workers)])
+    bot.process_new_messages([make_message(1, chat_id, 'menu') for chat_id in range(1, 1 + workers)])
+    bot.worker_pool.close(timeout=10)
+    assert [name for name, _ in calls[:workers]] == ['menu'] * workers
+    assert sorted(calls[workers:]) == [('chart', chat_id) for chat_id in range(100, 100 + workers)]
@@ -0,0 +1,143 @@
+import time
+
+import pytest
+
+import state_backends
+from state_backends import MemoryBackend, SQLiteBackend, RedisBackend, RedisClient, RedisError
+from state_store import StateStore, DedupSet
+
+
+def make_backend(server):
+    # У каждого хранилища свой клиент и свое соединение, как у отдельных процессов бота
+    return RedisBackend(client=RedisClient(server.url), prefix='test')
+
+
+def test_get_set_delete(redis_server):
+    backend = make_backend(redis_server)
+    assert backend.get('main', 1, 60) is None
+
+    started = time.time()
+    backend.set('main', 1, {'step': 'city', 'page': 2}, 60)
+    value, updated_at = backend.get('main', 1, 60)
+    assert value == {'step': 'city', 'page': 2}
+    assert started <= updated_at <= time.time()
+    assert backend.get('support', 1, 60) is None
+
+    backend.delete('main', 1)
+    assert backend.get('main', 1, 60) is None
+
+
+def test_values_expire(redis_server):
+    backend = make_backend(redis_server)
+    backend.set('main', 1, 'waiting', 60)
+
+    redis_server.advance(59)
+    assert backend.get('main', 1, 60)[0] == 'waiting'
+    redis_server.advance(2)
+    assert backend.get('main', 1, 60) is None
+
+
+def test_state_shared_between_stores(redis_server):
+    first = StateStore('main', backend=make_backend(redis_server))
+    second = StateStore('main', backend=make_backend(redis_server))
+
+    first[42] = {'step': 'search'}
+    assert second[42] == {'step': 'search'}
+
+    second[42] = {'step': 'done'}
+    assert first.get(42) == {'step': 'done'}
+
+    del first[42]
+    assert 42 not in second
+
+
+def test_state_expires_for_all_stores(redis_server):
+    first = StateStore('main', ttl=60, backend=make_backend(redis_server))
+    second = StateStore('main', ttl=60, backend=make_backend(redis_server))
+
+    first[42] = 'waiting'
+    redis_server.advance(61)
+    assert second.get(42) is None
+    assert first.get(42) is None
+
+
+def test_dedup_set_shared_between_processes(redis_server):
+    first = DedupSet('updates', ttl=60, backend=make_backend(redis_server))
+    second = DedupSet('updates', ttl=60, backend=make_backend(redis_server))
+
+    assert first.add(1001) is True
+    assert second.add(1001) is False
+    assert first.add(1001) is False
+    assert second.add(1002) is True
+
+    redis_server.advance(61)
+    assert second.add(1001) is True
+    assert first.add(1001) is False
+
+
+def test_values_round_trip_through_json(redis_server):
+    store = StateStore('main', backend=make_backend(redis_server))
+    store[1] = {10: 'a', 'items': (1, 2)}
+    # Целые ключи словарей возвращаются строками, кортежи - списками
+    assert store[1] == {'10': 'a', 'items': [1, 2]}
+
+
+def test_error_reply_is_raised(redis_server):
+    client = RedisClient(redis_server.url)
+    with pytest.raises(RedisError):
+        client.execute('FLUSHALL')
+
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемые часы вместо time.time для StateStore и хранилищ."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def local_backend(request, monkeypatch):
+    if request.param == 'memory':
+        return MemoryBackend()
+    users_db = request.getfixturevalue('users_db')
+    monkeypatch.setattr(state_backends, 'db', users_db)
+    return SQLiteBackend()
+
+
+def test_cached_value_matches_reloaded(local_backend):
+    store = StateStore('main', max_entries=1, backend=local_backend)
+    store[1] = {10: 'a', 'items': (1, 2)}
+    cached = store[1]
+    # Второй пользователь вытесняет первого из кэша, и состояние читается из хранилища заново
+    store[2] = 'other'
+    assert store[1] == cached == {'10': 'a', 'items': [1, 2]}
+
+
+def test_reload_keeps_modification_time(local_backend, clock):
+    store = StateStore('main', max_entries=1, ttl=60, backend=local_backend)
+    store[1] = 'waiting'
+    clock[0] += 50
+    store[2] = 'other'
+    assert store.get(1) == 'waiting'
+    # Перечитанное через 50 секунд состояние истекает через 60 секунд после изменения, а не после чтения
+    clock[0] += 11
+    assert store.get(1) is None
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_entries=3)
+    for key in range(1, 4):
+        backend.set('main', key, key, 60)
+    backend.get('main', 1, 60)
+    backend.set('main', 4, 4, 60)
+    # Вытесняется давно не использованное значение 2, а не прочитанное недавно 1
+    assert backend.get('main', 2, 60) is None
+    assert [backend.get('main', key, 60)[0] for key in (1, 3, 4)] == [1, 3, 4]
+    backend.set('support', 1, 'x', 60)
+    assert backend.get('main', 1, 60)[0] == 1
+
+    for member in range(10):
+        assert backend.add_unique('updates', member, 60)
+    assert len(backend._members['updates']) == 3
@@ -0,0 +1,211 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from support_db import SupportDB, MIGRATIONS, SUBJECT_RANK_WEIGHT
+
+FILLER = ' '.join(f'filler{i}' for i in range(30))
+
+
+@pytest.fixture
+def support_db(tmp_path):
+    db = SupportDB(str(tmp_path / 'support.db'))
+    yield db
+    db.connections.close_all()
+
+
+def reference_ranking(db, query):
+    """Ранжирование по лучшему совпадению обращения среди всех найденных тем и сообщений."""
+    return [row[0] for row in db._connect().execute('''
+        SELECT ticket_id FROM (
+            SELECT rowid AS ticket_id, bm25(tickets_fts) * ? AS score FROM tickets_fts WHERE tickets_fts MATCH ?
+            UNION ALL
+            SELECT m.ticket_id, bm25(messages_fts) FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid WHERE messages_fts MATCH ?
+        ) GROUP BY ticket_id ORDER BY MIN(score), ticket_id
+    ''', (SUBJECT_RANK_WEIGHT, query, query))]
+
+
+def fill(db, tickets, messages):
+    start = datetime(2024, 1, 1)
+    conn = db._connect()
+    with conn:
+        conn.executemany(
+            'INSERT INTO tickets (id, user_id, username, status, created_at, updated_at, subject) '
+            'VALUES (?, 1, ?, ?, ?, ?, ?)',
+            [(ticket_id, 'user', 'open', start, start, subject) for ticket_id, subject in tickets]
+        )
+        conn.executemany(
+            'INSERT INTO messages (ticket_id, user_id, is_admin, message, created_at) VALUES (?, 1, 0, ?, ?)',
+            [(ticket_id, text, start + timedelta(seconds=i)) for i, (ticket_id, text) in enumerate(messages)]
+        )
+
+
+def test_ticket_with_many_messages_does_not_hide_equal_matches(support_db):
+    # Обращение 1 - 300 совпадений в сообщениях, обращение 2 - одно такое же совпадение,
+    # у 250 обращений слово встречается только в длинной теме, у 1000 его нет вовсе
+    tickets = [(1, 'question'), (2, 'question')]
+    tickets += [(ticket_id, f'alpha {FILLER}') for ticket_id in range(3, 253)]
+    tickets += [(ticket_id, 'other') for ticket_id in range(253, 1253)]
+    messages = [(1, 'alpha')] * 300 + [(2, 'alpha')]
+    messages += [(ticket_id, 'beta gamma') for ticket_id in range(3, 1253) for _ in range(2)]
+    fill(support_db, tickets, messages)
+
+    query = support_db._fts_query('alpha')
+    expected = reference_ranking(support_db, query)
+    assert expected[:2] == [1, 2]
+
+    page = support_db.search_tickets('alpha', 5)
+    assert [ticket['id'] for ticket in page['tickets']] == expected[:5]
+    assert page['has_next']
+    page = support_db.search_tickets('alpha', 5, offset=5)
+    assert [ticket['id'] for ticket in page['tickets']] == expected[5:10]
+
+
+def test_search_matches_full_ranking(support_db):
+    tickets = [(ticket_id, f'subject {ticket_id % 7} delta' if ticket_id % 3 else 'plain') for ticket_id in range(1, 401)]
+    messages = [(ticket_id, f'delta {"epsilon " * (ticket_id % 5)}note') for ticket_id in range(1, 401) for _ in range(ticket_id % 4)]
+    fill(support_db, tickets, messages)
+
+    expected = reference_ranking(support_db, support_db._fts_query('delta'))
+    found = []
+    for offset in range(0, 30, 5):
+        found += [ticket['id'] for ticket in support_db.search_tickets('delta', 5, offset)['tickets']]
+    assert found == expected[:30]
+
+
+def test_snippet_and_like_fallback(support_db):
+    ticket_id = support_db.create_ticket(1, 'user', subject='Оплата')
+    support_db.add_message(ticket_id, 1, 'Не проходит оплата картой через приложение')
+
+    ticket, = support_db.search_tickets('картой', 5)['tickets']
+    assert ticket['id'] == ticket_id
+    assert 'картой' in ticket['snippet']
+
+    support_db.fts_enabled = False
+    assert [ticket['id'] for ticket in support_db.search_tickets('картой', 5)['tickets']] == [ticket_id]
+
+
+def test_migrates_database_without_assignment(tmp_path):
+    # База первых версий бота: без ответственных, нагрузки и версии схемы
+    path = str(tmp_path / 'support.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE tickets (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT,
+            status TEXT NOT NULL, created_at TIMESTAMP NOT NULL, updated_at TIMESTAMP NOT NULL,
+            category TEXT, subject TEXT, priority TEXT DEFAULT 'normal');
+        CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, ticket_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL, is_admin BOOLEAN NOT NULL, message TEXT NOT NULL, created_at TIMESTAMP NOT NULL);
+        INSERT INTO tickets (user_id, status, created_at, updated_at, subject) VALUES (1, 'open', 0, 0, 'old');
+    ''')
+    conn.close()
+
+    db = SupportDB(path)
+    try:
+        assert db.migrate() == len(MIGRATIONS)
+        assert db.get_ticket(1, with_messages=False)['assigned_admin'] is None
+        assert db.assign_ticket(1, [10, 11]) == 10
+        assert db.get_admin_load([10, 11]) == {10: 1, 11: 0}
+    finally:
+        db.connections.close_all()
+
+
+def add_tickets(db, rows):
+    """Обращения (id, user_id, status, updated_at) с заданным временем обновления."""
+    conn = db._connect()
+    with conn:
+        conn.executemany(
+            'INSERT INTO tickets (id, user_id, username, status, created_at, updated_at, subject) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(ticket_id, user_id, 'user', status, updated_at, updated_at, f'ticket {ticket_id}')
+             for ticket_id, user_id, status, updated_at in rows]
+        )
+
+
+def walk(get_page):
+    """Листает страницы вперед до конца и обратно до начала по курсорам крайних обращений."""
+    pages = [get_page(None, 'next')]
+    while pages[-1]['has_next']:
+        last = pages[-1]['tickets'][-1]
+        pages.append(get_page((last['updated_at'], last['id']), 'next'))
+    back = [pages[-1]]
+    while back[-1]['has_prev']:
+        first = back[-1]['tickets'][0]
+        back.append(get_page((first['updated_at'], first['id']), 'prev'))
+    return pages, back[::-1]
+
+
+def ids(page):
+    return [ticket['id'] for ticket in page['tickets']]
+
+
+@pytest.fixture
+def tied_tickets(support_db):
+    # По три обращения на каждое время обновления: страницы по 4 режут группы посередине
+    start = datetime(2024, 1, 1)
+    rows = [(ticket_id, 1 + ticket_id % 2, 'open' if ticket_id % 5 else 'closed', start + timedelta(minutes=ticket_id // 3))
+            for ticket_id in range(1, 31)]
+    add_tickets(support_db, rows)
+    return rows
+
+
+def test_open_tickets_pages_with_equal_updated_at(support_db, tied_tickets):
+    expected = [ticket_id for ticket_id, _, status, updated_at in sorted(tied_tickets, key=lambda row: (row[3], row[0]))
+                if status == 'open']
+    pages, back = walk(lambda cursor, direction: support_db.get_open_tickets_page(4, cursor, direction))
+
+    assert [ticket_id for page in pages for ticket_id in ids(page)] == expected
+    assert [ids(page) for page in back] == [ids(page) for page in pages]
+    assert all(len(page['tickets']) == 4 for page in pages[:-1])
+
+
+def test_user_tickets_pages_newest_first(support_db, tied_tickets):
+    expected = [ticket_id for ticket_id, user_id, _, updated_at in sorted(tied_tickets, key=lambda row: (row[3], row[0]), reverse=True)
+                if user_id == 2]
+    pages, back = walk(lambda cursor, direction: support_db.get_user_tickets_page(2, 4, cursor, direction))
+
+    assert [ticket_id for page in pages for ticket_id in ids(page)] == expected
+    assert [ids(page) for page in back] == [ids(page) for page in pages]
+
+
+def test_page_boundaries(support_db):
+    start = datetime(2024, 1, 1)
+    add_tickets(support_db, [(ticket_id, 1, 'open', start) for ticket_id in range(1, 9)])
+
+    first = support_db.get_open_tickets_page(4)
+    assert (ids(first), first['has_prev'], first['has_next']) == ([1, 2, 3, 4], False, True)
+
+    # Ровно две полные страницы: у последней нет кнопки "Далее", пустой страницы не бывает
+    last = support_db.get_open_tickets_page(4, (first['tickets'][-1]['updated_at'], 4), 'next')
+    assert (ids(last), last['has_prev'], last['has_next']) == ([5, 6, 7, 8], True, False)
+
+    back = support_db.get_open_tickets_page(4, (last['tickets'][0]['updated_at'], 5), 'prev')
+    assert (ids(back), back['has_prev'], back['has_next']) == ([1, 2, 3, 4], False, True)
+
+    # Страница перед первым обращением пуста
+    before = support_db.get_open_tickets_page(4, (first['tickets'][0]['updated_at'], 1), 'prev')
+    assert (ids(before), before['has_prev']) == ([], False)
+
+
+def test_empty_last_page_after_tickets_closed(support_db, monkeypatch, tmp_path):
+    start = datetime(2024, 1, 1)
+    add_tickets(support_db, [(ticket_id, 1, 'open', start + timedelta(minutes=ticket_id)) for ticket_id in range(1, 8)])
+
+    # Бот создает свою базу при импорте - пусть она окажется во временной папке
+    monkeypatch.chdir(tmp_path)
+    import support_bot
+    monkeypatch.setattr(support_bot, 'db', support_db)
+    monkeypatch.setattr(support_bot, 'TICKETS_PAGE_SIZE', 5)
+
+    text, keyboard = support_bot.build_tickets_page('open', 1)
+    next_button, = keyboard.keyboard[0]
+    _, scope, direction, ticket_id, updated_at = next_button.callback_data.split('_', 4)
+    assert (scope, direction, int(ticket_id)) == ('open', 'next', 5)
+
+    # Пока страница была открыта, все обращения после нее закрыли
+    for ticket_id in (6, 7):
+        support_db.close_ticket(ticket_id)
+    page = support_db.get_open_tickets_page(5, (updated_at, 5), 'next')
+    assert (ids(page), page['has_prev'], page['has_next']) == ([], True, False)
+    assert support_bot.build_tickets_page(scope, 1, (updated_at, 5), direction) is None
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+from weather import TemperatureChartCache
+from weather_service import WeatherService
+
+
+def forecast(fetched_at=None):
+    return {
+        'current': {},
+        'daily': {},
+        'hourly': {'time': [], 'temperature_2m': []},
+        'fetched_at': time.time() if fetched_at is None else fetched_at,
+    }
+
+
+class SlowRenderer:
+    """Рисует «график» только после release(), чтобы запрос застал отрисовку."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def release(self):
+        self._release.set()
+
+    def __call__(self, hourly):
+        self.calls += 1
+        self.started.set()
+        assert self._release.wait(5)
+        return b'png'
+
+
+def test_get_does_not_wait_for_render():
+    renderer = SlowRenderer()
+    cache = TemperatureChartCache(render=renderer)
+    data = forecast()
+    delivered = []
+    ready = threading.Event()
+
+    def on_ready(image):
+        delivered.append(image)
+        ready.set()
+
+    started = time.monotonic()
+    assert cache.get(data, on_ready=on_ready) is None
+    assert cache.get(data) is None
+    assert time.monotonic() - started < 1
+
+    renderer.release()
+    assert ready.wait(5)
+    assert delivered == [b'png']
+    assert cache.get(data) == b'png'
+    assert renderer.calls == 1
+
+
+def test_failed_render_skips_callbacks():
+    def broken(hourly):
+        raise RuntimeError('no renderer')
+
+    cache = TemperatureChartCache(render=broken)
+    delivered = []
+    assert cache.get(forecast(), on_ready=delivered.append) is None
+    for _ in range(100):
+        if not cache._rendering:
+            break
+        time.sleep(0.01)
+    assert delivered == []
+
+
+def test_forecast_from_disk_is_prerendered(tmp_path):
+    cache_file = tmp_path / 'weather.json'
+    cache_file.write_text(json.dumps(forecast()), encoding='utf-8')
+    service = WeatherService(cache_file=str(cache_file))
+    renderer = SlowRenderer()
+    renderer.release()
+    cache = TemperatureChartCache(render=renderer)
+    service.add_listener(cache.prerender)
+
+    service.warm_up()
+    assert renderer.started.wait(5)
+
+    data = service.get()
+    for _ in range(100):
+        if cache.get(data):
+            break
+        time.sleep(0.01)
+    assert cache.get(data) == b'png'
+    assert renderer.calls == 1
+
+
+def test_lazy_disk_load_notifies_listeners(tmp_path):
+    cache_file = tmp_path / 'weather.json'
+    cache_file.write_text(json.dumps(forecast()), encoding='utf-8')
+    service = WeatherService(cache_file=str(cache_file))
+    seen = []
+    service.add_listener(seen.append)
+
+    data = service.get()
+    service.get()
+    assert seen == [data]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from state_backends import MemoryBackend
+from state_store import DedupSet
+from webhook import WebhookServer
+
+
+class FakeRequest:
+    def __init__(self, name, update):
+        self.match_info = {'bot': name}
+        self.headers = {}
+        self._update = update
+
+    async def json(self):
+        return self._update
+
+
+class FakeBot:
+    """Записывает порядок обновлений; на первые обновления тратит больше времени."""
+
+    def __init__(self, fail_once=()):
+        self.calls = []
+        self.fail_once = set(fail_once)
+        self._lock = threading.Lock()
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            if update.update_id in self.fail_once:
+                self.fail_once.discard(update.update_id)
+                raise RuntimeError('dispatch failed')
+            time.sleep(0.005 * (update.update_id % 4))
+            with self._lock:
+                self.calls.append((update.message.chat.id, update.update_id))
+
+
+def message_update(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': 'text',
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'user'},
+        },
+    }
+
+
+async def deliver(server, updates):
+    server._stop = asyncio.Event()
+    server._create_queues()
+    consumers = [asyncio.create_task(server._consume(queue)) for queue in server.queues]
+    for update in updates:
+        await server._handle_update(FakeRequest('main', update))
+    await asyncio.gather(*(queue.join() for queue in server.queues))
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+
+def make_server(bot):
+    server = WebhookServer({'main': bot}, queue_size=1000, workers=4)
+    server.seen_updates = {'main': DedupSet('updates_main', backend=MemoryBackend())}
+    return server
+
+
+def test_updates_of_one_chat_keep_order():
+    bot = FakeBot()
+    updates = [message_update(update_id, chat_id=update_id % 3) for update_id in range(1, 41)]
+    asyncio.run(deliver(make_server(bot), updates))
+
+    assert len(bot.calls) == 40
+    for chat_id in range(3):
+        received = [update_id for chat, update_id in bot.calls if chat == chat_id]
+        assert received == sorted(received)
+
+
+def test_failed_dispatch_is_not_marked_as_seen():
+    bot = FakeBot(fail_once={5})
+    server = make_server(bot)
+    asyncio.run(deliver(server, [message_update(5, chat_id=1), message_update(6, chat_id=1)]))
+    assert bot.calls == [(1, 6)]
+
+    # Telegram доставляет обновление повторно: теперь оно обрабатывается, а дубликат - нет
+    asyncio.run(deliver(server, [message_update(5, chat_id=1), message_update(6, chat_id=1)]))
+    assert bot.calls == [(1, 6), (1, 5)]
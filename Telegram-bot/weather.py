@@ -1,49 +1,17 @@
-import requests
 import logging
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-import matplotlib
-import numpy as np
-from scipy.interpolate import make_interp_spline
-from matplotlib.dates import HourLocator, DateFormatter
+from datetime import date
 import math
-matplotlib.use('Agg')
+import threading
+from collections import OrderedDict
+from weather_service import weather_service
+from charts import get_renderer
 
 def get_openmeteo_weather():
-    """Get weather data from OpenMeteo API for Yaroslavl."""
-    try:
-        # Координаты Ярославля
-        latitude = 57.6261
-        longitude = 39.8845
-        
-        # Получаем текущую погоду, прогноз и почасовую температуру
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current=temperature_2m,apparent_temperature,relative_humidity_2m,weathercode,wind_speed_10m,pressure_msl&hourly=temperature_2m&daily=weathercode,temperature_2m_max,temperature_2m_min&timezone=Europe%2FMoscow&forecast_days=2"
-        
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Добавляем логирование для отладки
-        logging.info(f"OpenMeteo API response: {data}")
-        
-        if not data or 'current' not in data or 'daily' not in data or 'hourly' not in data:
-            logging.error("Invalid response from weather API")
-            return None
-            
-        return {
-            'current': data['current'],
-            'daily': data['daily'],
-            'hourly': data['hourly']
-        }
-        
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error fetching weather data: {e}")
-        return None
-    except Exception as e:
-        logging.error(f"Unexpected error in get_openmeteo_weather: {e}")
-        return None
+    """
+    Get weather data for Yaroslavl.
+    Served from the shared forecast cache (see weather_service.py), so most taps do not reach the API.
+    """
+    return weather_service.get()
 
 def get_weather_description(weathercode):
     """Get weather description from weather code."""
@@ -88,98 +56,9 @@ def get_weather_emoji(weathercode):
     return emoji_map.get(weathercode, "🌤")
 
 def generate_temperature_graph(weather_data):
-    """Generate a beautiful and clear temperature graph for today's hourly forecast."""
-    try:
-        if not weather_data or 'hourly' not in weather_data:
-            return None
-        hourly = weather_data['hourly']
-        times = hourly['time']
-        temps = hourly['temperature_2m']
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        today_hours = [(t, temp) for t, temp in zip(times, temps) if t.startswith(today_str)]
-        
-        # Для графика нужно хотя бы 2 точки
-        if len(today_hours) < 2:
-            return None
-
-        x = [datetime.strptime(t, '%Y-%m-%dT%H:%M') for t, _ in today_hours]
-        y = [temp for _, temp in today_hours]
-
-        plt.figure(figsize=(10, 4))
-
-        # Интерполяция для плавной линии (делаем только если точек >= 4)
-        if len(x) >= 4:
-            try:
-                x_num = np.array([dt.timestamp() for dt in x])
-                y_num = np.array(y)
-                spl = make_interp_spline(x_num, y_num, k=3)
-                xnew = np.linspace(x_num.min(), x_num.max(), 200)
-                y_smooth = spl(xnew)
-                x_smooth = [datetime.fromtimestamp(ts) for ts in xnew]
-                plt.plot(x_smooth, y_smooth, color='#FF3B3B', linewidth=2.5, zorder=1)
-                plt.fill_between(x_smooth, y_smooth, alpha=0.15, color='#FF3B3B')
-            except ValueError as e:
-                 logging.warning(f"Could not perform spline interpolation, falling back to linear: {e}")
-                 # При ошибке интерполяции используем исходные точки
-                 plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
-                 plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
-            except Exception as e:
-                 logging.error(f"Unexpected error during spline interpolation: {e}")
-                 # При любой другой ошибке интерполяции используем исходные точки
-                 plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
-                 plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
-        else:
-            # Если точек < 4, строим график без интерполяции
-            plt.plot(x, y, color='#FF3B3B', linewidth=2.5, zorder=1)
-            plt.fill_between(x, y, alpha=0.15, color='#FF3B3B')
-
-        # Рисуем точки только если их не очень много
-        if len(x) <= 24:
-            plt.scatter(x, y, color='#FF3B3B', s=50, zorder=2, edgecolors='white', linewidths=1.5)
-
-        # Подписи температуры над точками (только если точек не очень много)
-        if len(x) <= 24:
-            for xi, yi in zip(x, y):
-                try:
-                    # Увеличим отступ подписи от точки
-                    plt.text(xi, float(yi) + (max(y)*0.02 + 0.5), f'{round(yi)}°', ha='center', va='bottom', fontsize=9, color='#333', fontweight='bold')
-                except TypeError as e:
-                    logging.error(f"Error placing text label at {xi}: {e}, value: {yi}")
-                    continue
-                except Exception as e:
-                     logging.error(f"Unexpected error placing text label at {xi}: {e}")
-                     continue
-
-        # Оформление осей и заголовка
-        plt.title('График температуры на сегодня:', pad=20, fontsize=14, fontweight='bold')
-        plt.xlabel('Время', fontsize=11)
-        plt.ylabel('Температура (°C)', fontsize=11)
-
-        # Установка лимитов оси Y с отступом
-        y_min_val = min(y) if y else 0
-        y_max_val = max(y) if y else 25 # Default max if no data
-        # Добавим отступ сверху, учитывая максимальное значение для подписей
-        padding_top = (y_max_val - y_min_val) * 0.15 + 3 # Отступ 15% от диапазона + константа
-        plt.ylim(y_min_val - 2, y_max_val + padding_top) 
-
-        # Оформление оси X: подписи каждые 3 часа
-        plt.gca().xaxis.set_major_locator(HourLocator(interval=3))
-        plt.gca().xaxis.set_major_formatter(DateFormatter('%H:%M'))
-
-        plt.grid(True, linestyle='--', alpha=0.3, linewidth=1)
-        plt.tight_layout()
-        plt.gcf().autofmt_xdate()
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=120, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-
-        img_str = base64.b64encode(buf.getvalue()).decode()
-        return img_str
-    except Exception as e:
-        logging.error(f"Error generating temperature graph: {e}")
-        return None
+    """Generate a beautiful and clear temperature graph for today's hourly forecast (base64 PNG)."""
+    # Сглаженный график требует scipy, поэтому всегда рисуется через matplotlib
+    return get_renderer('matplotlib').smooth_chart(weather_data)
 
 def smart_round(temp):
     """Round temperature according to custom rules: X.5 rounds down to X, X.6+ rounds up to X+1."""
@@ -229,60 +108,96 @@ def format_weather_message(weather_data):
         return "Извините, произошла ошибка при форматировании прогноза погоды."
 
 def generate_hourly_temperature_graph_image(hourly_data):
-    """Generate a matplotlib graph image of hourly temperatures for today."""
-    try:
-        if not hourly_data or 'time' not in hourly_data or 'temperature_2m' not in hourly_data:
-            logging.warning("Missing hourly data for graph generation.")
-            return None
-
-        times = [datetime.fromisoformat(ts) for ts in hourly_data['time']]
-        temperatures = hourly_data['temperature_2m']
-
-        # Filter data for today
-        today_date = datetime.now().date()
-        filtered_times = []
-        filtered_temps = []
-        for i, t in enumerate(times):
-            if t.date() == today_date:
-                filtered_times.append(t)
-                filtered_temps.append(temperatures[i])
-        
-        if not filtered_times:
-            logging.warning("No hourly data available for today for graph generation.")
-            return None
+    """Generate a graph image (PNG bytes) of hourly temperatures for today with the renderer from config.CHART_RENDERER."""
+    return get_renderer().hourly_chart(hourly_data)
 
-        plt.style.use('ggplot') # Use a clean ggplot style
-        fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
-
-        ax.plot(filtered_times, filtered_temps, marker='o', linestyle='-', color='#FF6347', linewidth=2)
-        ax.fill_between(filtered_times, min(filtered_temps) - 2, filtered_temps, color='#FF6347', alpha=0.1) # Shaded area
-
-        # Add temperature labels on top of each point
-        for i, temp in enumerate(filtered_temps):
-            ax.text(filtered_times[i], temp + 0.5, f'{int(temp)}°', ha='center', va='bottom', fontsize=9, color='#333')
+class TemperatureChartCache:
+    """
+    Готовые PNG графика температуры на сегодня.
+    График одинаков для всех пользователей, пока не обновился прогноз, поэтому
+    рисуется один раз на прогноз (ключ - время получения прогноза и текущая дата)
+    в фоновом потоке сразу после загрузки или обновления прогноза, а запросы берут
+    готовые байты. Запрос никогда не ждет отрисовки: если графика еще нет
+    (например, сменилась дата), он получает None, а график отправляется позже.
+    """
 
-        # Customize the plot
-        ax.set_title('График температуры на сегодня:', fontsize=16, pad=20)
-        ax.set_xlabel('Время', fontsize=12)
-        ax.set_ylabel('Температура (°C)', fontsize=12)
-        ax.grid(True, linestyle='--', alpha=0.6)
-        ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
-        ax.xaxis.set_major_locator(HourLocator(interval=3)) # Show ticks every 3 hours
-        fig.autofmt_xdate() # Rotate x-axis labels for better readability
-        
-        # Adjust y-axis limits to provide some padding
-        min_temp = min(filtered_temps)
-        max_temp = max(filtered_temps)
-        ax.set_ylim(min_temp - 2, max_temp + 3) # Add padding
+    def __init__(self, render=generate_hourly_temperature_graph_image, max_entries=4):
+        """
+        :param render: Функция, рисующая PNG по почасовым данным прогноза
+        :param max_entries: Сколько последних графиков хранить
+        """
+        self.render = render
+        self.max_entries = max_entries
+        self._images = OrderedDict()
+        # Ключ рисующегося графика -> функции, ждущие готовый PNG
+        self._rendering = {}
+        self._lock = threading.Lock()
+        # pyplot хранит глобальное состояние, поэтому графики рисуются строго по одному
+        self._render_lock = threading.Lock()
+
+    @staticmethod
+    def _key(weather_data):
+        return f"{weather_data.get('fetched_at')}:{date.today().isoformat()}"
+
+    def _render(self, key, hourly):
+        image = None
+        try:
+            with self._render_lock:
+                image = self.render(hourly)
+        except Exception as e:
+            logging.error(f"[WEATHER] Failed to render temperature chart: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                if image:
+                    self._images[key] = image
+                    while len(self._images) > self.max_entries:
+                        self._images.popitem(last=False)
+                callbacks = self._rendering.pop(key, [])
+        if not image:
+            return
+        for callback in callbacks:
+            try:
+                callback(image)
+            except Exception as e:
+                logging.error(f"[WEATHER] Failed to deliver temperature chart: {e}")
+
+    def _start_render(self, weather_data, on_ready=None):
+        """
+        Запускает отрисовку в фоне, если графика еще нет
+        :param on_ready: Вызывается с байтами PNG, когда график будет нарисован
+        :return: Байты PNG, если график уже готов, иначе None
+        """
+        key = self._key(weather_data)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+            callbacks = self._rendering.get(key)
+            if callbacks is None:
+                callbacks = self._rendering[key] = []
+                threading.Thread(
+                    target=self._render, args=(key, weather_data['hourly']),
+                    name="ChartRender", daemon=True
+                ).start()
+            if on_ready is not None:
+                callbacks.append(on_ready)
+        return None
 
-        # Save the plot to a BytesIO object and encode it to base64
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        buf.seek(0)
-        plt.close(fig) # Close the figure to free up memory
-        
-        return buf.getvalue()
+    def prerender(self, weather_data):
+        """Заранее рисует график для загруженного или нового прогноза (подписчик WeatherService)."""
+        if weather_data and 'hourly' in weather_data:
+            self._start_render(weather_data)
+
+    def get(self, weather_data, on_ready=None):
+        """
+        Возвращает готовый PNG графика для прогноза, не дожидаясь отрисовки
+        :param weather_data: Прогноз от WeatherService
+        :param on_ready: Если графика еще нет, вызывается с байтами PNG из фонового потока после отрисовки
+        :return: Байты PNG или None
+        """
+        if not weather_data or 'hourly' not in weather_data:
+            return None
+        return self._start_render(weather_data, on_ready)
 
-    except Exception as e:
-        logging.error(f"Error generating hourly temperature graph image: {e}", exc_info=True)
-        return None 
\ No newline at end of file
+temperature_chart_cache = TemperatureChartCache()
+weather_service.add_listener(temperature_chart_cache.prerender)
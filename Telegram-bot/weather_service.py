@@ -0,0 +1,184 @@
+import json
+import os
+import time
+import logging
+import threading
+import requests
+from config import (
+    WEATHER_API_URL, WEATHER_LATITUDE, WEATHER_LONGITUDE,
+    WEATHER_CACHE_TTL, WEATHER_STALE_MAX_AGE, WEATHER_CACHE_FILE
+)
+
+logger = logging.getLogger(__name__)
+
+# Один запрос покрывает и weather.py, и NewsParser.get_weather
+FORECAST_PARAMS = {
+    'latitude': WEATHER_LATITUDE,
+    'longitude': WEATHER_LONGITUDE,
+    'current': 'temperature_2m,apparent_temperature,relative_humidity_2m,weather_code,wind_speed_10m,pressure_msl',
+    'hourly': 'temperature_2m',
+    'daily': 'weather_code,temperature_2m_max,temperature_2m_min',
+    'timezone': 'Europe/Moscow',
+    'forecast_days': 2,
+}
+
+class WeatherService:
+    """
+    Единый источник прогноза Open-Meteo с кэшем.
+    Свежий прогноз (моложе ttl) отдается из памяти; устаревший тоже отдается
+    сразу, а обновление запускается в фоне (stale-while-revalidate).
+    Одновременные запросы при пустом кэше ждут одного обращения к API.
+    Последний прогноз хранится в файле и переживает перезапуск бота;
+    подписчики получают и прогноз, прочитанный из файла.
+    """
+
+    def __init__(self, ttl=WEATHER_CACHE_TTL, stale_max_age=WEATHER_STALE_MAX_AGE, cache_file=WEATHER_CACHE_FILE):
+        """
+        :param ttl: Сколько секунд прогноз считается свежим
+        :param stale_max_age: До какого возраста (в секундах) устаревший прогноз можно отдавать
+        :param cache_file: Файл, в котором прогноз хранится между перезапусками
+        """
+        self.ttl = ttl
+        self.stale_max_age = stale_max_age
+        self.cache_file = cache_file
+        self._data = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        # Событие текущего обращения к API; None, если обращения нет
+        self._fetching = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Подписывает функцию на обновление прогноза
+        :param callback: Вызывается с новыми данными прогноза; не должна надолго блокировать поток
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, data):
+        for callback in self._listeners:
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error(f"[WEATHER] Forecast listener failed: {e}")
+
+    def _load_from_disk(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and 'fetched_at' in data:
+                    self._data = data
+        except Exception as e:
+            # В файле может лежать что-то другое (например, старый вывод curl) - просто игнорируем
+            logger.debug(f"[WEATHER] Ignoring unreadable cache file {self.cache_file}: {e}")
+
+    def _ensure_loaded_locked(self):
+        """
+        Читает прогноз из файла при первом обращении. Вызывается под self._lock.
+        :return: Прочитанный прогноз, о котором еще не знают подписчики, или None
+        """
+        if self._loaded:
+            return None
+        self._load_from_disk()
+        self._loaded = True
+        return self._data
+
+    def warm_up(self):
+        """
+        Читает сохраненный прогноз при запуске бота и сообщает о нем подписчикам,
+        чтобы производные данные (например, график) были готовы к первому запросу.
+        """
+        with self._lock:
+            loaded = self._ensure_loaded_locked()
+        if loaded is not None:
+            self._notify(loaded)
+
+    def _save_to_disk(self, data):
+        try:
+            tmp_path = self.cache_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.error(f"[WEATHER] Failed to save forecast to {self.cache_file}: {e}")
+
+    def _fetch(self):
+        """Запрашивает прогноз у Open-Meteo. Возвращает данные или None."""
+        try:
+            response = requests.get(WEATHER_API_URL, params=FORECAST_PARAMS, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"[WEATHER] Error fetching weather data: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"[WEATHER] Invalid JSON from weather API: {e}")
+            return None
+
+        if not data or 'current' not in data or 'daily' not in data or 'hourly' not in data:
+            logger.error("[WEATHER] Invalid response from weather API")
+            return None
+
+        # weather.py использует старое имя поля weathercode, NewsParser - новое weather_code
+        current, daily = data['current'], data['daily']
+        current['weathercode'] = current.get('weather_code')
+        daily['weathercode'] = daily.get('weather_code')
+        return {
+            'current': current,
+            'daily': daily,
+            'hourly': data['hourly'],
+            'fetched_at': time.time(),
+        }
+
+    def _refresh(self, event):
+        data = self._fetch()
+        with self._lock:
+            if data is not None:
+                self._data = data
+            self._fetching = None
+        event.set()
+        if data is not None:
+            self._save_to_disk(data)
+            logger.info("[WEATHER] Forecast updated.")
+            self._notify(data)
+
+    def _start_refresh_locked(self):
+        """Начинает обращение к API, если оно еще не идет. Вызывается под self._lock."""
+        if self._fetching is None:
+            self._fetching = threading.Event()
+            return self._fetching, True
+        return self._fetching, False
+
+    def get(self):
+        """
+        Возвращает прогноз (словарь с ключами current, daily, hourly и fetched_at) или None.
+        """
+        with self._lock:
+            loaded = self._ensure_loaded_locked()
+            data = self._data
+            age = time.time() - data['fetched_at'] if data else None
+
+            if data is None or age >= self.ttl:
+                event, is_owner = self._start_refresh_locked()
+        if loaded is not None:
+            self._notify(loaded)
+        if data is not None and age < self.ttl:
+            return data
+
+        if data is not None and age < self.stale_max_age:
+            # Отдаем устаревший прогноз сразу, а обновляем в фоне
+            if is_owner:
+                threading.Thread(target=self._refresh, args=(event,), name="WeatherRefresh", daemon=True).start()
+            return data
+
+        # Прогноза нет совсем (или он слишком старый): ждем одного общего обращения к API
+        if is_owner:
+            self._refresh(event)
+        else:
+            event.wait(timeout=15)
+        with self._lock:
+            # Если API недоступен, лучше показать старый прогноз, чем ничего
+            return self._data
+
+weather_service = WeatherService()
@@ -0,0 +1,186 @@
+import time
+import asyncio
+import signal
+import logging
+from aiohttp import web
+from telebot import types
+from config import (
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_QUEUE_SIZE, WEBHOOK_WORKERS, WEBHOOK_SHUTDOWN_TIMEOUT
+)
+from dispatcher import install_dispatcher
+from state_store import DedupSet
+
+logger = logging.getLogger(__name__)
+
+def _update_chat_id(update_json):
+    """Чат, к которому относится обновление в виде JSON (как dispatcher._get_chat_id для объектов)"""
+    for value in update_json.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if chat:
+            return chat.get('id')
+        if value.get('from'):
+            return value['from'].get('id')
+    return None
+
+class WebhookServer:
+    """
+    HTTP-сервер для приема обновлений Telegram через вебхук вместо длинного опроса.
+    Каждый бот получает свой путь (WEBHOOK_PATH/<имя>). Принятые обновления
+    складываются в ограниченные очереди и отдаются диспетчеру ботов. Обновления
+    одного чата всегда попадают в одну очередь с одним разбирающим ее обработчиком,
+    поэтому доходят до диспетчера в порядке поступления.
+    Диспетчер принимает ограниченное число обновлений (DISPATCH_MAX_PENDING), поэтому
+    когда обработчики не успевают, очередь заполняется, сервер отвечает 503
+    и Telegram повторит доставку позже.
+    Повторно доставленные обновления отсеиваются по update_id (общему для
+    всех процессов, если состояния хранятся в Redis); если обновление не удалось
+    передать диспетчеру, отметка снимается и повторная доставка будет обработана.
+    """
+
+    def __init__(self, bots, host=WEBHOOK_HOST, port=WEBHOOK_PORT, base_url=WEBHOOK_BASE_URL,
+                 queue_size=WEBHOOK_QUEUE_SIZE, workers=WEBHOOK_WORKERS):
+        """
+        :param bots: Словарь {имя: экземпляр TeleBot}; имя становится частью пути вебхука
+        :param host: Адрес, на котором слушает сервер
+        :param port: Порт сервера
+        :param base_url: Внешний адрес сервера для регистрации вебхука (пустой - не регистрировать)
+        :param queue_size: Общая емкость очередей принятых обновлений
+        :param workers: Сколько задач (и очередей) разбирают обновления
+        """
+        self.bots = bots
+        self.host = host
+        self.port = port
+        self.base_url = base_url.rstrip('/') if base_url else ''
+        self.workers = workers
+        self.queues = []
+        self.queue_size = queue_size
+        self.seen_updates = {name: DedupSet(f"updates_{name}") for name in bots}
+        self._stop = None
+
+    def _path(self, name):
+        return f"{WEBHOOK_PATH.rstrip('/')}/{name}"
+
+    async def _handle_update(self, request):
+        name = request.match_info['bot']
+        if name not in self.bots:
+            raise web.HTTPNotFound()
+        if WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+            raise web.HTTPForbidden()
+        if self._stop.is_set():
+            # Во время остановки новые обновления не принимаем: Telegram доставит их позже
+            raise web.HTTPServiceUnavailable()
+        try:
+            update = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest()
+        chat_id = _update_chat_id(update) if isinstance(update, dict) else None
+        queue = self.queues[hash(chat_id) % len(self.queues)]
+        try:
+            queue.put_nowait((name, update))
+        except asyncio.QueueFull:
+            logger.warning(f"[WEBHOOK] {name}: update queue is full, asking Telegram to retry.")
+            raise web.HTTPServiceUnavailable()
+        return web.Response()
+
+    async def _consume(self, queue):
+        while True:
+            name, update_json = await queue.get()
+            update_id = None
+            try:
+                update_id = update_json.get('update_id')
+                if update_id is not None and not await asyncio.to_thread(self.seen_updates[name].add, update_id):
+                    logger.debug(f"[WEBHOOK] {name}: skipping duplicate update {update_id}.")
+                    update_id = None
+                    continue
+                update = types.Update.de_json(update_json)
+                # Диспетчер ставит обработчики в очереди чатов; если он переполнен,
+                # вызов ждет свободного места, и очередь вебхука начинает заполняться
+                await asyncio.to_thread(self.bots[name].process_new_updates, [update])
+            except Exception as e:
+                logger.error(f"[WEBHOOK] {name}: error while dispatching update: {e}", exc_info=True)
+                if update_id is not None:
+                    # Обновление не обработано: повторная доставка не должна считаться дубликатом
+                    await asyncio.to_thread(self.seen_updates[name].discard, update_id)
+            finally:
+                queue.task_done()
+
+    def _create_queues(self):
+        shard_size = max(self.queue_size // self.workers, 1)
+        self.queues = [asyncio.Queue(maxsize=shard_size) for _ in range(self.workers)]
+
+    def _pending(self):
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def _set_webhooks(self):
+        for name, bot in self.bots.items():
+            url = f"{self.base_url}{self._path(name)}"
+            try:
+                await asyncio.to_thread(bot.set_webhook, url=url, secret_token=WEBHOOK_SECRET or None)
+                logger.info(f"[WEBHOOK] {name}: webhook set to {url}")
+            except Exception as e:
+                logger.error(f"[WEBHOOK] {name}: failed to set webhook: {e}")
+
+    async def run(self):
+        """Принимает обновления до вызова stop() или сигнала остановки."""
+        self._stop = asyncio.Event()
+        self._create_queues()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: остановка по KeyboardInterrupt
+                pass
+
+        dispatchers = [install_dispatcher(bot) for bot in self.bots.values()]
+        app = web.Application()
+        app.router.add_post(f"{WEBHOOK_PATH.rstrip('/')}/{{bot}}", self._handle_update)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        logger.info(f"[WEBHOOK] Listening on {self.host}:{self.port} for: {', '.join(self._path(name) for name in self.bots)}")
+
+        consumers = [asyncio.create_task(self._consume(queue)) for queue in self.queues]
+        if self.base_url:
+            await self._set_webhooks()
+        try:
+            await self._stop.wait()
+        finally:
+            logger.info("[WEBHOOK] Shutting down...")
+            # Перестаем принимать соединения и дожидаемся, пока принятые обновления
+            # будут переданы диспетчеру и обработаны (всего не дольше WEBHOOK_SHUTDOWN_TIMEOUT)
+            deadline = time.monotonic() + WEBHOOK_SHUTDOWN_TIMEOUT
+            await site.stop()
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self.queues)), timeout=WEBHOOK_SHUTDOWN_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"[WEBHOOK] {self._pending()} updates were not dispatched before shutdown.")
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            await runner.cleanup()
+            for dispatcher in dispatchers:
+                await asyncio.to_thread(dispatcher.close, max(deadline - time.monotonic(), 0))
+            logger.info("[WEBHOOK] Stopped.")
+
+    def stop(self):
+        """Начинает плавную остановку сервера."""
+        if self._stop is not None:
+            self._stop.set()
+
+def run_webhook(bots):
+    """
+    Запускает сервер вебхуков для ботов и блокирует поток до остановки
+    :param bots: Словарь {имя: экземпляр TeleBot}
+    """
+    server = WebhookServer(bots)
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        logger.info("[WEBHOOK] Interrupted, shutting down.")
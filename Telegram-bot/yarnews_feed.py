@@ -0,0 +1,220 @@
+import requests
+from bs4 import BeautifulSoup
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import FEED_REFRESH_INTERVAL, ARCHIVE_BACKFILL_COOLDOWN
+from article_archive import article_archive
+from browser_pool import browser_pool
+from classifier import tag_article
+
+logger = logging.getLogger(__name__)
+
+YARNEWS_URL = "https://www.yarnews.net/"
+YARNEWS_BASE_URL = "https://www.yarnews.net"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3'
+}
+
+def parse_feed(page_source):
+    """
+    Разбирает HTML ленты yarnews.net в список нормализованных статей.
+    Каждая статья - словарь с ключами title, description, link, image_url и datetime.
+    Статьи с нераспознанной датой пропускаются, дубликаты по ссылке отбрасываются.
+    """
+    soup = BeautifulSoup(page_source, 'html.parser')
+    news_items = soup.select(".news-feed-item")
+    logger.info(f"[FEED] Found {len(news_items)} news items in page source.")
+
+    articles = []
+    seen_urls = set()
+    today_str = datetime.now().strftime("%d.%m.%Y")
+
+    for i, item in enumerate(news_items):
+        try:
+            title_elem = item.find("a", class_="news-name") or item.find("h2") or item.find("h3")
+            if not title_elem:
+                continue
+
+            title = title_elem.text.strip()
+            link = title_elem.get("href", "")
+            if not link.startswith("http"):
+                link = YARNEWS_BASE_URL + link
+
+            if link in seen_urls:
+                continue
+            seen_urls.add(link)
+
+            desc_elem = (
+                item.find("div", class_="news-excerpt") or
+                item.find("div", class_="description") or
+                item.find("p")
+            )
+            description = desc_elem.text.strip() if desc_elem else ""
+
+            date_elem = (
+                item.find("span", class_="news-date") or
+                item.find("span", class_="date") or
+                item.find("time") or
+                item.find_previous("span", class_="date")
+            )
+            datetime_str = date_elem.text.strip() if date_elem else today_str
+
+            try:
+                published = datetime.strptime(datetime_str, "%d.%m.%Y в %H:%M")
+            except ValueError:
+                try:
+                    published = datetime.strptime(datetime_str, "%d.%m.%Y")
+                except ValueError:
+                    logger.info(f"[FEED] [SKIP] Article {i} ('{title}'): date parse error ('{datetime_str}').")
+                    continue
+
+            image_url = ""
+            img_elem = item.select_one("img")
+            if img_elem and img_elem.get("src"):
+                image_url = img_elem["src"]
+                if not image_url.startswith("http"):
+                    image_url = YARNEWS_BASE_URL + image_url
+
+            articles.append({
+                "title": title,
+                "description": description,
+                "link": link,
+                "image_url": image_url,
+                "datetime": published
+            })
+        except Exception as e:
+            logger.error(f"[FEED] Error parsing article {i}: {e}")
+            continue
+
+    articles.sort(key=lambda x: x["datetime"], reverse=True)
+    return articles
+
+class FeedStore:
+    """
+    Хранилище статей главной страницы yarnews.net.
+    Фоновый поток раз в interval секунд скачивает и разбирает ленту,
+    а обработчики читают готовый список статей без обращения к сети.
+    """
+
+    def __init__(self, url=YARNEWS_URL, interval=FEED_REFRESH_INTERVAL):
+        self.url = url
+        self.interval = interval
+        self._articles = []
+        self._updated_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Скачивает ленту и атомарно заменяет список статей.
+        Одновременные вызовы не дублируют запрос: второй поток дождется первого.
+        :return: True, если лента успешно обновлена
+        """
+        with self._refresh_lock:
+            try:
+                response = requests.get(self.url, headers=HEADERS, timeout=20)
+                response.raise_for_status()
+                articles = parse_feed(response.text)
+            except Exception as e:
+                logger.error(f"[FEED] Failed to refresh feed: {e}")
+                return False
+
+            # Классифицируем только новые статьи, теги уже известных берем из прошлого снимка
+            with self._lock:
+                known_tags = {a["link"]: a["tags"] for a in self._articles}
+            for article in articles:
+                if article["link"] in known_tags:
+                    article["tags"] = known_tags[article["link"]]
+                tag_article(article)
+
+            with self._lock:
+                self._articles = articles
+                self._updated_at = datetime.now()
+            self._loaded.set()
+            logger.info(f"[FEED] Feed refreshed, {len(articles)} articles in store.")
+
+            # Каждый снимок ленты пополняет архив для недельных выборок
+            try:
+                article_archive.ingest(articles, fetched_at=self._updated_at)
+            except Exception as e:
+                logger.error(f"[FEED] Failed to ingest feed into archive: {e}")
+            return True
+
+    def get_articles(self):
+        """
+        Возвращает копию списка статей с тегами категорий (от новых к старым).
+        Если лента еще ни разу не загружалась, загружает ее синхронно.
+        """
+        if not self._loaded.is_set():
+            with self._refresh_lock:
+                loaded = self._loaded.is_set()
+            if not loaded:
+                self.refresh()
+        with self._lock:
+            return list(self._articles)
+
+    @property
+    def updated_at(self):
+        return self._updated_at
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Запускает фоновое обновление ленты в отдельном потоке."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FeedRefresher", daemon=True)
+        self._thread.start()
+        logger.info(f"[FEED] Background refresher started, interval {self.interval} s.")
+
+    def stop(self):
+        """Останавливает фоновое обновление ленты."""
+        self._stop.set()
+
+# Общее хранилище ленты для новостей и событий
+feed_store = FeedStore()
+
+_backfill_lock = threading.Lock()
+
+def backfill_archive(since, max_cycles, progress=None, log_prefix="[FEED]"):
+    """
+    Догружает архив статей через браузер, если в нем есть пропуски начиная с since.
+    Повторная догрузка не запускается чаще, чем раз в ARCHIVE_BACKFILL_COOLDOWN секунд,
+    чтобы не листать сайт заново, когда он просто не хранит статьи так далеко.
+    :param since: Начало периода, который должен быть в архиве
+    :param max_cycles: Максимальное число подгрузок "больше новостей"
+    :param progress: Необязательная функция progress(stage, **info) для отчета о ходе загрузки
+    :return: True, если архив был догружен
+    """
+    with _backfill_lock:
+        if not article_archive.has_gap(since):
+            return False
+
+        last_backfill = article_archive.get_last_backfill()
+        if last_backfill and datetime.now() - last_backfill < timedelta(seconds=ARCHIVE_BACKFILL_COOLDOWN):
+            logger.info(f"{log_prefix} Archive has a gap, but last backfill was at {last_backfill}. Skipping.")
+            return False
+
+        logger.info(f"{log_prefix} Archive has a gap since {since}, backfilling with browser.")
+        page_source = browser_pool.render_feed(YARNEWS_URL, max_cycles=max_cycles, progress=progress, log_prefix=log_prefix)
+        if page_source is None:
+            return False
+
+        article_archive.ingest([tag_article(a) for a in parse_feed(page_source)])
+        article_archive.mark_backfill()
+        return True
+
+def start_feed_refresher():
+    """Запускает фоновое обновление общей ленты yarnews.net."""
+    feed_store.start()